@@ -0,0 +1,80 @@
+"""Benchmark the time it takes to import the stacker command line interface.
+
+Runs `python -X importtime -c "import stacker.commands"` in fresh interpreters
+(python 3.7+) and reports the slowest imports, along with any of the heavy
+third party modules that are only meant to be imported once a command needs
+them.
+
+Usage:
+
+    python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--check]
+
+With `--check`, exits with a non-zero status if any of the heavy modules is
+imported at startup.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import argparse
+import subprocess
+import sys
+
+MODULE = "stacker.commands"
+
+# Modules that shouldn't be imported just to start the command line interface
+HEAVY_MODULES = [
+    "awacs",
+    "boto3",
+    "botocore.client",
+    "git",
+    "troposphere",
+]
+
+
+def import_times(module):
+    """Return the cumulative import time (in microseconds) of every module
+    imported when importing the given module in a new interpreter."""
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # The header line
+            continue
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    runs = [import_times(MODULE) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[MODULE])
+
+    print("import %s, best of %d runs: %.2f ms" % (
+        MODULE, args.repeat, best[MODULE] / 1000.0))
+    print("slowest imports (cumulative):")
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    for name, cumulative in slowest[:args.top]:
+        print("  %-48s %8.2f ms" % (name, cumulative / 1000.0))
+
+    heavy = [name for name in HEAVY_MODULES if name in best]
+    if heavy:
+        print("heavy modules imported at startup: %s" % ", ".join(heavy))
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark compiling, inspecting and resolving large sets of variables.
+
+Builds a synthetic config with 10,000 variables (by default), shaped like the
+ones found in large stacker configs: plain values, strings with one or more
+lookups, and lists/dicts with lookups nested inside them.
+
+Usage:
+
+    python benchmarks/bench_variables.py [--variables 10000] [--repeat 5]
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import argparse
+import timeit
+
+from stacker.lookups import extract_lookups
+from stacker.variables import Variable
+
+
+def generate_values(count):
+    values = {}
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            value = "plain-value-%d" % i
+        elif kind == 1:
+            value = "${output stack%d::Output%d}" % (i % 50, i)
+        elif kind == 2:
+            value = ("arn:aws:s3:::${output stack%d::Bucket}/"
+                     "${envvar PREFIX}" % (i % 50))
+        elif kind == 3:
+            value = ["sg-%d" % i,
+                     "${output stack%d::SecurityGroup}" % (i % 50)]
+        else:
+            value = {
+                "Name": "resource-%d" % i,
+                "Tags": {"Owner": "${ssmstore /owners/%d}" % i},
+                "Ports": [80, 443],
+            }
+        values["Variable%d" % i] = value
+    return values
+
+
+def replacements_for(variables):
+    resolved = {}
+    for variable in variables:
+        for lookup in variable.lookups:
+            resolved[lookup] = "resolved-%s" % lookup.input
+    return resolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variables", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = generate_values(args.variables)
+    variables = [Variable(k, v) for k, v in values.items()]
+    resolved = replacements_for(variables)
+
+    def build():
+        return [Variable(k, v) for k, v in values.items()]
+
+    def lookups():
+        # Mirrors Stack.requires, which is evaluated whenever the graph is
+        # built.
+        for variable in variables:
+            for _ in variable.lookups:
+                pass
+
+    def legacy_lookups():
+        for value in values.values():
+            for _ in extract_lookups(value):
+                pass
+
+    def replace():
+        for variable in build():
+            variable.replace(dict(
+                (lookup, resolved[lookup]) for lookup in variable.lookups))
+
+    benchmarks = [
+        ("compile variables", build),
+        ("list lookups (compiled)", lookups),
+        ("list lookups (extract_lookups)", legacy_lookups),
+        ("compile + replace", replace),
+    ]
+    print("%d variables, best of %d runs" % (args.variables, args.repeat))
+    for name, fn in benchmarks:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print("  %-32s %8.2f ms" % (name, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,9 @@ install_requires = [
     "awacs>=0.6.0",
     "gitpython~=2.0",
     "schematics~=2.1.0",
-    "formic2",
     "python-dateutil~=2.0",
+    "futures; python_version < '3.2'",
+    "scandir; python_version < '3.5'",
 ]
 
 tests_require = [
@@ -7,12 +7,13 @@ import sys
 import logging
 import threading
 
-from ..dag import walk, ThreadedWalker
+from ..dag import walk, ThreadedWalker, UnlimitedSemaphore
 from ..plan import Step, build_plan
 
-import botocore.exceptions
 from stacker.session_cache import get_session
 from stacker.exceptions import PlanFailed
+from stacker.lookups import submit_lookups
+from stacker.lookups.registry import OUTPUT_INDEPENDENT_LOOKUP_TYPES
 
 from stacker.util import (
     ensure_s3_bucket,
@@ -49,7 +50,12 @@ def build_walker(concurrency):
     """
     if concurrency == 1:
         return walk
-    return ThreadedWalker(concurrency).walk
+
+    semaphore = UnlimitedSemaphore()
+    if concurrency > 1:
+        semaphore = threading.Semaphore(concurrency)
+
+    return ThreadedWalker(semaphore).walk
 
 
 def plan(description, action, stacks,
@@ -81,6 +87,56 @@ def plan(description, action, stacks,
         reverse=reverse)
 
 
+def preresolve_lookups(stacks, context, provider):
+    """Resolves the output independent lookups of stacks ahead of time.
+
+    Lookups that don't depend on other stacks in the plan (see
+    :data:`stacker.lookups.registry.OUTPUT_INDEPENDENT_LOOKUP_TYPES`) are
+    resolved concurrently for all of the given stacks, so they aren't on the
+    critical path behind upstream stacks. Any lookup that fails is left for
+    the stack's step to resolve, which reports the failure as usual.
+
+    Args:
+        stacks (list): a list of :class:`stacker.stack.Stack` objects.
+        context (:class:`stacker.context.Context`): stacker context
+        provider (:class:`stacker.provider.base.BaseProvider`): the provider
+            the stacks will be resolved with.
+    """
+    stack_lookups = []
+    lookups = set()
+    for stack in stacks:
+        if not stack.should_submit() or not stack.should_update():
+            continue
+        independent = set()
+        for variable in stack.variables:
+            independent.update(
+                lookup for lookup in variable.lookups
+                if lookup.type in OUTPUT_INDEPENDENT_LOOKUP_TYPES
+            )
+        if independent:
+            stack_lookups.append((stack, independent))
+            lookups.update(independent)
+
+    if not lookups:
+        return
+
+    logger.debug("Pre-resolving %d lookups for %d stacks.", len(lookups),
+                 len(stack_lookups))
+    resolved = {}
+    for lookup, future in submit_lookups(lookups, context, provider).items():
+        try:
+            resolved[lookup] = future.result()
+        except Exception as e:
+            logger.debug("Unable to pre-resolve lookup %s, deferring it to "
+                         "the stack step: %s", lookup.raw, e)
+
+    for stack, independent in stack_lookups:
+        stack.set_preresolved_lookups(dict(
+            (lookup, resolved[lookup]) for lookup in independent
+            if lookup in resolved
+        ))
+
+
 def stack_template_key_name(blueprint):
     """Given a blueprint, produce an appropriate key name.
 
@@ -160,6 +216,8 @@ class BaseAction(object):
 
         Returns the URL to the template in S3.
         """
+        import botocore.exceptions
+
         key_name = stack_template_key_name(blueprint)
         template_url = self.stack_template_url(blueprint)
         try:
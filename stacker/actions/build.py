@@ -3,7 +3,7 @@ from __future__ import division
 from __future__ import absolute_import
 import logging
 
-from .base import BaseAction, plan, build_walker
+from .base import BaseAction, plan, build_walker, preresolve_lookups
 from .base import STACK_POLL_TIME
 
 from ..providers.base import Template
@@ -319,6 +319,13 @@ class Action(BaseAction):
         if stack.stack_policy:
             return Template(body=stack.stack_policy)
 
+    def _preresolve_lookups(self, plan):
+        """Resolves the output independent lookups of every stack in the plan
+        before it is walked."""
+        stacks = [step.stack for step in plan.steps]
+        if stacks:
+            preresolve_lookups(stacks, self.context, self.provider)
+
     def _generate_plan(self, tail=False):
         return plan(
             description="Create/Update stacks",
@@ -352,14 +359,17 @@ class Action(BaseAction):
         if not outline and not dump:
             plan.outline(logging.DEBUG)
             logger.debug("Launching stacks: %s", ", ".join(plan.keys()))
+            self._preresolve_lookups(plan)
             walker = build_walker(concurrency)
             plan.execute(walker)
         else:
             if outline:
                 plan.outline()
             if dump:
+                self._preresolve_lookups(plan)
                 plan.dump(directory=dump, context=self.context,
-                          provider=self.provider)
+                          provider=self.provider,
+                          walker=build_walker(concurrency))
 
     def post_run(self, outline=False, dump=False, *args, **kwargs):
         """Any steps that need to be taken after running the action."""
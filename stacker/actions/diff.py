@@ -3,12 +3,17 @@ from __future__ import division
 from __future__ import absolute_import
 from builtins import str
 from builtins import object
+from past.builtins import basestring
+from concurrent.futures import ThreadPoolExecutor
 import difflib
 import json
 import logging
+import numbers
+import os
+from collections import OrderedDict
 from operator import attrgetter
 
-from .base import plan, build_walker
+from .base import plan, build_walker, preresolve_lookups
 from . import build
 from .. import exceptions
 from ..util import parse_cloudformation_template
@@ -21,6 +26,12 @@ from ..status import (
 
 logger = logging.getLogger(__name__)
 
+# The number of stacks whose current template, parameters and outputs are
+# fetched from CloudFormation at the same time, as soon as the diff starts. 0
+# disables prefetching, each stack is then fetched when it's diffed.
+PREFETCH_CONCURRENCY = int(
+    os.environ.get("STACKER_DIFF_PREFETCH_CONCURRENCY", 10))
+
 
 class DictValue(object):
     ADDED = "ADDED"
@@ -147,16 +158,15 @@ def diff_parameters(old_params, new_params):
     return diff
 
 
-def normalize_json(template):
-    """Normalize our template for diffing.
+def _json_lines(obj):
+    """Serialize a parsed template, or part of one, for diffing.
 
     Args:
-        template(str): string representing the template
+        obj: the parsed template.
 
     Returns:
-        list: json representation of the parameters
+        list: the lines of its JSON representation
     """
-    obj = parse_cloudformation_template(template)
     json_str = json.dumps(
         obj, sort_keys=True, indent=4, default=str, separators=(',', ': '),
     )
@@ -167,24 +177,156 @@ def normalize_json(template):
     return result
 
 
-def print_stack_changes(stack_name, new_stack, old_stack, new_params,
+def normalize_json(template):
+    """Normalize our template for diffing.
+
+    Args:
+        template(str): string representing the template
+
+    Returns:
+        list: json representation of the parameters
+    """
+    return _json_lines(parse_cloudformation_template(template))
+
+
+def _normalize_value(value):
+    """Values that can't be represented in JSON, like the dates YAML
+    templates are parsed with, are compared as the strings they are
+    serialized to."""
+    if isinstance(value, (dict, list, basestring, numbers.Number)) or \
+            value is None:
+        return value
+    return str(value)
+
+
+def format_path(path):
+    """Format the path of a value within a template.
+
+    Args:
+        path (tuple): the keys and list indexes leading to the value.
+
+    Returns:
+        str: the path, eg: ``Resources.Bucket.Properties.Tags[0]``.
+    """
+    result = ""
+    for part in path:
+        if isinstance(part, int):
+            result += "[%d]" % part
+        else:
+            result += ("." if result else "") + str(part)
+    return result
+
+
+def _diff_values(old, new, path, output):
+    old = _normalize_value(old)
+    new = _normalize_value(new)
+    if old == new:
+        return
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(set(old) | set(new), key=str):
+            _diff_values(old.get(key), new.get(key), path + (key,), output)
+    elif isinstance(old, list) and isinstance(new, list) and \
+            len(old) == len(new):
+        for i, (old_item, new_item) in enumerate(zip(old, new)):
+            _diff_values(old_item, new_item, path + (i,), output)
+    else:
+        output.append(DictValue(path, old, new))
+
+
+def diff_templates(old_template, new_template):
+    """Diffs two parsed templates structurally.
+
+    Both templates are walked together, matching mappings by key (and so
+    resources, parameters and outputs by their logical IDs), and lists of
+    the same length item by item. Subtrees that are equal aren't walked.
+
+    Args:
+        old_template (dict): the old template.
+        new_template (dict): the new template.
+
+    Returns:
+        list: [:class:`DictValue`] for each changed value, sorted by path,
+            with the path of the value as key. Lists whose length changed
+            are reported as a whole.
+    """
+    output = []
+    _diff_values(old_template, new_template, (), output)
+    return output
+
+
+def _get_path(obj, path):
+    for part in path:
+        try:
+            obj = obj[part]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return obj
+
+
+def format_template_diff(stack_name, old_template, new_template, changes):
+    """Handles the formatting of differences in templates.
+
+    Only the top level entries of the template sections that changed (eg:
+    a single resource) are serialized and diffed line by line.
+
+    Args:
+        stack_name (str): the name of the stack.
+        old_template (dict): the old template.
+        new_template (dict): the new template.
+        changes (list): the changes between the templates, as returned by
+            :func:`stacker.actions.diff.diff_templates`
+
+    Returns:
+        string: A unified diff of the changed parts of the templates
+    """
+    subtrees = OrderedDict()
+    for change in changes:
+        path = change.key
+        if len(path) > 1 and not isinstance(path[1], int):
+            path = path[:2]
+        else:
+            path = path[:1]
+        subtrees.setdefault(path, []).append(change)
+
+    output = []
+    for path, subtree_changes in subtrees.items():
+        old_value = _get_path(old_template, path)
+        new_value = _get_path(new_template, path)
+        name = "/".join(str(part) for part in path)
+        output.extend(difflib.unified_diff(
+            _json_lines(old_value) if old_value is not None else [],
+            _json_lines(new_value) if new_value is not None else [],
+            fromfile="old_%s/%s" % (stack_name, name),
+            tofile="new_%s/%s" % (stack_name, name),
+            n=7))  # ensure a few lines of context are displayed afterward
+    return "".join(output)
+
+
+def print_stack_changes(stack_name, new_template, old_template, new_params,
                         old_params):
-    """Prints out the parameters (if changed) and stack diff"""
-    from_file = "old_%s" % (stack_name,)
-    to_file = "new_%s" % (stack_name,)
-    lines = difflib.context_diff(
-        old_stack, new_stack,
-        fromfile=from_file, tofile=to_file,
-        n=7)  # ensure at least a few lines of context are displayed afterward
-
-    template_changes = list(lines)
+    """Prints out the parameters (if changed) and stack diff
+
+    Args:
+        stack_name (str): the name of the stack.
+        new_template (dict): the parsed new template.
+        old_template (dict): the parsed old template.
+        new_params (dict): the new parameters.
+        old_params (dict): the old parameters.
+    """
+    template_changes = diff_templates(old_template, new_template)
     if not template_changes:
         print("*** No changes to template ***")
     param_diffs = diff_parameters(old_params, new_params)
     if param_diffs:
         print(format_params_diff(param_diffs))
     if template_changes:
-        print("".join(template_changes))
+        print("Changed paths:")
+        for change in template_changes:
+            print("  %s %s" % (change.status(), format_path(change.key)))
+        print("")
+        print(format_template_diff(stack_name, old_template, new_template,
+                                   template_changes))
 
 
 class Action(build.Action):
@@ -209,6 +351,48 @@ class Action(build.Action):
         print("\nNew template contents:")
         print("".join(stack))
 
+    def __init__(self, *args, **kwargs):
+        super(Action, self).__init__(*args, **kwargs)
+        # The futures of the prefetched remote stacks, by stack fqn
+        self._remote_stacks = {}
+
+    def _fetch_remote_stack(self, stack, provider):
+        """Fetches the stack currently in CloudFormation.
+
+        Returns:
+            tuple: the stack, or None if it doesn't exist, with its current
+                template (or None) and parameters.
+        """
+        try:
+            provider_stack = provider.get_stack(stack.fqn)
+        except exceptions.StackDoesNotExist:
+            return None, None, {}
+
+        # get the current stack template & params from AWS
+        try:
+            [old_template, old_params] = provider.get_stack_info(
+                provider_stack)
+        except exceptions.StackDoesNotExist:
+            old_template = None
+            old_params = {}
+        return provider_stack, old_template, old_params
+
+    def _prefetch_remote_stacks(self, plan, executor):
+        """Starts fetching the remote stacks of the plan, which doesn't depend
+        on the outputs of other stacks, so that the plan only waits for
+        dependencies to resolve and render each stack."""
+        providers = {}
+        for step in plan.steps:
+            stack = step.stack
+            if not stack.should_submit() or not stack.should_update():
+                continue
+
+            key = (stack.region, stack.profile)
+            if key not in providers:
+                providers[key] = self.build_provider(stack)
+            self._remote_stacks[stack.fqn] = executor.submit(
+                self._fetch_remote_stack, stack, providers[key])
+
     def _diff_stack(self, stack, **kwargs):
         """Handles the diffing a stack in CloudFormation vs our config"""
         if self.cancel.wait(0):
@@ -222,15 +406,12 @@ class Action(build.Action):
 
         provider = self.build_provider(stack)
 
-        provider_stack = provider.get_stack(stack.fqn)
-
-        # get the current stack template & params from AWS
-        try:
-            [old_template, old_params] = provider.get_stack_info(
-                provider_stack)
-        except exceptions.StackDoesNotExist:
-            old_template = None
-            old_params = {}
+        future = self._remote_stacks.get(stack.fqn)
+        if future is not None:
+            provider_stack, old_template, old_params = future.result()
+        else:
+            provider_stack, old_template, old_params = \
+                self._fetch_remote_stack(stack, provider)
 
         stack.resolve(self.context, provider)
         # generate our own template & params
@@ -238,33 +419,28 @@ class Action(build.Action):
         new_params = dict()
         for p in parameters:
             new_params[p['ParameterKey']] = p['ParameterValue']
-        new_template = stack.blueprint.rendered
-        new_stack = normalize_json(new_template)
+        new_template = parse_cloudformation_template(
+            stack.blueprint.rendered)
 
         print("============== Stack: %s ==============" % (stack.name,))
         # If this is a completely new template dump our params & stack
         if not old_template:
-            self._print_new_stack(new_stack, parameters)
+            self._print_new_stack(_json_lines(new_template), parameters)
         else:
             # Diff our old & new stack/parameters
             old_template = parse_cloudformation_template(old_template)
-            if isinstance(old_template, str):
+            if isinstance(old_template, basestring):
                 # YAML templates returned from CFN need parsing again
                 # "AWSTemplateFormatVersion: \"2010-09-09\"\nParam..."
                 # ->
                 # AWSTemplateFormatVersion: "2010-09-09"
                 old_template = parse_cloudformation_template(old_template)
-            old_stack = normalize_json(
-                json.dumps(old_template,
-                           sort_keys=True,
-                           indent=4,
-                           default=str)
-            )
-            print_stack_changes(stack.name, new_stack, old_stack, new_params,
-                                old_params)
-
-        stack.set_outputs(
-            provider.get_output_dict(provider_stack))
+            print_stack_changes(stack.name, new_template, old_template,
+                                new_params, old_params)
+
+        if provider_stack is not None:
+            stack.set_outputs(
+                provider.get_output_dict(provider_stack))
 
         return COMPLETE
 
@@ -275,12 +451,39 @@ class Action(build.Action):
             stacks=self.context.get_stacks(),
             targets=self.context.stack_names)
 
+    def _preresolve_lookups(self, plan):
+        """Resolves the output independent lookups of every stack in the plan
+        before it is walked, using the same provider each stack is diffed
+        with."""
+        stacks_by_provider = OrderedDict()
+        for step in plan.steps:
+            key = (step.stack.region, step.stack.profile)
+            stacks_by_provider.setdefault(key, []).append(step.stack)
+
+        for stacks in stacks_by_provider.values():
+            provider = self.build_provider(stacks[0])
+            preresolve_lookups(stacks, self.context, provider)
+
     def run(self, concurrency=0, *args, **kwargs):
         plan = self._generate_plan()
         plan.outline(logging.DEBUG)
         logger.info("Diffing stacks: %s", ", ".join(plan.keys()))
-        walker = build_walker(concurrency)
-        plan.execute(walker)
+
+        executor = None
+        if PREFETCH_CONCURRENCY > 0:
+            executor = ThreadPoolExecutor(max_workers=PREFETCH_CONCURRENCY)
+            self._prefetch_remote_stacks(plan, executor)
+        try:
+            self._preresolve_lookups(plan)
+            walker = build_walker(concurrency)
+            plan.execute(walker)
+        finally:
+            if executor is not None:
+                # Don't keep fetching stacks when the plan failed or was
+                # cancelled, as the process waits for the pool to finish
+                for future in self._remote_stacks.values():
+                    future.cancel()
+                executor.shutdown(wait=False)
 
     """Don't ever do anything for pre_run or post_run"""
     def pre_run(self, *args, **kwargs):
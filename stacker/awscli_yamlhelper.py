@@ -17,7 +17,10 @@ import json
 import yaml
 from yaml.resolver import ScalarNode, SequenceNode
 
-from botocore.compat import six
+from past.builtins import basestring
+
+# Use the (much faster) libyaml based loader when PyYAML was built with it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def intrinsics_multi_constructor(loader, tag_prefix, node):
@@ -36,7 +39,7 @@ def intrinsics_multi_constructor(loader, tag_prefix, node):
 
     cfntag = prefix + tag
 
-    if tag == "GetAtt" and isinstance(node.value, six.string_types):
+    if tag == "GetAtt" and isinstance(node.value, basestring):
         # ShortHand notation for !GetAtt accepts Resource.Attribute format
         # while the standard notation is to use an array
         # [Resource, Attribute]. Convert shorthand to standard format
@@ -57,6 +60,13 @@ def intrinsics_multi_constructor(loader, tag_prefix, node):
     return {cfntag: value}
 
 
+class TemplateLoader(SafeLoader):
+    """Safe YAML loader that understands CloudFormation intrinsics."""
+
+
+TemplateLoader.add_multi_constructor("!", intrinsics_multi_constructor)
+
+
 def yaml_dump(dict_to_dump):
     """
     Dumps the dictionary as a YAML document
@@ -74,6 +84,4 @@ def yaml_parse(yamlstr):
         # json parser.
         return json.loads(yamlstr)
     except ValueError:
-        yaml.SafeLoader.add_multi_constructor(
-            "!", intrinsics_multi_constructor)
-        return yaml.safe_load(yamlstr)
+        return yaml.load(yamlstr, Loader=TemplateLoader)
@@ -6,11 +6,16 @@ from past.builtins import basestring
 from builtins import object
 import copy
 import hashlib
+import inspect
+import json
 import logging
+import os
 import string
-from stacker.util import read_value_from_path
+import sys
+from stacker.util import read_file, read_value_from_path
 from stacker.variables import Variable
 
+import troposphere
 from troposphere import (
     Output,
     Parameter,
@@ -18,6 +23,10 @@ from troposphere import (
     Template,
 )
 
+from .. import __version__
+from ..disk_cache import DiskCache, cache_key
+from .render import render_in_process_pool
+
 from ..exceptions import (
     MissingVariable,
     UnresolvedVariable,
@@ -33,6 +42,10 @@ from .variables.types import (
 
 logger = logging.getLogger(__name__)
 
+# The number of seconds rendered templates are cached for in the
+# stacker_cache_dir. Caching is disabled by default.
+TEMPLATE_CACHE_TTL = int(os.environ.get("STACKER_TEMPLATE_CACHE_TTL", 0))
+
 PARAMETER_PROPERTIES = {
     "default": "Default",
     "description": "Description",
@@ -46,6 +59,40 @@ PARAMETER_PROPERTIES = {
     "constraint_description": "ConstraintDescription"
 }
 
+# The read-only variable definitions of each blueprint class, along with the
+# `VARIABLES` object they were built from.
+_defined_variables_cache = {}
+
+
+class ReadOnlyDict(dict):
+    """A dictionary that can't be modified.
+
+    Used for the variable definitions shared by every instance of a blueprint
+    class. Copies (`dict(d)`, `copy.copy` and `copy.deepcopy`) are regular,
+    mutable dictionaries.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Variable definitions are read-only, copy them with "
+                        "dict() before modifying them.")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def _freeze_variables(variables):
+    return ReadOnlyDict(
+        (name, ReadOnlyDict(attrs)) for name, attrs in variables.items())
+
 
 class CFNParameter(object):
 
@@ -209,9 +256,10 @@ def resolve_variable(var_name, var_def, provided_variable, blueprint_name):
         value = provided_variable.value
     else:
         # Variable value not provided, try using the default, if it exists
-        # in the definition
+        # in the definition. It's copied, as the definitions are shared by
+        # every instance of the blueprint.
         try:
-            value = var_def["default"]
+            value = copy.deepcopy(var_def["default"])
         except KeyError:
             raise MissingVariable(blueprint_name, var_name)
 
@@ -287,6 +335,39 @@ def parse_user_data(variables, raw_user_data, blueprint_name):
     return res
 
 
+def _module_source_hash(module_name):
+    """Return a hash of the source of the given module, or None if the source
+    can't be found."""
+    try:
+        path = inspect.getsourcefile(sys.modules[module_name])
+    except (KeyError, TypeError):
+        return None
+    if not path:
+        return None
+    try:
+        source = read_file(path)
+    except (IOError, OSError):
+        return None
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _serialize_variable_value(value):
+    """Serialize the resolved variable and hook data values json doesn't know
+    about for use in the template cache key.
+
+    Raises:
+        TypeError: if the value can't be serialized reliably, in which case
+            the template isn't cached.
+
+    """
+    if isinstance(value, CFNParameter):
+        return ["CFNParameter", value.name, value.value]
+    # troposphere objects and helper functions
+    if hasattr(value, "to_dict"):
+        return [type(value).__name__, value.to_dict()]
+    raise TypeError("%r is not serializable" % (value,))
+
+
 class Blueprint(object):
 
     """Base implementation for rendering a troposphere template.
@@ -328,6 +409,15 @@ class Blueprint(object):
 
         """
         required = {}
+        if self._rendered_elsewhere:
+            # The template was loaded from the cache or rendered by a worker
+            # process, so self.template is empty
+            parameters = json.loads(self.rendered).get("Parameters", {})
+            for name, attrs in parameters.items():
+                if "Default" not in attrs:
+                    required[name] = attrs
+            return required
+
         for name, attrs in self.template.parameters.items():
             if not hasattr(attrs, "Default"):
                 required[name] = attrs
@@ -346,10 +436,10 @@ class Blueprint(object):
 
         """
         output = {}
-        for var_name, attrs in self.defined_variables().items():
+        for var_name, attrs in self.variable_definitions().items():
             var_type = attrs.get("type")
             if isinstance(var_type, CFNType):
-                cfn_attrs = copy.deepcopy(attrs)
+                cfn_attrs = dict(attrs)
                 cfn_attrs["type"] = var_type.parameter_type
                 output[var_name] = cfn_attrs
         return output
@@ -396,7 +486,39 @@ class Blueprint(object):
             dict: variables defined by the blueprint
 
         """
-        return copy.deepcopy(getattr(self, "VARIABLES", {}))
+        return copy.deepcopy(self._class_defined_variables())
+
+    def _class_defined_variables(self):
+        """Return the read-only definitions of `VARIABLES`, which are built
+        once per blueprint class."""
+        variables = getattr(self, "VARIABLES", {})
+        if "VARIABLES" in vars(self):
+            # Set on the instance, so it can't be shared with the class
+            return _freeze_variables(variables)
+
+        cls = type(self)
+        cached = _defined_variables_cache.get(cls)
+        if cached is None or cached[0] is not variables:
+            cached = (variables, _freeze_variables(variables))
+            _defined_variables_cache[cls] = cached
+        return cached[1]
+
+    def variable_definitions(self):
+        """Return the variables defined by the blueprint, as a read-only
+        mapping.
+
+        Unlike :meth:`defined_variables`, this doesn't copy the definitions
+        unless a subclass overrides :meth:`defined_variables`.
+
+        Returns:
+            :class:`ReadOnlyDict`: variables defined by the blueprint
+
+        """
+        overridden = type(self).defined_variables.__code__ is not \
+            Blueprint.defined_variables.__code__
+        if overridden:
+            return _freeze_variables(self.defined_variables())
+        return self._class_defined_variables()
 
     def get_variables(self):
         """Return a dictionary of variables available to the template.
@@ -442,7 +564,7 @@ class Blueprint(object):
 
         """
         self.resolved_variables = {}
-        defined_variables = self.defined_variables()
+        defined_variables = self.variable_definitions()
         variable_dict = dict((var.name, var) for var in provided_variables)
         for var_name, var_def in defined_variables.items():
             value = resolve_variable(
@@ -465,9 +587,73 @@ class Blueprint(object):
         self.template = Template()
         self._rendered = None
         self._version = None
+        self._rendered_elsewhere = False
+
+    def template_cache_key(self):
+        """Return the key the rendered template is cached under.
+
+        The key covers the name of the blueprint, the source of the modules
+        its class is defined in, the resolved variables, the hook data, the
+        mappings, the description and the template indent. Changes to any
+        other code or file used by `create_template` are not detected.
+
+        Returns:
+            str: the cache key, or None if the template can't be cached.
+
+        """
+        if self.resolved_variables is None:
+            return None
+
+        classes = []
+        for cls in type(self).__mro__:
+            if cls is object:
+                continue
+            source_hash = _module_source_hash(cls.__module__)
+            if source_hash is None:
+                return None
+            classes.append(
+                ["%s.%s" % (cls.__module__, cls.__name__), source_hash])
+
+        try:
+            variables = json.dumps(self.resolved_variables, sort_keys=True,
+                                   default=_serialize_variable_value)
+            hook_data = json.dumps(self.context.hook_data, sort_keys=True,
+                                   default=_serialize_variable_value)
+        except (TypeError, ValueError) as e:
+            logger.debug("Not caching the template of %s: %s", self.name, e)
+            return None
+
+        return cache_key(
+            "template", __version__, troposphere.__version__, self.name,
+            classes, variables, hook_data, self.mappings, self.description,
+            self.context.namespace, self.context.template_indent)
+
+    def _template_cache(self):
+        return DiskCache(os.path.join(self.context.cache_dir, "templates"),
+                         ttl=TEMPLATE_CACHE_TTL)
 
     def render_template(self):
-        """Render the Blueprint to a CloudFormation template"""
+        """Render the Blueprint to a CloudFormation template.
+
+        When `STACKER_TEMPLATE_CACHE_TTL` is set, templates are cached in the
+        `stacker_cache_dir` and reused while the key returned by
+        :meth:`template_cache_key` doesn't change.
+
+        Returns:
+            tuple: the version and the rendered template.
+
+        """
+        key = None
+        if TEMPLATE_CACHE_TTL > 0:
+            key = self.template_cache_key()
+        if key:
+            cached = self._template_cache().get(key)
+            if cached:
+                logger.debug("Using cached template for %s.", self.name)
+                self._rendered_elsewhere = True
+                return tuple(cached)
+
+        self._reads_user_data = False
         self.import_mappings()
         self.create_template()
         if self.description:
@@ -475,6 +661,11 @@ class Blueprint(object):
         self.setup_parameters()
         rendered = self.template.to_json(indent=self.context.template_indent)
         version = hashlib.md5(rendered.encode()).hexdigest()[:8]
+
+        # User data files aren't part of the key, so templates using them
+        # can't be reused
+        if key and not self._reads_user_data:
+            self._template_cache().set(key, [version, rendered])
         return (version, rendered)
 
     def to_json(self, variables=None):
@@ -513,7 +704,9 @@ class Blueprint(object):
             str: the parsed user data file
 
         """
-        raw_user_data = read_value_from_path(user_data_path)
+        self._reads_user_data = True
+        raw_user_data = read_value_from_path(user_data_path,
+                                             context=self.context)
 
         variables = self.get_variables()
 
@@ -541,18 +734,30 @@ class Blueprint(object):
     @property
     def requires_change_set(self):
         """Returns true if the underlying template has transforms."""
+        # The template was loaded from the cache or rendered by a worker
+        # process, so self.template is empty
+        if self._rendered_elsewhere:
+            return "Transform" in json.loads(self.rendered)
         return self.template.transform is not None
 
+    def _render(self):
+        rendered = render_in_process_pool(self)
+        if rendered is not None:
+            self._rendered_elsewhere = True
+            self._version, self._rendered = rendered
+        else:
+            self._version, self._rendered = self.render_template()
+
     @property
     def rendered(self):
         if not self._rendered:
-            self._version, self._rendered = self.render_template()
+            self._render()
         return self._rendered
 
     @property
     def version(self):
         if not self._version:
-            self._version, self._rendered = self.render_template()
+            self._render()
         return self._version
 
     def create_template(self):
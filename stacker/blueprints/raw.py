@@ -5,11 +5,15 @@ from __future__ import absolute_import
 
 from builtins import object
 import hashlib
+import io
 import json
 
 from ..util import parse_cloudformation_template
 from ..exceptions import MissingVariable, UnresolvedVariable
 
+# The size of the chunks raw templates are read (and hashed) in
+READ_CHUNK_SIZE = 64 * 1024
+
 
 def get_template_params(template):
     """Parse a CFN template for defined parameters.
@@ -82,6 +86,7 @@ class RawTemplateBlueprint(object):
         self.raw_template_path = raw_template_path
         self._rendered = None
         self._version = None
+        self._template_dict = None
 
     def to_json(self, variables=None):  # pylint: disable=unused-argument
         """Return the template in JSON.
@@ -100,11 +105,16 @@ class RawTemplateBlueprint(object):
     def to_dict(self):
         """Return the template as a python dictionary.
 
+        The template is only parsed once, the same dictionary is returned by
+        every call and shouldn't be modified.
+
         Returns:
             dict: the loaded template as a python dictionary
 
         """
-        return parse_cloudformation_template(self.rendered)
+        if self._template_dict is None:
+            self._template_dict = parse_cloudformation_template(self.rendered)
+        return self._template_dict
 
     def render_template(self):
         """Load template and generate its md5 hash."""
@@ -175,17 +185,27 @@ class RawTemplateBlueprint(object):
         """Return True if the underlying template has transforms."""
         return bool("Transform" in self.to_dict())
 
+    def _read_template(self):
+        """Read the template, hashing it as it is read."""
+        md5 = hashlib.md5()
+        chunks = []
+        with io.open(self.raw_template_path, "r") as template:
+            for chunk in iter(lambda: template.read(READ_CHUNK_SIZE), u""):
+                md5.update(chunk.encode("utf-8"))
+                chunks.append(chunk)
+        self._rendered = u"".join(chunks)
+        self._version = md5.hexdigest()[:8]
+
     @property
     def rendered(self):
         """Return (generating first if needed) rendered template."""
         if not self._rendered:
-            with open(self.raw_template_path, 'r') as template:
-                self._rendered = template.read()
+            self._read_template()
         return self._rendered
 
     @property
     def version(self):
         """Return (generating first if needed) version hash."""
         if not self._version:
-            self._version = hashlib.md5(self.rendered.encode()).hexdigest()[:8]
+            self._read_template()
         return self._version
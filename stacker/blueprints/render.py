@@ -0,0 +1,131 @@
+"""Rendering of troposphere blueprints in a pool of worker processes.
+
+Rendering a template with troposphere is CPU bound, pure python work, so stacks
+rendered by the threads walking the plan end up serialized by the GIL. When
+`STACKER_RENDER_PROCESSES` is set, blueprints are instead rendered in a shared
+pool of processes: the blueprint class path, its resolved variables and the
+parts of the context templates can depend on are sent to a worker, which
+rebuilds the blueprint and returns the rendered template.
+
+Workers are started with the ``spawn`` method where it is available, rather
+than forked from a process that is already running threads, and get the
+``sys.path`` of stacker (including the paths of package sources). Blueprints
+that fail to render in a worker are rendered in the current process instead.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The number of processes blueprints are rendered in. Rendering happens in
+# the calling thread when this is 0, which is the default.
+RENDER_PROCESSES = int(os.environ.get("STACKER_RENDER_PROCESSES", 0))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            try:
+                _executor = ProcessPoolExecutor(
+                    max_workers=RENDER_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"))
+            except (AttributeError, TypeError):  # python < 3.7
+                _executor = ProcessPoolExecutor(max_workers=RENDER_PROCESSES)
+        return _executor
+
+
+def _render(path, payload):
+    """Rebuild a blueprint from a pickled payload and render it.
+
+    Runs in the worker processes, after adding the entries of `path` missing
+    from their `sys.path`, so the payload can be unpickled.
+    """
+    for entry in path:
+        if entry not in sys.path:
+            sys.path.append(entry)
+
+    (class_path, name, mappings, description, resolved_variables,
+     context_args, hook_data) = pickle.loads(payload)
+
+    from ..config import Config
+    from ..context import Context
+    from ..util import load_object_from_string
+
+    context = Context(config=Config(context_args.pop("config")),
+                      **context_args)
+    context.hook_data = hook_data
+
+    blueprint_class = load_object_from_string(class_path)
+    blueprint = blueprint_class(name=name, context=context,
+                                mappings=mappings, description=description)
+    blueprint.resolved_variables = resolved_variables
+    return blueprint.render_template()
+
+
+def _importable_class_path(cls):
+    """Return the path the class can be imported from by the workers, or None
+    if it can't be, eg: for classes defined in functions."""
+    module = sys.modules.get(cls.__module__)
+    if getattr(module, cls.__name__, None) is not cls:
+        return None
+    return "%s.%s" % (cls.__module__, cls.__name__)
+
+
+def render_in_process_pool(blueprint):
+    """Render a blueprint in the process pool.
+
+    Args:
+        blueprint (:class:`stacker.blueprints.base.Blueprint`): the blueprint
+            to render, with its variables already resolved.
+
+    Returns:
+        tuple: the version and the rendered template, or None if the blueprint
+            can't be rendered in another process, in which case it should be
+            rendered in the current one.
+
+    """
+    if RENDER_PROCESSES <= 0 or blueprint.resolved_variables is None:
+        return None
+
+    class_path = _importable_class_path(type(blueprint))
+    if class_path is None:
+        return None
+
+    context = blueprint.context
+    context_args = {
+        "config": context.config.to_primitive(),
+        "environment": context.environment,
+        "stack_names": context.stack_names,
+        "force_stacks": context.force_stacks,
+        "config_path": context.config_path,
+    }
+    try:
+        payload = pickle.dumps(
+            (class_path, blueprint.name, blueprint.mappings,
+             blueprint.description, blueprint.resolved_variables,
+             context_args, context.hook_data),
+            pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.debug("Rendering %s in the current process, it can't be sent "
+                     "to a worker: %s", blueprint.name, e)
+        return None
+
+    try:
+        return _get_executor().submit(_render, list(sys.path),
+                                      payload).result()
+    except Exception as e:
+        logger.warning("Unable to render %s in a worker process, rendering "
+                       "it in the current process: %s", blueprint.name, e)
+        return None
@@ -48,6 +48,7 @@ class Stacker(BaseCommand):
         options.context = Context(
             environment=options.environment,
             config=config,
+            config_path=options.config.name,
             # Allow subcommands to provide any specific kwargs to the Context
             # that it wants.
             **options.get_context_kwargs(options)
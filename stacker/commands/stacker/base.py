@@ -5,7 +5,10 @@ from builtins import object
 import argparse
 import threading
 import signal
-from collections import Mapping
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 import logging
 
 from ...environment import parse_environment
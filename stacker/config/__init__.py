@@ -5,7 +5,11 @@ from future import standard_library
 standard_library.install_aliases()
 from builtins import str
 import copy
+import hashlib
+import json
 import logging
+import os
+import re
 import sys
 from io import StringIO
 from string import Template
@@ -30,8 +34,10 @@ from schematics.types import (
 
 import yaml
 
+from ..disk_cache import DiskCache, cache_key, get_cache_dir
 from ..lookups import register_lookup_handler
 from ..util import merge_map, yaml_to_ordered_dict, SourceProcessor
+from .. import __version__
 from .. import exceptions
 
 # register translators (yaml constructors)
@@ -39,6 +45,16 @@ from .translators import *  # NOQA
 
 logger = logging.getLogger(__name__)
 
+# The number of seconds validated configs are cached for in the
+# stacker_cache_dir. Caching is disabled by default, as the cached configs
+# hold every value rendered into them from the environment.
+CONFIG_CACHE_TTL = int(os.environ.get("STACKER_CONFIG_CACHE_TTL", 0))
+
+# Finds the stacker_cache_dir of a config before it is parsed, so the cache
+# can be used without parsing it
+CACHE_DIR_REGEX = re.compile(
+    r"""^stacker_cache_dir:[ \t]*['"]?([^'"\s#]+)""", re.MULTILINE)
+
 
 def render_parse_load(raw_config, environment=None, validate=True):
     """Encapsulates the render -> parse -> validate -> load process.
@@ -50,6 +66,12 @@ def render_parse_load(raw_config, environment=None, validate=True):
         validate (bool): if provided, the config is validated before being
             loaded.
 
+    When `STACKER_CONFIG_CACHE_TTL` is set, validated configs are cached in
+    the `stacker_cache_dir` for that many seconds, keyed by the rendered
+    config, the environment and the contents of any remote configs, and are
+    loaded without being parsed or validated again. Configs with values JSON
+    can't represent exactly, like dates, aren't cached.
+
     Returns:
         :class:`Config`: the parsed stacker config.
 
@@ -57,9 +79,39 @@ def render_parse_load(raw_config, environment=None, validate=True):
 
     pre_rendered = render(raw_config, environment)
 
-    rendered = process_remote_sources(pre_rendered, environment)
+    cache = key = cached = remote_configs = None
+    if CONFIG_CACHE_TTL > 0:
+        match = CACHE_DIR_REGEX.search(pre_rendered)
+        cache = DiskCache(
+            os.path.join(get_cache_dir(match and match.group(1)), "config"),
+            ttl=CONFIG_CACHE_TTL)
+        key = cache_key("config", __version__, pre_rendered, environment)
+        cached = cache.get(key)
+
+    if cached:
+        # Package sources are part of the rendered config, so they are the
+        # same as when the config was cached. They still need to be staged,
+        # to know if the remote configs changed.
+        remote_configs = stage_package_sources(
+            cached["package_sources"], cached["stacker_cache_dir"])
+        if _fingerprint(remote_configs) == cached["remote_configs"]:
+            logger.debug("Using cached config %s.", key)
+            return load(Config(cached["config"], strict=True))
+
+    # The config is only parsed once, remote configs are merged into the
+    # parsed config
+    config_dict = yaml_to_ordered_dict(pre_rendered)
+    package_sources = stacker_cache_dir = None
+    if config_dict:
+        package_sources = config_dict.get("package_sources")
+        stacker_cache_dir = config_dict.get("stacker_cache_dir")
+    if remote_configs is None:
+        remote_configs = stage_package_sources(
+            package_sources, stacker_cache_dir)
+    config_dict = merge_remote_configs(
+        config_dict, remote_configs, environment)
 
-    config = parse(rendered)
+    config = parse_dict(config_dict)
 
     # For backwards compatibility, if the config doesn't specify a namespace,
     # we fall back to fetching it from the environment, if provided.
@@ -75,10 +127,40 @@ def render_parse_load(raw_config, environment=None, validate=True):
 
     if validate:
         config.validate()
+        if cache:
+            primitive = config.to_primitive()
+            if _survives_json(primitive):
+                cache.set(key, {
+                    "config": primitive,
+                    "package_sources": package_sources,
+                    "stacker_cache_dir": stacker_cache_dir,
+                    "remote_configs": _fingerprint(remote_configs),
+                })
+            else:
+                logger.debug("Not caching config %s, it can't be stored as "
+                             "JSON unchanged.", key)
 
     return load(config)
 
 
+def _survives_json(value):
+    """Whether a value is loaded back unchanged after being dumped to JSON,
+    so it can be cached."""
+    try:
+        return json.loads(json.dumps(value)) == value
+    except (TypeError, ValueError):
+        return False
+
+
+def _fingerprint(paths):
+    """Return the paths and a hash of the contents of each of the files."""
+    fingerprint = []
+    for path in paths:
+        with open(path, "rb") as f:
+            fingerprint.append([path, hashlib.sha256(f.read()).hexdigest()])
+    return fingerprint
+
+
 def render(raw_config, environment=None):
     """Renders a config, using it as a template with the environment.
 
@@ -122,13 +204,25 @@ def parse(raw_config):
     Returns:
         :class:`Config`: the parsed stacker config.
 
+    """
+    return parse_dict(yaml_to_ordered_dict(raw_config))
+
+
+def parse_dict(config_dict):
+    """Build a stacker config from its parsed yaml.
+
+    Args:
+        config_dict (dict): the stacker configuration, as loaded from yaml.
+
+    Returns:
+        :class:`Config`: the parsed stacker config.
+
     """
 
     # Convert any applicable dictionaries back into lists
     # This is necessary due to the move from lists for these top level config
     # values to either lists or OrderedDicts.
     # Eventually we should probably just make them OrderedDicts only.
-    config_dict = yaml_to_ordered_dict(raw_config)
     if config_dict:
         for top_level_key in ['stacks', 'pre_build', 'post_build',
                               'pre_destroy', 'post_destroy']:
@@ -189,9 +283,79 @@ def dump(config):
         allow_unicode=True)
 
 
+def stage_package_sources(package_sources, stacker_cache_dir=None):
+    """Stage remote package sources.
+
+    Args:
+        package_sources (dict): the `package_sources` of the config.
+        stacker_cache_dir (str, optional): the `stacker_cache_dir` of the
+            config.
+
+    Returns:
+        list: the paths of the remote configs to merge into the config.
+
+    """
+    if not package_sources:
+        return []
+
+    processor = SourceProcessor(
+        sources=package_sources,
+        stacker_cache_dir=stacker_cache_dir
+    )
+    processor.get_package_sources()
+    return processor.configs_to_merge
+
+
+def merge_remote_configs(config, remote_configs, environment=None):
+    """Merge remote configs into a parsed config.
+
+    Args:
+        config (dict): the parsed stacker configuration.
+        remote_configs (list): the paths of the remote configs to merge, as
+            returned by :func:`stage_package_sources`.
+        environment (dict, optional): any environment values that should be
+            passed to the remote configs
+
+    Returns:
+        dict: the stacker configuration, with the remote configs merged in.
+
+    """
+    for i in remote_configs:
+        logger.debug("Merging in remote config \"%s\"", i)
+        with open(i) as f:
+            # Remote configs may use additional environment values
+            remote_config = yaml_to_ordered_dict(
+                render(f.read(), environment))
+        config = merge_map(remote_config, config)
+    return config
+
+
+def load_remote_sources(config, environment=None):
+    """Stage remote package sources and merge in remote configs.
+
+    Args:
+        config (dict): the parsed stacker configuration.
+        environment (dict, optional): any environment values that should be
+            passed to the remote configs
+
+    Returns:
+        dict: the stacker configuration, with any remote configs merged in.
+
+    """
+    if not config:
+        return config
+
+    remote_configs = stage_package_sources(
+        config.get('package_sources'), config.get('stacker_cache_dir'))
+    return merge_remote_configs(config, remote_configs, environment)
+
+
 def process_remote_sources(raw_config, environment=None):
     """Stage remote package sources and merge in remote configs.
 
+    This works on the raw config, see :func:`load_remote_sources` for the
+    equivalent working on the parsed config.
+
     Args:
         raw_config (str): the raw stacker configuration string.
         environment (dict, optional): any environment values that should be
@@ -274,6 +438,8 @@ class Hook(Model):
 
     args = DictType(AnyType)
 
+    requires = ListType(StringType, serialize_when_none=False)
+
 
 class BaseStack(Model):
     name = StringType(required=True)
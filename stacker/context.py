@@ -2,10 +2,19 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 from builtins import object
-import collections
 import logging
+import threading
+
+import os
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 from stacker.config import Config, ExternalStack as ExternalStackModel
+from .disk_cache import get_cache_dir
+from .util import get_config_directory
 from .stack import ExternalStack, Stack
 
 logger = logging.getLogger(__name__)
@@ -43,18 +52,23 @@ class Context(object):
             being operated on.
         force_stacks (list): A list of stacks to force work on. Used to work
             on locked stacks.
+        config_path (str): The path of the config file. Relative `file://`
+            paths are resolved from its directory.
 
     """
 
     def __init__(self, environment=None,
                  stack_names=None,
                  config=None,
-                 force_stacks=None):
+                 force_stacks=None,
+                 config_path=None):
         self.environment = environment
         self.stack_names = stack_names or []
         self.config = config or Config()
         self.force_stacks = force_stacks or []
+        self.config_path = config_path
         self.hook_data = {}
+        self._hook_data_lock = threading.Lock()
 
     @property
     def namespace(self):
@@ -74,6 +88,26 @@ class Context(object):
             return int(indent)
         return DEFAULT_TEMPLATE_INDENT
 
+    @property
+    def config_directory(self):
+        """The directory the config file is located in.
+
+        Falls back to parsing the command line arguments when the context
+        wasn't given a `config_path`.
+
+        """
+        if not hasattr(self, "_config_directory"):
+            if self.config_path is not None:
+                self._config_directory = os.path.dirname(self.config_path)
+            else:
+                self._config_directory = get_config_directory()
+        return self._config_directory
+
+    @property
+    def cache_dir(self):
+        """The directory stacker caches data in (`stacker_cache_dir`)."""
+        return get_cache_dir(self.config.stacker_cache_dir)
+
     @property
     def bucket_name(self):
         if not self.upload_templates_to_s3:
@@ -173,19 +207,22 @@ class Context(object):
     def set_hook_data(self, key, data):
         """Set hook data for the given key.
 
+        This is safe to call from the threads hooks run in.
+
         Args:
             key(str): The key to store the hook data in.
             data(:class:`collections.Mapping`): A dictionary of data to store,
                 as returned from a hook.
         """
 
-        if not isinstance(data, collections.Mapping):
+        if not isinstance(data, Mapping):
             raise ValueError("Hook (key: %s) data must be an instance of "
                              "collections.Mapping (a dictionary for "
                              "example)." % key)
 
-        if key in self.hook_data:
-            raise KeyError("Hook data for key %s already exists, each hook "
-                           "must have a unique data_key.", key)
+        with self._hook_data_lock:
+            if key in self.hook_data:
+                raise KeyError("Hook data for key %s already exists, each "
+                               "hook must have a unique data_key.", key)
 
-        self.hook_data[key] = data
+            self.hook_data[key] = data
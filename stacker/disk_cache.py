@@ -0,0 +1,190 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+from builtins import object
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join("~", ".stacker")
+
+# os.replace (atomic on every platform) is only available on python 3
+_replace = getattr(os, "replace", os.rename)
+
+
+def get_cache_dir(stacker_cache_dir=None):
+    """Return the directory stacker caches data in.
+
+    Args:
+        stacker_cache_dir (str, optional): the `stacker_cache_dir` from the
+            config, if any. Defaults to `~/.stacker`.
+
+    Returns:
+        str: the expanded path of the cache directory.
+
+    """
+    return os.path.expanduser(stacker_cache_dir or DEFAULT_CACHE_DIR)
+
+
+def ensure_directory(path):
+    """Create a directory (and its parents) if it doesn't exist yet, allowing
+    for other processes creating it at the same time."""
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+def cache_key(*parts):
+    """Build a cache key from JSON serializable parts.
+
+    Returns:
+        str: a hex digest identifying the given parts.
+
+    """
+    serialized = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class DiskCache(object):
+    """A cache of JSON serializable values, stored as one file per key.
+
+    Entries are written atomically, so the cache can be shared by concurrent
+    stacker processes. Caching is best effort: entries that can't be read or
+    written are treated as missing.
+
+    Args:
+        directory (str): the directory the entries are stored in. It is
+            created when the first entry is written.
+        ttl (int, optional): the number of seconds entries are valid for. If
+            not provided, entries never expire.
+
+    """
+
+    def __init__(self, directory, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key, default=None):
+        """Return the value stored for key, or default if it is missing or
+        expired."""
+        path = self._path(key)
+        try:
+            if self.ttl is not None and \
+                    time.time() - os.path.getmtime(path) > self.ttl:
+                return default
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return default
+
+    def set(self, key, value):
+        """Store value for key."""
+        try:
+            ensure_directory(self.directory)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory,
+                                            prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(value, f)
+                _replace(tmp_path, self._path(key))
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        except (IOError, OSError, TypeError, ValueError) as e:
+            logger.debug("Unable to write cache entry %s to %s: %s", key,
+                         self.directory, e)
+
+
+class FileLock(object):
+    """An exclusive lock on a file, held across processes.
+
+    Used as a context manager, it blocks until no other process (or thread)
+    holds the lock on the same path. The lock file is created if it doesn't
+    exist, and left behind when the lock is released.
+
+    Args:
+        path (str): the path of the lock file.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _try_lock(self, blocking):
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX
+            if not blocking:
+                flags |= fcntl.LOCK_NB
+            try:
+                fcntl.flock(self._file.fileno(), flags)
+            except (IOError, OSError):
+                if blocking:
+                    raise
+                return False
+            return True
+
+        mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+        self._file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._file.fileno(), mode, 1)
+                return True
+            except (IOError, OSError):
+                # LK_LOCK gives up after 10 seconds
+                if not blocking:
+                    return False
+
+    def acquire(self):
+        """Acquire the lock, waiting for other holders to release it."""
+        self._lock.acquire()
+        try:
+            ensure_directory(os.path.dirname(self.path))
+            self._file = open(self.path, "a")
+            if not self._try_lock(blocking=False):
+                logger.info("Waiting for another process to release %s",
+                            self.path)
+                self._try_lock(blocking=True)
+        except Exception:
+            self._close()
+            raise
+
+    def release(self):
+        """Release the lock."""
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._close()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -9,17 +9,20 @@ import os.path
 import stat
 import logging
 import hashlib
-from io import BytesIO as StringIO
-from zipfile import ZipFile, ZIP_DEFLATED
+import mmap
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP64_LIMIT
 import botocore
-import formic
-from troposphere.awslambda import Code
+from stacker.disk_cache import DiskCache, cache_key
+from stacker.hooks.patterns import find_files
 from stacker.session_cache import get_session
 
-from stacker.util import (
-    get_config_directory,
-    ensure_s3_bucket,
-)
+from stacker.util import ensure_s3_bucket
 
 
 """Mask to retrieve only UNIX file permissions from the external attributes
@@ -27,15 +30,142 @@ field of a ZIP entry.
 """
 ZIP_PERMS_MASK = (stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO) << 16
 
+# The size of the chunks files are read in when hashing them, and the size
+# from which they are mapped into memory instead
+READ_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# The number of seconds the digests of payload files are cached for in
+# stacker_cache_dir, to only read the files that changed since the last
+# build. 0 disables the cache.
+HASH_CACHE_TTL = int(os.environ.get("STACKER_LAMBDA_HASH_CACHE_TTL",
+                                    7 * 24 * 60 * 60))
+
+# The number of threads payload files are compressed in
+ZIP_CONCURRENCY = int(os.environ.get(
+    "STACKER_LAMBDA_ZIP_CONCURRENCY",
+    getattr(os, "cpu_count", lambda: 4)() or 4))
+
+# The number of functions that are packaged and uploaded at the same time
+FUNCTION_CONCURRENCY = int(
+    os.environ.get("STACKER_LAMBDA_FUNCTION_CONCURRENCY", 4))
+
+# Compressed files are kept in memory up to this size, and spilled to disk
+# when larger
+ZIP_SPOOL_SIZE = 8 * 1024 * 1024
+
+# The timestamp of the files in payloads, so the same files always produce
+# the same archive
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# The private ZipFile attributes _write_compressed uses to add members that
+# were compressed in other threads. Payloads are built with the public API
+# when any of them is missing. test_zip_files_public_api checks both ways
+# produce the same archive.
+ZIPFILE_INTERNALS = ('_writecheck', '_didModify', 'fp', 'start_dir',
+                     'filelist', 'NameToInfo')
+
 logger = logging.getLogger(__name__)
 
 
+def _file_mode(file_stat):
+    """Returns the UNIX permissions a file is stored with in the payload.
+
+    Only whether a file is executable or not matters, so files get mode 755
+    or 644 accordingly.
+    """
+    if file_stat.st_mode & stat.S_IXUSR != 0:
+        return 0o755
+    return 0o644
+
+
+def _compress_file(path):
+    """Compresses a file with the deflate method used in ZIP files.
+
+    Args:
+        path (str): the file to compress.
+
+    Returns:
+        tuple: the CRC-32 and size of the file, and a temporary file object
+            with the compressed data.
+
+    """
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                                  -15)
+    compressed = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE)
+    crc = 0
+    size = 0
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(READ_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            compressed.write(compressor.compress(chunk))
+    compressed.write(compressor.flush())
+    return crc & 0xffffffff, size, compressed
+
+
+def _archive_name(fname):
+    """Normalizes a file name the way ZipFile.write does."""
+    arcname = os.path.normpath(os.path.splitdrive(fname)[1])
+    while arcname[0] in (os.sep, os.altsep):
+        arcname = arcname[1:]
+    return arcname
+
+
+def _can_write_compressed(zip_file):
+    """Whether :func:`_write_compressed` can add members to a ZIP file.
+
+    ZipFile has no public way to add data that is already compressed, so
+    :func:`_write_compressed` relies on the ZipFile internals listed in
+    ``ZIPFILE_INTERNALS``. When a Python version lacks any of them, payloads
+    are written with the public ``ZipFile.open(..., 'w')`` instead, which
+    produces the same archive but compresses the files one at a time.
+    """
+    return all(hasattr(zip_file, attr) for attr in ZIPFILE_INTERNALS)
+
+
+def _write_compressed(zip_file, zip_info, crc, size, compressed):
+    """Adds a file compressed with :func:`_compress_file` to a ZIP file.
+
+    This does what ZipFile.write does once it has compressed a file: write
+    the local header and data, then register the member so it ends up in the
+    central directory. It must only be called when
+    :func:`_can_write_compressed` holds for ``zip_file``.
+    """
+    zip_info.compress_type = ZIP_DEFLATED
+    zip_info.CRC = crc
+    zip_info.file_size = size
+    zip_info.compress_size = compressed.tell()
+    zip64 = max(zip_info.file_size, zip_info.compress_size) > ZIP64_LIMIT
+
+    zip_file._writecheck(zip_info)
+    zip_file._didModify = True
+    zip_info.header_offset = zip_file.fp.tell()
+    zip_file.fp.write(zip_info.FileHeader(zip64))
+    compressed.seek(0)
+    shutil.copyfileobj(compressed, zip_file.fp, READ_CHUNK_SIZE)
+    zip_file.filelist.append(zip_info)
+    zip_file.NameToInfo[zip_info.filename] = zip_info
+    zip_file.start_dir = zip_file.fp.tell()
+
+
+def _write_file(zip_file, zip_info, path):
+    """Compresses a file into a ZIP file with the public ZipFile API."""
+    zip_info.compress_type = ZIP_DEFLATED
+    zip_info.file_size = os.path.getsize(path)
+    with open(path, "rb") as src, zip_file.open(zip_info, 'w') as dest:
+        shutil.copyfileobj(src, dest, READ_CHUNK_SIZE)
+
+
 def _zip_files(files, root):
-    """Generates a ZIP file in-memory from a list of files.
+    """Generates a ZIP file in a temporary file from a list of files.
 
-    Files will be stored in the archive with relative names, and have their
-    UNIX permissions forced to 755 or 644 (depending on whether they are
-    user-executable in the source filesystem).
+    Files will be stored in the archive with relative names, sorted, with a
+    fixed timestamp, and have their UNIX permissions forced to 755 or 644
+    (depending on whether they are user-executable in the source
+    filesystem), so the same files always produce the same archive. Files
+    are compressed in ``ZIP_CONCURRENCY`` threads, see
+    :func:`_can_write_compressed`.
 
     Args:
         files (list[str]): file names to add to the archive, relative to
@@ -43,59 +173,120 @@ def _zip_files(files, root):
         root (str): base directory to retrieve files from.
 
     Returns:
-        str: content of the ZIP file as a byte string.
-        str: A calculated hash of all the files.
+        file: a temporary file with the content of the ZIP file, positioned
+            at its start. It is deleted when closed.
 
     """
-    zip_data = StringIO()
-    with ZipFile(zip_data, 'w', ZIP_DEFLATED) as zip_file:
-        for fname in files:
-            zip_file.write(os.path.join(root, fname), fname)
-
-        # Fix file permissions to avoid any issues - only care whether a file
-        # is executable or not, choosing between modes 755 and 644 accordingly.
-        for zip_entry in zip_file.filelist:
-            perms = (zip_entry.external_attr & ZIP_PERMS_MASK) >> 16
-            if perms & stat.S_IXUSR != 0:
-                new_perms = 0o755
-            else:
-                new_perms = 0o644
+    payload = tempfile.TemporaryFile()
+    try:
+        workers = max(1, ZIP_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as executor, \
+                ZipFile(payload, 'w', ZIP_DEFLATED) as zip_file:
+            parallel = _can_write_compressed(zip_file)
+            pending = deque()
+            names = iter(sorted(files))
+            while True:
+                # Compress a few files ahead of the one being written, in
+                # order, keeping the number of compressed files held bounded
+                for fname in names:
+                    path = os.path.join(root, fname)
+                    future = None
+                    if parallel:
+                        future = executor.submit(_compress_file, path)
+                    pending.append((fname, os.stat(path), future))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+
+                fname, file_stat, future = pending.popleft()
+                zip_info = ZipInfo(_archive_name(fname),
+                                   date_time=ZIP_DATE_TIME)
+                zip_info.create_system = 3  # UNIX, for the permissions
+                zip_info.external_attr = \
+                    (stat.S_IFREG | _file_mode(file_stat)) << 16
+                if future is None:
+                    _write_file(zip_file, zip_info,
+                                os.path.join(root, fname))
+                    continue
+                crc, size, compressed = future.result()
+                with closing(compressed):
+                    _write_compressed(zip_file, zip_info, crc, size,
+                                      compressed)
+    except Exception:
+        payload.close()
+        raise
+
+    payload.seek(0)
+    return payload
+
+
+def _mtime_ns(file_stat):
+    """Returns the modification time of a file in nanoseconds."""
+    try:
+        return file_stat.st_mtime_ns
+    except AttributeError:  # python 2
+        return int(file_stat.st_mtime * 1e9)
 
-            if new_perms != perms:
-                logger.debug("lambda: fixing perms: %s: %o => %o",
-                             zip_entry.filename, perms, new_perms)
-                new_attr = ((zip_entry.external_attr & ~ZIP_PERMS_MASK) |
-                            (new_perms << 16))
-                zip_entry.external_attr = new_attr
 
-    contents = zip_data.getvalue()
-    zip_data.close()
-    content_hash = _calculate_hash(files, root)
+def _file_digest(path, size):
+    """Returns the md5 hex digest of the contents of a file.
 
-    return contents, content_hash
+    Files of at least ``MMAP_THRESHOLD`` bytes are mapped into memory rather
+    than read.
+    """
+    file_hash = hashlib.md5()
+    with open(path, "rb") as fd:
+        if size >= MMAP_THRESHOLD:
+            with closing(mmap.mmap(fd.fileno(), 0,
+                                   access=mmap.ACCESS_READ)) as data:
+                file_hash.update(data)
+        else:
+            for chunk in iter(lambda: fd.read(READ_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+    return file_hash.hexdigest()
 
 
-def _calculate_hash(files, root):
+def _calculate_hash(files, root, digests=None):
     """ Returns a hash of all of the given files at the given root.
 
+    The hash covers the names, modes and contents of the files, which is
+    everything that ends up in their ZIP archive, so it can be calculated
+    before building the archive.
+
     Args:
         files (list[str]): file names to include in the hash calculation,
             relative to ``root``.
         root (str): base directory to analyze files in.
+        digests (dict, optional): the digests of the files' contents from a
+            previous calculation, by file name. A file is only read again
+            when its size, modification time or inode changed. It is updated
+            in place to hold the digests of the given files.
 
     Returns:
         str: A hash of the hashes of the given files.
     """
+    previous = dict(digests or {})
+    if digests is not None:
+        digests.clear()
+
     file_hash = hashlib.md5()
     for fname in sorted(files):
         f = os.path.join(root, fname)
+        file_stat = os.stat(f)
+        signature = [file_stat.st_size, _mtime_ns(file_stat),
+                     file_stat.st_ino]
+        entry = previous.get(fname)
+        if entry and entry[0] == signature:
+            digest = entry[1]
+        else:
+            digest = _file_digest(f, file_stat.st_size)
+        if digests is not None:
+            digests[fname] = [signature, digest]
+
         file_hash.update((fname + "\0").encode())
-        with open(f, "rb") as fd:
-            for chunk in iter(lambda: fd.read(4096), ""):
-                if not chunk:
-                    break
-                file_hash.update(chunk)
-            file_hash.update("\0".encode())
+        file_hash.update(("%o\0" % _file_mode(file_stat)).encode())
+        file_hash.update((digest + "\0").encode())
 
     return file_hash.hexdigest()
 
@@ -120,22 +311,15 @@ def _find_files(root, includes, excludes, follow_symlinks):
         str: a file name relative to the root.
 
     Note:
-        Documentation for the patterns can be found at
-        http://www.aviser.asia/formic/doc/index.html
+        Documentation for the patterns can be found in
+        :mod:`stacker.hooks.patterns`.
     """
-
-    root = os.path.abspath(root)
-    file_set = formic.FileSet(
-        directory=root, include=includes,
-        exclude=excludes, symlinks=follow_symlinks,
-    )
-
-    for filename in file_set.qualified_files(absolute=False):
+    for filename in find_files(root, includes, excludes, follow_symlinks):
         yield filename
 
 
-def _zip_from_file_patterns(root, includes, excludes, follow_symlinks):
-    """Generates a ZIP file in-memory from file search patterns.
+def _find_payload_files(root, includes, excludes, follow_symlinks):
+    """Lists the files of a Lambda payload from file search patterns.
 
     Args:
         root (str): base directory to list files from.
@@ -147,8 +331,11 @@ def _zip_from_file_patterns(root, includes, excludes, follow_symlinks):
         follow_symlinks (bool): If true, symlinks will be included in the
             resulting zip file
 
+    Returns:
+        list[str]: the file names, relative to the root.
+
     See Also:
-        :func:`_zip_files`, :func:`_find_files`.
+        :func:`_find_files`.
 
     Raises:
         RuntimeError: when the generated archive would be empty.
@@ -166,7 +353,7 @@ def _zip_from_file_patterns(root, includes, excludes, follow_symlinks):
     for fname in files:
         logger.debug('lambda: + %s', fname)
 
-    return _zip_files(files, root)
+    return files
 
 
 def _head_object(s3_conn, bucket, key):
@@ -194,44 +381,114 @@ def _head_object(s3_conn, bucket, key):
             raise
 
 
-def _upload_code(s3_conn, bucket, prefix, name, contents, content_hash):
+def _upload_payload(s3_conn, bucket, key, payload):
+    """Uploads a ZIP file to S3."""
+    logger.info('lambda: uploading object %s to bucket %s', key, bucket)
+    # upload_fileobj closes the file it's given, so it gets a duplicate of
+    # the payload file, which can be uploaded again if needed
+    with os.fdopen(os.dup(payload.fileno()), 'rb') as payload_file:
+        payload_file.seek(0)
+        s3_conn.upload_fileobj(payload_file, bucket, key, ExtraArgs={
+            'ContentType': 'application/zip',
+            'ACL': 'authenticated-read',
+        })
+
+
+def _copy_payload(s3_conn, bucket, key, source_bucket):
+    """Copies a ZIP file from another bucket, within S3."""
+    logger.info('lambda: copying object %s from bucket %s to bucket %s', key,
+                source_bucket, bucket)
+    s3_conn.copy_object(Bucket=bucket, Key=key,
+                        CopySource={'Bucket': source_bucket, 'Key': key},
+                        ContentType='application/zip',
+                        MetadataDirective='REPLACE',
+                        ACL='authenticated-read')
+
+
+def _upload_code(targets, prefix, name, files, root, hash_cache=None):
     """Upload a ZIP file to S3 for use by Lambda.
 
     The key used for the upload will be unique based on the checksum of the
-    contents. No changes will be made if the contents in S3 already match the
-    expected contents.
+    files. The checksum is calculated from the files themselves, so the ZIP
+    file is only built and uploaded when the key doesn't exist yet.
+
+    When uploading to several buckets, the ZIP file is uploaded to one of
+    them, then copied to the others within S3 (concurrently). It is only
+    uploaded to a bucket directly when copying to it fails.
 
     Args:
-        s3_conn (botocore.client.S3): S3 connection to use for operations.
-        bucket (str): name of the bucket to create.
+        targets (list[tuple]): the S3 connection to use and the name of the
+            bucket, for each bucket to upload the file to.
         prefix (str): S3 prefix to prepend to the constructed key name for
             the uploaded file
         name (str): desired name of the Lambda function. Will be used to
             construct a key name for the uploaded file.
-        contents (str): byte string with the content of the file upload.
-        content_hash (str): md5 hash of the contents to be uploaded.
+        files (list[str]): file names to add to the archive, relative to
+            ``root``.
+        root (str): base directory to retrieve files from.
+        hash_cache (:class:`stacker.disk_cache.DiskCache`, optional): cache
+            to keep the digests of the files in between builds.
 
     Returns:
-        troposphere.awslambda.Code: CloudFormation Lambda Code object,
-        pointing to the uploaded payload in S3.
+        list[troposphere.awslambda.Code]: CloudFormation Lambda Code objects,
+        pointing to the uploaded payload in each bucket.
 
     Raises:
         botocore.exceptions.ClientError: any error from boto3 is passed
             through.
     """
 
+    digests = None
+    if hash_cache is not None:
+        digests_key = cache_key(name, root)
+        digests = hash_cache.get(digests_key, {})
+    content_hash = _calculate_hash(files, root, digests)
+    if hash_cache is not None:
+        hash_cache.set(digests_key, digests)
     logger.debug('lambda: ZIP hash: %s', content_hash)
     key = '{}lambda-{}-{}.zip'.format(prefix, name, content_hash)
 
-    if _head_object(s3_conn, bucket, key):
-        logger.info('lambda: object %s already exists, not uploading', key)
-    else:
-        logger.info('lambda: uploading object %s', key)
-        s3_conn.put_object(Bucket=bucket, Key=key, Body=contents,
-                           ContentType='application/zip',
-                           ACL='authenticated-read')
-
-    return Code(S3Bucket=bucket, S3Key=key)
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        existing = list(executor.map(
+            lambda target: _head_object(target[0], target[1], key) is not None,
+            targets))
+        missing = []
+        for target, exists in zip(targets, existing):
+            if exists:
+                logger.info('lambda: object %s already exists in bucket %s, '
+                            'not uploading', key, target[1])
+            else:
+                missing.append(target)
+
+        payload = None
+        try:
+            if missing and not any(existing):
+                s3_conn, source_bucket = missing.pop(0)
+                payload = _zip_files(files, root)
+                _upload_payload(s3_conn, source_bucket, key, payload)
+            elif missing:
+                source_bucket = targets[existing.index(True)][1]
+
+            copies = [(target, executor.submit(_copy_payload, target[0],
+                                               target[1], key, source_bucket))
+                      for target in missing]
+            for (s3_conn, bucket), future in copies:
+                try:
+                    future.result()
+                except botocore.exceptions.ClientError as e:
+                    logger.info('lambda: copying object %s to bucket %s '
+                                'failed, uploading it instead: %s', key,
+                                bucket, e)
+                    if payload is None:
+                        payload = _zip_files(files, root)
+                    _upload_payload(s3_conn, bucket, key, payload)
+        finally:
+            if payload is not None:
+                payload.close()
+
+    from troposphere.awslambda import Code
+
+    return [Code(S3Bucket=bucket, S3Key=key) for _, bucket in targets]
 
 
 def _check_pattern_list(patterns, key, default=None):
@@ -269,12 +526,14 @@ def _check_pattern_list(patterns, key, default=None):
                      'list of strings'.format(key))
 
 
-def _upload_function(s3_conn, bucket, prefix, name, options, follow_symlinks):
+def _upload_function(context, targets, prefix, name, options,
+                     follow_symlinks, hash_cache=None):
     """Builds a Lambda payload from user configuration and uploads it to S3.
 
     Args:
-        s3_conn (botocore.client.S3): S3 connection to use for operations.
-        bucket (str): name of the bucket to upload to.
+        context (:class:`stacker.context.Context`): the context of the hook.
+        targets (list[tuple]): the S3 connection to use and the name of the
+            bucket, for each bucket to upload the payload to.
         prefix (str): S3 prefix to prepend to the constructed key name for
             the uploaded file
         name (str): desired name of the Lambda function. Will be used to
@@ -285,17 +544,19 @@ def _upload_function(s3_conn, bucket, prefix, name, options, follow_symlinks):
                     base path to retrieve files from (mandatory). If not
                     absolute, it will be interpreted as relative to the stacker
                     configuration file directory, then converted to an absolute
-                    path. See :func:`stacker.util.get_config_directory`.
+                    path. See :attr:`stacker.context.Context.config_directory`.
                 * include:
                     file patterns to include in the payload (optional).
                 * exclude:
                     file patterns to exclude from the payload (optional).
         follow_symlinks  (bool): If true, symlinks will be included in the
             resulting zip file
+        hash_cache (:class:`stacker.disk_cache.DiskCache`, optional): cache
+            to keep the digests of the files in between builds.
 
     Returns:
-        troposphere.awslambda.Code: CloudFormation AWS Lambda Code object,
-        pointing to the uploaded object in S3.
+        list[troposphere.awslambda.Code]: CloudFormation AWS Lambda Code
+        objects, pointing to the uploaded object in each bucket.
 
     Raises:
         ValueError: if any configuration is invalid.
@@ -319,14 +580,11 @@ def _upload_function(s3_conn, bucket, prefix, name, options, follow_symlinks):
     # os.path.join will ignore other parameters if the right-most one is an
     # absolute path, which is exactly what we want.
     if not os.path.isabs(root):
-        root = os.path.abspath(os.path.join(get_config_directory(), root))
-    zip_contents, content_hash = _zip_from_file_patterns(root,
-                                                         includes,
-                                                         excludes,
-                                                         follow_symlinks)
+        root = os.path.abspath(os.path.join(context.config_directory, root))
+    files = _find_payload_files(root, includes, excludes, follow_symlinks)
 
-    return _upload_code(s3_conn, bucket, prefix, name, zip_contents,
-                        content_hash)
+    return _upload_code(targets, prefix, name, files, root,
+                        hash_cache=hash_cache)
 
 
 def select_bucket_region(custom_bucket, hook_region, stacker_bucket_region,
@@ -355,6 +613,60 @@ def select_bucket_region(custom_bucket, hook_region, stacker_bucket_region,
     return region or provider_region
 
 
+def _select_target(context, provider, custom_bucket, custom_bucket_region):
+    """Returns the bucket and region to upload functions to, from the
+    `bucket` and `bucket_region` arguments of the hook."""
+    if not custom_bucket:
+        bucket_name = context.bucket_name
+        logger.info("lambda: using default bucket from stacker: %s",
+                    bucket_name)
+    else:
+        bucket_name = custom_bucket
+        logger.info("lambda: using custom bucket: %s", bucket_name)
+
+    if not custom_bucket and custom_bucket_region:
+        raise ValueError("Cannot specify `bucket_region` without specifying "
+                         "`bucket`.")
+
+    bucket_region = select_bucket_region(
+        custom_bucket,
+        custom_bucket_region,
+        context.config.stacker_bucket_region,
+        provider.region
+    )
+    return bucket_name, bucket_region
+
+
+def _check_targets(targets):
+    """Validates the `targets` argument of the hook.
+
+    Args:
+        targets: input from user configuration (YAML).
+
+    Returns:
+        list[tuple]: the bucket and region of each target.
+
+    Raises:
+        ValueError: if the input is unacceptable.
+    """
+    if not isinstance(targets, list):
+        raise ValueError('targets option must be a list')
+
+    checked = []
+    for target in targets:
+        try:
+            checked.append((target['bucket'], target['bucket_region']))
+        except (KeyError, TypeError):
+            raise ValueError("Each of the targets must have a `bucket` and a "
+                             "`bucket_region`.")
+
+    regions = [bucket_region for _, bucket_region in checked]
+    if len(set(regions)) != len(regions):
+        raise ValueError("Each of the targets must be in a different "
+                         "region.")
+    return checked
+
+
 def upload_lambda_functions(context, provider, **kwargs):
     """Builds Lambda payloads from user configuration and uploads them to S3.
 
@@ -372,6 +684,15 @@ def upload_lambda_functions(context, provider, **kwargs):
     with the key containing it's checksum, to allow repeated uploads to be
     skipped in subsequent runs.
 
+    Functions are packaged and uploaded concurrently, up to
+    ``STACKER_LAMBDA_FUNCTION_CONCURRENCY`` (4 by default) at a time. The
+    results are returned in the order the functions are configured in.
+
+    The digests of the payload files are cached in `stacker_cache_dir` for
+    ``STACKER_LAMBDA_HASH_CACHE_TTL`` seconds (a week by default, 0 disables
+    the cache), so only files whose size, modification time or inode changed
+    are read again to calculate the checksum.
+
     The configuration settings are documented as keyword arguments below.
 
     Keyword Arguments:
@@ -381,6 +702,13 @@ def upload_lambda_functions(context, provider, **kwargs):
             exist. If not given, the region will be either be that of the
             global `stacker_bucket_region` setting, or else the region in
             use by the provider.
+        targets (list[dict], optional): Buckets to upload functions to, in
+            several regions, instead of `bucket` and `bucket_region`. Each
+            target is a dictionary with a ``bucket`` and a ``bucket_region``,
+            and must be in a different region. Each function is packaged
+            once, uploaded to one of the buckets and copied to the others
+            within S3. The hook data then holds, for each function, a
+            dictionary of Code objects by region.
         prefix (str, optional): S3 key prefix to prepend to the uploaded
             zip name.
         follow_symlinks (bool, optional): Will determine if symlinks should
@@ -448,6 +776,22 @@ def upload_lambda_functions(context, provider, **kwargs):
                         - '*.pyc'
                         - test/
 
+        .. Uploading to several regions.
+        .. code-block:: yaml
+
+            pre_build:
+              - path: stacker.hooks.aws_lambda.upload_lambda_functions
+                data_key: lambda
+                args:
+                  targets:
+                    - bucket: custom-bucket-us-east-1
+                      bucket_region: us-east-1
+                    - bucket: custom-bucket-eu-west-1
+                      bucket_region: eu-west-1
+                  functions:
+                    MyFunction:
+                      path: ./lambda_functions
+
         .. Blueprint usage
         .. code-block:: python
 
@@ -468,43 +812,57 @@ def upload_lambda_functions(context, provider, **kwargs):
                         )
                     )
     """
-    custom_bucket = kwargs.get('bucket')
-    if not custom_bucket:
-        bucket_name = context.bucket_name
-        logger.info("lambda: using default bucket from stacker: %s",
-                    bucket_name)
+    targets = kwargs.get('targets')
+    replicate = bool(targets)
+    if replicate:
+        if kwargs.get('bucket') or kwargs.get('bucket_region'):
+            raise ValueError("Cannot specify `bucket` or `bucket_region` "
+                             "with `targets`.")
+        targets = _check_targets(targets)
     else:
-        bucket_name = custom_bucket
-        logger.info("lambda: using custom bucket: %s", bucket_name)
-
-    custom_bucket_region = kwargs.get("bucket_region")
-    if not custom_bucket and custom_bucket_region:
-        raise ValueError("Cannot specify `bucket_region` without specifying "
-                         "`bucket`.")
-
-    bucket_region = select_bucket_region(
-        custom_bucket,
-        custom_bucket_region,
-        context.config.stacker_bucket_region,
-        provider.region
-    )
+        targets = [_select_target(context, provider, kwargs.get('bucket'),
+                                  kwargs.get('bucket_region'))]
 
     # Check if we should walk / follow symlinks
     follow_symlinks = kwargs.get('follow_symlinks', False)
     if not isinstance(follow_symlinks, bool):
         raise ValueError('follow_symlinks option must be a boolean')
 
-    # Always use the global client for s3
-    session = get_session(bucket_region)
-    s3_client = session.client('s3')
-
-    ensure_s3_bucket(s3_client, bucket_name, bucket_region)
+    s3_targets = []
+    for bucket_name, bucket_region in targets:
+        # Always use the global client for s3
+        session = get_session(bucket_region)
+        s3_client = session.client('s3')
+        ensure_s3_bucket(s3_client, bucket_name, bucket_region)
+        s3_targets.append((s3_client, bucket_name))
 
     prefix = kwargs.get('prefix', '')
 
-    results = {}
-    for name, options in kwargs['functions'].items():
-        results[name] = _upload_function(s3_client, bucket_name, prefix, name,
-                                         options, follow_symlinks)
+    hash_cache = None
+    if HASH_CACHE_TTL > 0:
+        hash_cache = DiskCache(
+            os.path.join(context.cache_dir, 'lambda-hashes'),
+            ttl=HASH_CACHE_TTL)
+
+    functions = list(kwargs['functions'].items())
+    workers = max(1, min(FUNCTION_CONCURRENCY, len(functions)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (name, executor.submit(_upload_function, context, s3_targets,
+                                   prefix, name, options, follow_symlinks,
+                                   hash_cache=hash_cache))
+            for name, options in functions
+        ]
+        try:
+            codes = [(name, future.result()) for name, future in futures]
+        except Exception:
+            for _, future in futures:
+                future.cancel()
+            raise
+
+    if not replicate:
+        return OrderedDict((name, code) for name, (code,) in codes)
 
-    return results
+    regions = [bucket_region for _, bucket_region in targets]
+    return OrderedDict((name, OrderedDict(zip(regions, function_codes)))
+                       for name, function_codes in codes)
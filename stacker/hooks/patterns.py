@@ -0,0 +1,285 @@
+"""Matching of files against Ant style glob patterns.
+
+Patterns follow the semantics of Apache Ant's FileSet (and of the formic
+library stacker used to rely on):
+
+* ``*`` and ``?`` match any characters, or a single character, within a file
+  or directory name, and ``[...]`` matches a set of characters.
+* ``**`` matches any number of directories, including none.
+* Patterns that don't start with a ``/`` match at any depth: ``*.py`` is the
+  same as ``**/*.py``.
+* A trailing ``/`` is shorthand for ``/**``: ``test/`` matches every file
+  inside of ``test`` directories, and files named ``test``.
+
+Patterns are compiled into regular expressions once, and directories that
+can't contain any included file, or whose files are all excluded, are
+skipped without being listed.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+from builtins import object
+import os
+import re
+
+try:
+    from os import scandir
+except ImportError:  # python < 3.5
+    from scandir import scandir
+
+# Files that are always excluded, as by Ant (and formic)
+DEFAULT_EXCLUDES = [
+    "**/__pycache__/**/*",
+    "**/*~",
+    "**/#*#",
+    "**/.#*",
+    "**/%*%",
+    "**/._*",
+    "**/CVS",
+    "**/CVS/**/*",
+    "**/.cvsignore",
+    "**/SCCS",
+    "**/SCCS/**/*",
+    "**/vssver.scc",
+    "**/.svn",
+    "**/.svn/**/*",
+    "**/.DS_Store",
+    "**/.git",
+    "**/.git/**/*",
+    "**/.gitattributes",
+    "**/.gitignore",
+    "**/.gitmodules",
+    "**/.hg",
+    "**/.hg/**/*",
+    "**/.hgignore",
+    "**/.hgsub",
+    "**/.hgsubstate",
+    "**/.hgtags",
+    "**/.bzr",
+    "**/.bzr/**/*",
+    "**/.bzrignore",
+]
+
+# Names are matched case insensitively where the filesystem is
+_FLAGS = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+
+# Matches any number of directories
+_ANY_DIRECTORIES = "(?:[^/]+/)*"
+
+
+def _translate(element):
+    """Translate a glob for a single file or directory name to a regex.
+
+    This is :func:`fnmatch.translate`, except that wildcards don't match
+    path separators.
+    """
+    i, n = 0, len(element)
+    result = []
+    while i < n:
+        c = element[i]
+        i += 1
+        if c == "*":
+            result.append("[^/]*")
+        elif c == "?":
+            result.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and element[j] == "!":
+                j += 1
+            if j < n and element[j] == "]":
+                j += 1
+            while j < n and element[j] != "]":
+                j += 1
+            if j >= n:
+                result.append("\\[")
+            else:
+                chars = element[i:j].replace("\\", "\\\\")
+                i = j + 1
+                if chars[0] == "!":
+                    chars = "^" + chars[1:]
+                elif chars[0] == "^":
+                    chars = "\\" + chars
+                result.append("[%s]" % chars)
+        else:
+            result.append(re.escape(c))
+    return "".join(result)
+
+
+def _split(glob):
+    """Split a glob into its normalized elements.
+
+    The elements always start with ``**`` unless the glob is bound to the
+    root directory, and a trailing ``/`` is replaced by ``**``.
+    """
+    elements = []
+    for element in glob.replace("\\", "/").replace("//", "/").split("/"):
+        if element == "..":
+            raise ValueError("Invalid glob: cannot have '..' in a glob: "
+                             "%s" % glob)
+        elif element == ".":
+            continue
+        elif element == "**" and elements and elements[-1] == "**":
+            continue
+        elements.append(element)
+
+    if elements[-1] == "":
+        elements[-1] = "**"
+    if elements[0] == "":
+        del elements[0]
+    elif elements[0] != "**":
+        elements.insert(0, "**")
+    return elements
+
+
+class Pattern(object):
+    """A single compiled glob.
+
+    Args:
+        elements (list[str]): the normalized elements of the glob, the last
+            one of which is matched against file names.
+
+    """
+
+    def __init__(self, elements):
+        if elements[-1] == "**":
+            directories, file_pattern = elements, "*"
+        else:
+            directories, file_pattern = elements[:-1], elements[-1]
+
+        regex = "".join(_ANY_DIRECTORIES if d == "**" else _translate(d) + "/"
+                        for d in directories)
+        self.regex = re.compile(regex + _translate(file_pattern) + r"\Z",
+                                _FLAGS)
+
+        # Patterns matching every file below some directories, like
+        # "node_modules/**", let those directories be skipped altogether
+        self.subtree_regex = None
+        if file_pattern == "*" and directories and directories[-1] == "**":
+            self.subtree_regex = re.compile(regex + r"\Z", _FLAGS)
+
+        # The directory elements before the first "**", which every
+        # directory containing matching files must start with
+        if "**" in directories:
+            prefix = directories[:directories.index("**")]
+            self.max_depth = None
+        else:
+            prefix = directories
+            self.max_depth = len(directories)
+        self.prefix = [re.compile(_translate(d) + r"\Z", _FLAGS)
+                       for d in prefix]
+
+    @classmethod
+    def create(cls, glob):
+        """Compile a glob.
+
+        Args:
+            glob (str): an Ant style glob.
+
+        Returns:
+            list[:class:`Pattern`]: the patterns the glob matches files with.
+
+        """
+        elements = _split(glob)
+        patterns = [cls(elements)]
+        if len(elements) > 1 and elements[-1] == "**":
+            # "test/**" also matches files named "test"
+            patterns.append(cls(elements[:-1]))
+        return patterns
+
+    def match(self, path):
+        """Whether a file matches the pattern.
+
+        Args:
+            path (str): the path of the file, relative to the root directory,
+                separated by ``/``.
+
+        """
+        return self.regex.match(path) is not None
+
+    def matches_subtree(self, directory):
+        """Whether the pattern matches every file below a directory.
+
+        Args:
+            directory (str): the path of the directory, relative to the root
+                directory, separated and ending with ``/``.
+
+        """
+        return self.subtree_regex is not None and \
+            self.subtree_regex.match(directory) is not None
+
+    def may_match_below(self, parts):
+        """Whether the pattern may match files below a directory.
+
+        Args:
+            parts (list[str]): the names of the directory and its parents,
+                relative to the root directory.
+
+        """
+        if self.max_depth is not None and len(parts) > self.max_depth:
+            return False
+        return all(regex.match(part)
+                   for regex, part in zip(self.prefix, parts))
+
+
+def compile_patterns(globs):
+    """Compile a list of globs into patterns.
+
+    Args:
+        globs (list[str]): Ant style globs.
+
+    Returns:
+        list[:class:`Pattern`]: the compiled patterns.
+
+    """
+    patterns = []
+    for glob in globs:
+        patterns.extend(Pattern.create(glob))
+    return patterns
+
+
+def find_files(root, includes, excludes=None, follow_symlinks=False,
+               default_excludes=True):
+    """List the files inside a directory matching glob patterns.
+
+    Args:
+        root (str): the directory to list files from.
+        includes (list[str]): inclusion patterns. Only files matching those
+            patterns are listed.
+        excludes (list[str], optional): exclusion patterns. Files matching
+            those patterns are not listed, regardless of the inclusions.
+        follow_symlinks (bool, optional): whether to list symlinked files
+            and descend into symlinked directories.
+        default_excludes (bool, optional): whether to also exclude
+            `DEFAULT_EXCLUDES`.
+
+    Yields:
+        str: the paths of the files, relative to the root (eg: ``./a/b.py``).
+
+    """
+    include = compile_patterns(includes)
+    excludes = list(excludes or [])
+    if default_excludes:
+        excludes.extend(DEFAULT_EXCLUDES)
+    exclude = compile_patterns(excludes)
+
+    directories = [(os.path.abspath(root), [])]
+    while directories:
+        path, parts = directories.pop()
+        relative = "".join(part + "/" for part in parts)
+        for entry in scandir(path):
+            if not follow_symlinks and entry.is_symlink():
+                continue
+
+            if entry.is_dir():
+                sub_parts = parts + [entry.name]
+                sub_relative = relative + entry.name + "/"
+                if any(p.may_match_below(sub_parts) for p in include) and \
+                        not any(p.matches_subtree(sub_relative)
+                                for p in exclude):
+                    directories.append((entry.path, sub_parts))
+                continue
+
+            name = relative + entry.name
+            if any(p.match(name) for p in include) and \
+                    not any(p.match(name) for p in exclude):
+                yield os.path.join(".", *(parts + [entry.name]))
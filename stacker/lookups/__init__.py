@@ -8,6 +8,7 @@ import re
 # export resolve_lookups at this level
 from .registry import resolve_lookups  # NOQA
 from .registry import register_lookup_handler  # NOQA
+from .registry import submit_lookups  # NOQA
 
 # TODO: we can remove the optionality of of the type in a later release, it
 #       is only included to allow for an error to be thrown while people are
@@ -26,6 +27,26 @@ LOOKUP_REGEX = re.compile("""
 Lookup = namedtuple("Lookup", ("type", "input", "raw"))
 
 
+def iter_lookups_from_string(value):
+    """Iterate over the lookups within a string, in order of appearance.
+
+    Args:
+        value (str): string value we're extracting lookups from
+
+    Yields:
+        tuple: (start, end, :class:`stacker.lookups.Lookup`) for each lookup,
+            where start and end are the position of the lookup (including the
+            surrounding `${}`) within the string.
+
+    """
+    if "${" not in value:
+        return
+    for match in LOOKUP_REGEX.finditer(value):
+        lookup = Lookup(match.group("type"), match.group("input"),
+                        match.group(1))
+        yield match.start(), match.end(), lookup
+
+
 def extract_lookups_from_string(value):
     """Extract any lookups within a string.
 
@@ -36,14 +57,18 @@ def extract_lookups_from_string(value):
         list: list of :class:`stacker.lookups.Lookup` if any
 
     """
-    lookups = set()
-    for match in LOOKUP_REGEX.finditer(value):
-        groupdict = match.groupdict()
-        raw = match.groups()[0]
-        lookup_type = groupdict["type"]
-        lookup_input = groupdict["input"]
-        lookups.add(Lookup(lookup_type, lookup_input, raw))
-    return lookups
+    return set(lookup for _, _, lookup in iter_lookups_from_string(value))
+
+
+def _extract_lookups(value, lookups):
+    if isinstance(value, basestring):
+        lookups.update(extract_lookups_from_string(value))
+    elif isinstance(value, list):
+        for v in value:
+            _extract_lookups(v, lookups)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _extract_lookups(v, lookups)
 
 
 def extract_lookups(value):
@@ -58,12 +83,5 @@ def extract_lookups(value):
 
     """
     lookups = set()
-    if isinstance(value, basestring):
-        lookups = lookups.union(extract_lookups_from_string(value))
-    elif isinstance(value, list):
-        for v in value:
-            lookups = lookups.union(extract_lookups(v))
-    elif isinstance(value, dict):
-        for v in value.values():
-            lookups = lookups.union(extract_lookups(v))
+    _extract_lookups(value, lookups)
     return lookups
@@ -2,13 +2,58 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 from stacker.session_cache import get_session
+import os
 import re
 import operator
+import threading
 
+from ...disk_cache import DiskCache, cache_key
 from ...util import read_value_from_path
 
 TYPE_NAME = "ami"
 
+# The number of seconds a matching image id is cached on disk (in the
+# `stacker_cache_dir`) and shared between stacker runs. Setting it to 0
+# disables the on disk cache; images are always shared within a run.
+AMI_CACHE_TTL = int(os.environ.get("STACKER_AMI_CACHE_TTL", 300))
+
+# DescribeImages results shared by every lookup within a run, keyed by the
+# arguments of the call and sorted newest first.
+_images = {}
+_images_locks = {}
+_lock = threading.Lock()
+
+
+def clear_cache():
+    """Forget the images fetched so far in this run."""
+    with _lock:
+        _images.clear()
+        _images_locks.clear()
+
+
+def _describe_images(region, describe_args):
+    key = cache_key(region, describe_args)
+    with _lock:
+        key_lock = _images_locks.setdefault(key, threading.Lock())
+
+    # Concurrent lookups with the same arguments wait for the first one to
+    # fetch the images, instead of each calling DescribeImages.
+    with key_lock:
+        if key not in _images:
+            ec2 = get_session(region).client('ec2')
+            result = ec2.describe_images(**describe_args)
+            _images[key] = sorted(result['Images'],
+                                  key=operator.itemgetter('CreationDate'),
+                                  reverse=True)
+        return _images[key]
+
+
+def _disk_cache(context):
+    if context is None or AMI_CACHE_TTL <= 0:
+        return None
+    return DiskCache(os.path.join(context.cache_dir, "lookups", TYPE_NAME),
+                     ttl=AMI_CACHE_TTL)
+
 
 class ImageNotFound(Exception):
     def __init__(self, search_string):
@@ -45,16 +90,18 @@ def handler(value, provider, **kwargs):
 
         Any other arguments specified are sent as filters to the aws api
         For example, "architecture:x86_64" will add a filter
+
+    Matching image ids are cached in the `stacker_cache_dir` for
+    `STACKER_AMI_CACHE_TTL` seconds (300 by default, 0 disables the cache),
+    and images returned by the AWS api are shared by all lookups in a run.
     """  # noqa
-    value = read_value_from_path(value)
+    value = read_value_from_path(value, context=kwargs.get("context"))
 
     if "@" in value:
         region, value = value.split("@", 1)
     else:
         region = provider.region
 
-    ec2 = get_session(region).client('ec2')
-
     values = {}
     describe_args = {}
 
@@ -79,16 +126,22 @@ def handler(value, provider, **kwargs):
         describe_args["ExecutableUsers"] = executable_users
 
     filters = []
-    for k, v in values.items():
+    for k, v in sorted(values.items()):
         filters.append({"Name": k, "Values": v.split(',')})
     describe_args["Filters"] = filters
 
-    result = ec2.describe_images(**describe_args)
-
-    images = sorted(result['Images'], key=operator.itemgetter('CreationDate'),
-                    reverse=True)
-    for image in images:
-        if re.match("^%s$" % name_regex, image['Name']):
+    disk_cache = _disk_cache(kwargs.get("context"))
+    key = cache_key(region, owners, filters, executable_users, name_regex)
+    if disk_cache:
+        image_id = disk_cache.get(key)
+        if image_id:
+            return image_id
+
+    pattern = re.compile("^%s$" % name_regex)
+    for image in _describe_images(region, describe_args):
+        if pattern.match(image['Name']):
+            if disk_cache:
+                disk_cache.set(key, image['ImageId'])
             return image['ImageId']
 
     raise ImageNotFound(value)
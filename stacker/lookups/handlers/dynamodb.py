@@ -21,7 +21,7 @@ def handler(value, **kwargs):
     Note: The region is optional, and defaults to the environment's
     `AWS_DEFAULT_REGION` if not specified.
     """
-    value = read_value_from_path(value)
+    value = read_value_from_path(value, context=kwargs.get("context"))
     table_info = None
     table_keys = None
     region = None
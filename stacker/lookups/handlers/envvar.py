@@ -29,7 +29,7 @@ def handler(value, **kwargs):
         # Both of the above would resolve to
         conf_key: ENV_VALUE
     """
-    value = read_value_from_path(value)
+    value = read_value_from_path(value, context=kwargs.get("context"))
 
     try:
         return os.environ[value]
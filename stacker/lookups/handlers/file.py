@@ -13,8 +13,6 @@ except ImportError:
 
 import yaml
 
-from troposphere import GenericHelperFn, Base64
-
 from ...util import read_value_from_path
 
 
@@ -107,7 +105,7 @@ def handler(value, **kwargs):
             " \"<codec>:<path>\" (got %s)" % (value)
         )
 
-    value = read_value_from_path(path)
+    value = read_value_from_path(path, context=kwargs.get("context"))
 
     return CODECS[codec](value)
 
@@ -139,6 +137,8 @@ def _parameterize_string(raw):
         return raw
 
     parts.append(raw[s_index:])
+    from troposphere import GenericHelperFn
+
     return GenericHelperFn({u"Fn::Join": [u"", parts]})
 
 
@@ -164,7 +164,10 @@ def parameterized_codec(raw, b64):
     # Note, since we want a raw JSON object (not a string) output in the
     # template, we wrap the result in GenericHelperFn (not needed if we're
     # using Base64)
-    return Base64(result.data) if b64 else result
+    if b64:
+        from troposphere import Base64
+        return Base64(result.data)
+    return result
 
 
 def _parameterize_obj(obj):
@@ -45,7 +45,7 @@ def handler(value, **kwargs):
         conf_key: PASSWORD
 
     """
-    value = read_value_from_path(value)
+    value = read_value_from_path(value, context=kwargs.get("context"))
 
     region = None
     if "@" in value:
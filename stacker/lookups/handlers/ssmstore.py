@@ -37,7 +37,7 @@ def handler(value, **kwargs):
         conf_key: PASSWORD
 
     """
-    value = read_value_from_path(value)
+    value = read_value_from_path(value, context=kwargs.get("context"))
 
     region = "us-east-1"
     if "@" in value:
@@ -2,37 +2,170 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 from past.builtins import basestring
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import os
+import threading
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 from ..exceptions import UnknownLookupType
 from ..util import load_object_from_string
 
-from .handlers import output
-from .handlers import kms
-from .handlers import xref
-from .handlers import ssmstore
-from .handlers import dynamodb
-from .handlers import envvar
-from .handlers import rxref
-from .handlers import ami
-from .handlers import file as file_handler
-from .handlers import split
-from .handlers import default
-from .handlers import hook_data
+logger = logging.getLogger(__name__)
+
+# The entry point group third party packages register lookup handlers under
+ENTRY_POINT_GROUP = "stacker.lookups"
+
+# Built-in lookup handlers, which are imported the first time they are used
+BUILTIN_LOOKUP_HANDLERS = {
+    "output": "stacker.lookups.handlers.output.handler",
+    "kms": "stacker.lookups.handlers.kms.handler",
+    "ssmstore": "stacker.lookups.handlers.ssmstore.handler",
+    "envvar": "stacker.lookups.handlers.envvar.handler",
+    "xref": "stacker.lookups.handlers.xref.handler",
+    "rxref": "stacker.lookups.handlers.rxref.handler",
+    "ami": "stacker.lookups.handlers.ami.handler",
+    "file": "stacker.lookups.handlers.file.handler",
+    "split": "stacker.lookups.handlers.split.handler",
+    "default": "stacker.lookups.handlers.default.handler",
+    "hook_data": "stacker.lookups.handlers.hook_data.handler",
+    "dynamodb": "stacker.lookups.handlers.dynamodb.handler",
+}
+
+# Built-in lookup types whose values don't depend on the outputs of stacks in
+# the current plan. These can be resolved before the plan is walked.
+OUTPUT_INDEPENDENT_LOOKUP_TYPES = frozenset([
+    "ssmstore",
+    "kms",
+    "ami",
+    "dynamodb",
+    "envvar",
+    "file",
+    "xref",
+])
+
+# The maximum number of lookups that will be resolved concurrently. Most
+# lookups are network bound (kms, ssmstore, dynamodb, ...), so they are
+# resolved on a shared pool of I/O threads, which is bounded regardless of how
+# many stacks are being resolved at the same time.
+#
+# This can be controlled via an environment variable. Setting it to 1 resolves
+# lookups sequentially on the calling thread.
+LOOKUP_CONCURRENCY = int(os.environ.get("STACKER_LOOKUP_CONCURRENCY", 10))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Flags the threads owned by the lookup pool, so that a handler which resolves
+# lookups itself doesn't wait on the pool it is running in.
+_pool_thread = threading.local()
+
+
+def _iter_entry_points(group):
+    """Yield the entry points registered under the given group."""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        import pkg_resources
+        for entry_point in pkg_resources.iter_entry_points(group):
+            yield entry_point
+        return
+
+    entry_points = entry_points()
+    if hasattr(entry_points, "select"):
+        # python 3.10+
+        selected = entry_points.select(group=group)
+    else:
+        selected = entry_points.get(group, [])
+    for entry_point in selected:
+        yield entry_point
+
+
+class LookupHandlers(MutableMapping):
+    """The registered lookup handlers, by lookup type.
+
+    Handlers can be registered as a function, an import path or an entry
+    point, and are only imported when they are first looked up. Lookup types
+    that aren't registered are searched for in the `stacker.lookups` entry
+    point group, which is only loaded the first time an unknown type is used.
+    """
+
+    def __init__(self, handlers=None):
+        self._handlers = dict(handlers or {})
+        self._entry_points_loaded = False
+        # Lookups are resolved from several threads, so the entry points and
+        # the handlers imported lazily are only loaded by one of them
+        self._lock = threading.RLock()
+
+    def _load_entry_points(self):
+        try:
+            entry_points = list(_iter_entry_points(ENTRY_POINT_GROUP))
+        except Exception as e:
+            logger.warning("Unable to load the %s entry points: %s",
+                           ENTRY_POINT_GROUP, e)
+            entry_points = []
+        for entry_point in entry_points:
+            # Explicitly registered handlers take precedence
+            if entry_point.name not in self._handlers:
+                logger.debug("Found lookup handler %s in entry point %s.",
+                             entry_point.name, entry_point)
+                self._handlers[entry_point.name] = entry_point
+        self._entry_points_loaded = True
+
+    def __getitem__(self, lookup_type):
+        handler = self._handlers.get(lookup_type)
+        if callable(handler):
+            return handler
+
+        with self._lock:
+            if lookup_type not in self._handlers and \
+                    not self._entry_points_loaded:
+                self._load_entry_points()
+
+            handler = self._handlers[lookup_type]
+            if isinstance(handler, basestring):
+                handler = load_object_from_string(handler)
+                self._handlers[lookup_type] = handler
+            elif not callable(handler) and hasattr(handler, "load"):
+                handler = handler.load()
+                self._handlers[lookup_type] = handler
+            return handler
+
+    def __setitem__(self, lookup_type, handler):
+        self._handlers[lookup_type] = handler
+
+    def __delitem__(self, lookup_type):
+        del self._handlers[lookup_type]
+
+    def __contains__(self, lookup_type):
+        return lookup_type in self._handlers
+
+    def __iter__(self):
+        return iter(self._handlers)
 
-LOOKUP_HANDLERS = {}
+    def __len__(self):
+        return len(self._handlers)
+
+
+LOOKUP_HANDLERS = LookupHandlers(BUILTIN_LOOKUP_HANDLERS)
 
 
 def register_lookup_handler(lookup_type, handler_or_path):
     """Register a lookup handler.
 
+    Handlers given as a path aren't imported until a lookup of their type is
+    resolved.
+
     Args:
         lookup_type (str): Name to register the handler under
         handler_or_path (OneOf[func, str]): a function or a path to a handler
 
     """
-    handler = handler_or_path
-    if isinstance(handler_or_path, basestring):
-        handler = load_object_from_string(handler_or_path)
-    LOOKUP_HANDLERS[lookup_type] = handler
+    LOOKUP_HANDLERS[lookup_type] = handler_or_path
 
 
 def unregister_lookup_handler(lookup_type):
@@ -45,7 +178,90 @@ def unregister_lookup_handler(lookup_type):
         lookup_type (str): Name of the lookup type to unregister
 
     """
-    LOOKUP_HANDLERS.pop(lookup_type, None)
+    if lookup_type in LOOKUP_HANDLERS:
+        del LOOKUP_HANDLERS[lookup_type]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LOOKUP_CONCURRENCY)
+        return _executor
+
+
+def resolve_lookup(lookup, context, provider):
+    """Resolve a single lookup with its registered handler.
+
+    Args:
+        lookup (:class:`stacker.lookups.Lookup`): the lookup to resolve
+        context (:class:`stacker.context.Context`): stacker context
+        provider (:class:`stacker.provider.base.BaseProvider`): subclass of the
+            base provider
+
+    Returns:
+        The value returned by the lookup handler.
+
+    Raises:
+        UnknownLookupType: Raised if no handler is registered for the type of
+            the lookup.
+
+    """
+    try:
+        handler = LOOKUP_HANDLERS[lookup.type]
+    except KeyError:
+        raise UnknownLookupType(lookup)
+    return handler(
+        value=lookup.input,
+        context=context,
+        provider=provider,
+    )
+
+
+def _resolve_in_pool(lookup, context, provider):
+    _pool_thread.active = True
+    return resolve_lookup(lookup, context, provider)
+
+
+def submit_lookups(lookups, context, provider):
+    """Schedule a set of independent lookups for resolution.
+
+    Lookups are resolved concurrently on the shared lookup pool. A single
+    lookup, or a `LOOKUP_CONCURRENCY` of 1, resolves them on the calling
+    thread instead.
+
+    Args:
+        lookups (list of :class:`stacker.lookups.Lookup`): a list of stacker
+            lookups to resolve
+        context (:class:`stacker.context.Context`): stacker context
+        provider (:class:`stacker.provider.base.BaseProvider`): subclass of the
+            base provider
+
+    Returns:
+        :class:`collections.OrderedDict`: Lookup ->
+            :class:`concurrent.futures.Future` holding the resolved value, or
+            the exception raised while resolving it.
+
+    """
+    lookups = list(lookups)
+    futures = OrderedDict()
+
+    in_pool = getattr(_pool_thread, "active", False)
+    concurrent = len(lookups) > 1 and LOOKUP_CONCURRENCY > 1 and not in_pool
+    if concurrent:
+        executor = _get_executor()
+        for lookup in lookups:
+            futures[lookup] = executor.submit(
+                _resolve_in_pool, lookup, context, provider)
+        return futures
+
+    for lookup in lookups:
+        future = futures[lookup] = Future()
+        try:
+            future.set_result(resolve_lookup(lookup, context, provider))
+        except Exception as e:
+            future.set_exception(e)
+    return futures
 
 
 def resolve_lookups(lookups, context, provider):
@@ -62,29 +278,7 @@ def resolve_lookups(lookups, context, provider):
         dict: dict of Lookup -> resolved value
 
     """
-    resolved_lookups = {}
-    for lookup in lookups:
-        try:
-            handler = LOOKUP_HANDLERS[lookup.type]
-        except KeyError:
-            raise UnknownLookupType(lookup)
-        resolved_lookups[lookup] = handler(
-            value=lookup.input,
-            context=context,
-            provider=provider,
-        )
-    return resolved_lookups
-
-
-register_lookup_handler(output.TYPE_NAME, output.handler)
-register_lookup_handler(kms.TYPE_NAME, kms.handler)
-register_lookup_handler(ssmstore.TYPE_NAME, ssmstore.handler)
-register_lookup_handler(envvar.TYPE_NAME, envvar.handler)
-register_lookup_handler(xref.TYPE_NAME, xref.handler)
-register_lookup_handler(rxref.TYPE_NAME, rxref.handler)
-register_lookup_handler(ami.TYPE_NAME, ami.handler)
-register_lookup_handler(file_handler.TYPE_NAME, file_handler.handler)
-register_lookup_handler(split.TYPE_NAME, split.handler)
-register_lookup_handler(default.TYPE_NAME, default.handler)
-register_lookup_handler(hook_data.TYPE_NAME, hook_data.handler)
-register_lookup_handler(dynamodb.TYPE_NAME, dynamodb.handler)
+    futures = submit_lookups(lookups, context, provider)
+    return dict(
+        (lookup, future.result()) for lookup, future in futures.items()
+    )
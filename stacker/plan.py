@@ -8,6 +8,7 @@ import time
 import uuid
 import threading
 
+from .disk_cache import ensure_directory
 from .util import stack_template_key_name
 from .exceptions import (
     GraphError,
@@ -321,11 +322,21 @@ class Plan(object):
         if message:
             logger.log(level, message)
 
-    def dump(self, directory, context, provider=None):
+    def dump(self, directory, context, provider=None, walker=walk):
+        """Writes the rendered template of each stack to a directory.
+
+        Args:
+            directory (str): the directory to write the templates to.
+            context (:class:`stacker.context.Context`): stacker context
+            provider (:class:`stacker.provider.base.BaseProvider`, optional):
+                the provider used to resolve the stacks.
+            walker (func, optional): the function used to walk the graph,
+                which allows dumping independent stacks concurrently. Defaults
+                to walking it sequentially.
+        """
         logger.info("Dumping \"%s\"...", self.description)
         directory = os.path.expanduser(directory)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+        ensure_directory(directory)
 
         def walk_func(step):
             step.stack.resolve(
@@ -336,9 +347,7 @@ class Plan(object):
             filename = stack_template_key_name(blueprint)
             path = os.path.join(directory, filename)
 
-            blueprint_dir = os.path.dirname(path)
-            if not os.path.exists(blueprint_dir):
-                os.makedirs(blueprint_dir)
+            ensure_directory(os.path.dirname(path))
 
             logger.info("Writing stack \"%s\" -> %s", step.name, path)
             with open(path, "w") as f:
@@ -346,7 +355,7 @@ class Plan(object):
 
             return True
 
-        return self.graph.walk(walk, walk_func)
+        return self.graph.walk(walker, walk_func)
 
     def execute(self, *args, **kwargs):
         """Walks each step in the underlying graph, and raises an exception if
@@ -13,7 +13,6 @@ import urllib.parse
 import sys
 
 import botocore.exceptions
-from botocore.config import Config
 
 from ..base import BaseProvider
 from ... import exceptions
@@ -50,6 +49,8 @@ DEFAULT_CAPABILITIES = ["CAPABILITY_NAMED_IAM", ]
 
 
 def get_cloudformation_client(session):
+    from botocore.config import Config
+
     config = Config(
         retries=dict(
             max_attempts=MAX_ATTEMPTS
@@ -1,7 +1,6 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
-import boto3
 import logging
 from .ui import ui
 
@@ -36,6 +35,10 @@ def get_session(region, profile=None):
     logger.debug("Building session using profile \"%s\" in region \"%s\""
                  % (profile, region))
 
+    # boto3 takes a while to import, so it is only imported once a session
+    # is needed
+    import boto3
+
     session = boto3.Session(region_name=region, profile_name=profile)
     c = session._session.get_component('credential_provider')
     provider = c.get_provider('assume-role')
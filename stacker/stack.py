@@ -79,6 +79,7 @@ class Stack(object):
         self.force = force
         self.context = context
         self.outputs = None
+        self.preresolved_lookups = {}
 
     def __repr__(self):
         return self.fqn
@@ -188,9 +189,20 @@ class Stack(object):
                 the base provider
 
         """
-        resolve_variables(self.variables, context, provider)
+        resolve_variables(self.variables, context, provider,
+                          preresolved=self.preresolved_lookups)
         self.blueprint.resolve_variables(self.variables)
 
+    def set_preresolved_lookups(self, resolved_lookups):
+        """Provide values for lookups resolved ahead of the stack's step.
+
+        Args:
+            resolved_lookups (dict): dict of :class:`stacker.lookups.Lookup`
+                -> resolved value.
+
+        """
+        self.preresolved_lookups = resolved_lookups
+
     def set_outputs(self, outputs):
         self.outputs = outputs
 
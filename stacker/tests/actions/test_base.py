@@ -4,6 +4,8 @@ from __future__ import absolute_import
 from future import standard_library
 standard_library.install_aliases()
 
+import threading
+import time
 import unittest
 
 import mock
@@ -12,14 +14,20 @@ import botocore.exceptions
 from botocore.stub import Stubber, ANY
 
 from stacker.actions.base import (
-    BaseAction
+    BaseAction,
+    build_walker,
+    preresolve_lookups,
 )
 from stacker.blueprints.base import Blueprint
+from stacker.dag import DAG, walk
 from stacker.providers.aws.default import Provider
 from stacker.session_cache import get_session
+from stacker.stack import Stack
+from stacker.variables import resolve_variables
 
 from stacker.tests.factories import (
     MockProviderBuilder,
+    generate_definition,
     mock_context,
 )
 
@@ -149,3 +157,85 @@ class TestBaseAction(unittest.TestCase):
                     MOCK_VERSION
                 )
             )
+
+
+class TestBuildWalker(unittest.TestCase):
+
+    def walk(self, concurrency):
+        dag = DAG()
+        for node in "abcdef":
+            dag.add_node(node)
+
+        lock = threading.Lock()
+        running = []
+        walked = []
+
+        def walk_func(node):
+            with lock:
+                running.append(node)
+                walked.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(node)
+            return True
+
+        build_walker(concurrency)(dag, walk_func)
+        return walked
+
+    def test_serial(self):
+        self.assertIs(build_walker(1), walk)
+        self.assertEqual(self.walk(1), [1] * 6)
+
+    def test_limited(self):
+        walked = self.walk(2)
+        self.assertEqual(len(walked), 6)
+        self.assertEqual(max(walked), 2)
+
+    def test_unlimited(self):
+        walked = self.walk(0)
+        self.assertEqual(len(walked), 6)
+        self.assertGreater(max(walked), 2)
+
+
+class TestPreresolveLookups(unittest.TestCase):
+    def setUp(self):
+        self.context = mock_context("mynamespace")
+        self.provider = mock.MagicMock()
+
+    def _stack(self, name, **overrides):
+        return Stack(
+            definition=generate_definition(name, 1, **overrides),
+            context=self.context,
+        )
+
+    @mock.patch.dict("os.environ", {"GOOD_VAR": "good"}, clear=True)
+    def test_preresolve_lookups(self):
+        stack = self._stack("vpc", variables={
+            "Good": "${envvar GOOD_VAR}",
+            "Missing": "${envvar MISSING_VAR}",
+            "Output": "${output other::Output}",
+        })
+        locked = self._stack("db", locked=True, variables={
+            "Good": "${envvar GOOD_VAR}",
+        })
+
+        preresolve_lookups([stack, locked], self.context, self.provider)
+
+        self.assertEqual(
+            dict((lookup.raw, value) for lookup, value in
+                 stack.preresolved_lookups.items()),
+            {"envvar GOOD_VAR": "good"},
+        )
+        self.assertEqual(locked.preresolved_lookups, {})
+
+    @mock.patch.dict("os.environ", {"GOOD_VAR": "good"}, clear=True)
+    def test_preresolved_lookups_used_by_resolve(self):
+        stack = self._stack("vpc", variables={"Good": "${envvar GOOD_VAR}"})
+        preresolve_lookups([stack], self.context, self.provider)
+
+        with mock.patch("stacker.variables.submit_lookups",
+                        return_value={}) as submit:
+            resolve_variables(stack.variables, self.context, self.provider,
+                              preresolved=stack.preresolved_lookups)
+        submit.assert_called_once_with(set(), self.context, self.provider)
+        self.assertEqual(stack.variables[0].value, "good")
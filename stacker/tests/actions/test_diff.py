@@ -1,16 +1,34 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import datetime
 import os
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from mock import MagicMock, patch
 
 from operator import attrgetter
+from stacker.actions import diff
 from stacker.actions.diff import (
     diff_dictionaries,
     diff_parameters,
+    diff_templates,
+    format_path,
+    format_template_diff,
     normalize_json,
     DictValue
 )
+from stacker.config import Config
+from stacker.context import Context
+from stacker.exceptions import StackDoesNotExist
+from stacker.status import COMPLETE
+
+from ..factories import (
+    MockProviderBuilder,
+    MockThreadingEvent,
+    mock_provider,
+)
 
 
 class TestDictValueFormat(unittest.TestCase):
@@ -160,3 +178,164 @@ Resources:
               Service: ecs-tasks.amazonaws.com
             Action: sts:AssumeRole"""
         self.assertTrue(normalize_json(template))
+
+
+class TestDiffTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.old = {
+            "AWSTemplateFormatVersion": datetime.date(2010, 9, 9),
+            "Resources": {
+                "Bucket": {
+                    "Type": "AWS::S3::Bucket",
+                    "Properties": {
+                        "BucketName": "old",
+                        "Tags": [{"Key": "a", "Value": "1"}],
+                    },
+                },
+                "Removed": {"Type": "AWS::SNS::Topic"},
+                "Unchanged": {"Type": "AWS::SQS::Queue"},
+            },
+        }
+        self.new = {
+            "AWSTemplateFormatVersion": "2010-09-09",
+            "Resources": {
+                "Bucket": {
+                    "Type": "AWS::S3::Bucket",
+                    "Properties": {
+                        "BucketName": "new",
+                        "Tags": [{"Key": "a", "Value": "2"}],
+                    },
+                },
+                "Added": {"Type": "AWS::SNS::Topic"},
+                "Unchanged": {"Type": "AWS::SQS::Queue"},
+            },
+        }
+
+    def test_no_changes(self):
+        self.assertEqual(diff_templates(self.old, self.old), [])
+        self.assertEqual(format_template_diff("stack", self.old, self.old,
+                                              []), "")
+
+    def test_diff_templates(self):
+        changes = diff_templates(self.old, self.new)
+        self.assertEqual(
+            [(format_path(c.key), c.status()) for c in changes],
+            [("Resources.Added", DictValue.ADDED),
+             ("Resources.Bucket.Properties.BucketName", DictValue.MODIFIED),
+             ("Resources.Bucket.Properties.Tags[0].Value",
+              DictValue.MODIFIED),
+             ("Resources.Removed", DictValue.REMOVED)])
+
+    def test_list_length_changed(self):
+        self.new["Resources"]["Bucket"]["Properties"]["Tags"].append(
+            {"Key": "b", "Value": "2"})
+        changes = diff_templates(self.old["Resources"]["Bucket"],
+                                 self.new["Resources"]["Bucket"])
+        self.assertEqual([c.key for c in changes],
+                         [("Properties", "BucketName"),
+                          ("Properties", "Tags")])
+
+    def test_format_template_diff(self):
+        changes = diff_templates(self.old, self.new)
+        output = format_template_diff("stack", self.old, self.new, changes)
+        self.assertIn("--- old_stack/Resources/Bucket\n", output)
+        self.assertIn('-        "BucketName": "old",\n', output)
+        self.assertIn('+        "BucketName": "new",\n', output)
+        self.assertIn("+++ new_stack/Resources/Added\n", output)
+        self.assertIn("--- old_stack/Resources/Removed\n", output)
+        self.assertNotIn("Unchanged", output)
+        self.assertNotIn("AWSTemplateFormatVersion", output)
+
+
+class TestDiffAction(unittest.TestCase):
+
+    def setUp(self):
+        config = Config({
+            "namespace": "namespace",
+            "stacks": [
+                {"name": "vpc"},
+                {"name": "bastion",
+                    "variables": {
+                        "test": "${output vpc::something}"}},
+                {"name": "new"},
+                {"name": "locked", "locked": True},
+            ],
+        })
+        self.context = Context(config=config)
+        self.provider = mock_provider(region="us-east-1")
+        self.provider.get_stack.side_effect = self._get_stack
+        self.provider.get_stack_info.return_value = ["{}", {"a": "b"}]
+        self.action = diff.Action(
+            self.context,
+            provider_builder=MockProviderBuilder(self.provider),
+            cancel=MockThreadingEvent())
+
+    def _get_stack(self, name, **kwargs):
+        if name == "namespace-new":
+            raise StackDoesNotExist(name)
+        return {"StackName": name}
+
+    def test_fetch_remote_stack(self):
+        vpc, new = [s for s in self.context.get_stacks()
+                    if s.name in ("vpc", "new")]
+        self.assertEqual(
+            self.action._fetch_remote_stack(vpc, self.provider),
+            ({"StackName": "namespace-vpc"}, "{}", {"a": "b"}))
+        self.assertEqual(
+            self.action._fetch_remote_stack(new, self.provider),
+            (None, None, {}))
+
+    def test_prefetch_remote_stacks(self):
+        plan = self.action._generate_plan()
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        self.action._prefetch_remote_stacks(plan, executor)
+
+        remote_stacks = self.action._remote_stacks
+        self.assertEqual(
+            sorted(remote_stacks),
+            ["namespace-bastion", "namespace-new", "namespace-vpc"])
+        self.assertEqual(remote_stacks["namespace-new"].result(),
+                         (None, None, {}))
+        self.assertEqual(remote_stacks["namespace-bastion"].result()[0],
+                         {"StackName": "namespace-bastion"})
+
+    def test_run_prefetches_remote_stacks(self):
+        prefetched = []
+
+        def diff_stack(stack, **kwargs):
+            prefetched.append(sorted(self.action._remote_stacks))
+            return COMPLETE
+
+        self.action._diff_stack = diff_stack
+        self.action.run(concurrency=1)
+        self.assertEqual(
+            prefetched[0],
+            ["namespace-bastion", "namespace-new", "namespace-vpc"])
+        self.assertEqual(self.provider.get_stack.call_count, 3)
+
+    @patch("stacker.actions.diff.PREFETCH_CONCURRENCY", 1)
+    def test_run_cancels_prefetch_on_failure(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get_stack(name, **kwargs):
+            release.wait(5)
+            return {"StackName": name}
+
+        self.provider.get_stack.side_effect = get_stack
+        self.action._preresolve_lookups = MagicMock(
+            side_effect=ValueError("failed"))
+        with self.assertRaises(ValueError):
+            self.action.run(concurrency=1)
+        release.set()
+
+        futures = list(self.action._remote_stacks.values())
+        self.assertEqual(len(futures), 3)
+        self.assertEqual(
+            len([future for future in futures if future.cancelled()]), 2)
+        for future in futures:
+            if not future.cancelled():
+                future.result()
+        self.assertEqual(self.provider.get_stack.call_count, 1)
@@ -1,18 +1,24 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import copy
 import unittest
+import shutil
 import sys
+import tempfile
 from mock import patch
 
 from mock import MagicMock
 from troposphere import (
+    awslambda,
     Base64,
+    Parameter,
     Ref,
     s3,
     sns
 )
 
+from stacker.actions import build
 from stacker.blueprints.base import (
     Blueprint,
     CFNParameter,
@@ -32,6 +38,7 @@ from stacker.blueprints.variables.types import (
 from stacker.exceptions import (
     InvalidLookupCombination,
     MissingVariable,
+    MissingParameterException,
     UnresolvedVariable,
     UnresolvedVariables,
     ValidatorError,
@@ -118,6 +125,130 @@ class TestBaseBlueprint(unittest.TestCase):
                          output_value)
 
 
+class CachedBlueprint(Blueprint):
+    VARIABLES = {
+        "BucketName": {"type": str},
+        "Param": {"type": CFNString},
+    }
+    renders = 0
+
+    def create_template(self):
+        CachedBlueprint.renders += 1
+        variables = self.get_variables()
+        self.template.add_parameter(Parameter("Name", Type="String"))
+        self.template.add_resource(
+            s3.Bucket("Bucket", BucketName=variables["BucketName"]))
+
+
+@patch("stacker.blueprints.base.TEMPLATE_CACHE_TTL", 3600)
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        CachedBlueprint.renders = 0
+
+    def render(self, bucket_name="bucket", name="test", hook_data=None,
+               **kwargs):
+        context = mock_context(
+            extra_config_args={"stacker_cache_dir": self.cache_dir})
+        context.hook_data = hook_data or {}
+        blueprint = CachedBlueprint(name, context, **kwargs)
+        blueprint.resolve_variables([
+            Variable("BucketName", bucket_name),
+            Variable("Param", "value"),
+        ])
+        return blueprint, blueprint.render_template()
+
+    def test_cache_hit(self):
+        _, first = self.render()
+        blueprint, second = self.render()
+        self.assertEqual(first, second)
+        self.assertEqual(CachedBlueprint.renders, 1)
+        self.assertFalse(blueprint.requires_change_set)
+
+    def test_cache_hit_required_parameters(self):
+        blueprint, _ = self.render()
+        self.assertEqual(
+            sorted(blueprint.get_required_parameter_definitions()),
+            ["Name", "Param"])
+
+        blueprint, _ = self.render()
+        self.assertEqual(CachedBlueprint.renders, 1)
+        self.assertEqual(
+            sorted(blueprint.get_required_parameter_definitions()),
+            ["Name", "Param"])
+
+        stack = MagicMock(
+            blueprint=blueprint,
+            parameter_values=blueprint.get_parameter_values(),
+            required_parameter_definitions=(
+                blueprint.get_required_parameter_definitions()))
+        action = build.Action(blueprint.context)
+        self.assertEqual(
+            sorted(action.build_parameters(stack, {"Parameters": [
+                {"ParameterKey": "Name", "ParameterValue": "existing"},
+            ]}), key=lambda p: p["ParameterKey"]),
+            [{"ParameterKey": "Name", "ParameterValue": "existing"},
+             {"ParameterKey": "Param", "ParameterValue": "value"}])
+        with self.assertRaises(MissingParameterException):
+            action.build_parameters(stack)
+
+    def test_cache_key_changes(self):
+        self.render()
+        _, result = self.render(bucket_name="other")
+        self.assertIn("other", result[1])
+        self.render(mappings={"Map": {"Key": {"Value": "1"}}})
+        self.assertEqual(CachedBlueprint.renders, 3)
+
+    def test_cache_key_name(self):
+        self.render()
+        self.render(name="other")
+        self.assertEqual(CachedBlueprint.renders, 2)
+
+    def test_cache_key_hook_data(self):
+        def hook_data(key):
+            return {"lambda": {"MyFunction": awslambda.Code(
+                S3Bucket="bucket", S3Key=key)}}
+
+        self.render(hook_data=hook_data("lambda-abc.zip"))
+        self.render(hook_data=hook_data("lambda-abc.zip"))
+        self.assertEqual(CachedBlueprint.renders, 1)
+        self.render(hook_data=hook_data("lambda-def.zip"))
+        self.assertEqual(CachedBlueprint.renders, 2)
+
+    def test_unserializable_hook_data_not_cached(self):
+        blueprint, _ = self.render(hook_data={"hook": object()})
+        self.assertIsNone(blueprint.template_cache_key())
+
+    def test_cache_disabled(self):
+        with patch("stacker.blueprints.base.TEMPLATE_CACHE_TTL", 0):
+            self.render()
+            self.render()
+        self.assertEqual(CachedBlueprint.renders, 2)
+
+    def test_unserializable_variables_not_cached(self):
+        blueprint, _ = self.render()
+        blueprint.resolved_variables["BucketName"] = object()
+        self.assertIsNone(blueprint.template_cache_key())
+
+    def test_user_data_not_cached(self):
+        with patch.object(CachedBlueprint, "create_template",
+                          side_effect=lambda: CachedBlueprint.read_user_data(
+                              blueprint, "data")) as create_template, \
+                patch("stacker.blueprints.base.read_value_from_path",
+                      return_value="data"):
+            for _ in range(2):
+                blueprint = CachedBlueprint("test", mock_context(
+                    extra_config_args={"stacker_cache_dir": self.cache_dir}))
+                blueprint.resolve_variables([
+                    Variable("BucketName", "bucket"),
+                    Variable("Param", "value"),
+                ])
+                blueprint.render_template()
+        self.assertEqual(create_template.call_count, 2)
+
+
 class TestVariables(unittest.TestCase):
 
     def test_defined_variables(self):
@@ -153,6 +284,80 @@ class TestVariables(unittest.TestCase):
         self.assertEqual(len(variables), 3)
         self.assertEqual(variables["Param2"]["default"], 1)
 
+    def test_variable_definitions(self):
+        class TestBlueprint(Blueprint):
+            VARIABLES = {
+                "Param1": {"default": 0, "type": int},
+            }
+
+        blueprint = TestBlueprint(name="test", context=MagicMock())
+        definitions = blueprint.variable_definitions()
+        self.assertEqual(definitions, TestBlueprint.VARIABLES)
+        self.assertIs(
+            TestBlueprint(name="other", context=MagicMock())
+            .variable_definitions(),
+            definitions)
+        with self.assertRaises(TypeError):
+            definitions["Param2"] = {}
+        with self.assertRaises(TypeError):
+            definitions["Param1"]["default"] = 1
+
+        variables = blueprint.defined_variables()
+        variables["Param1"]["default"] = 1
+        self.assertEqual(variables["Param1"]["default"], 1)
+        self.assertEqual(definitions["Param1"]["default"], 0)
+        self.assertEqual(copy.deepcopy(definitions), TestBlueprint.VARIABLES)
+
+    def test_variable_defaults_not_shared(self):
+        class TestBlueprint(Blueprint):
+            VARIABLES = {
+                "Tags": {"default": {}, "type": dict},
+            }
+
+            def create_template(self):
+                self.get_variables()["Tags"][self.name] = "x"
+
+        for name in ["a", "b"]:
+            blueprint = TestBlueprint(name=name, context=MagicMock())
+            blueprint.resolve_variables([])
+            blueprint.create_template()
+            self.assertEqual(blueprint.get_variables()["Tags"], {name: "x"})
+        self.assertEqual(TestBlueprint.VARIABLES["Tags"]["default"], {})
+
+        variables = blueprint.defined_variables()
+        variables["Tags"]["default"]["c"] = "x"
+        self.assertEqual(TestBlueprint.VARIABLES["Tags"]["default"], {})
+
+    def test_variable_definitions_overridden(self):
+        class TestBlueprint(Blueprint):
+            VARIABLES = {
+                "Param1": {"default": 0, "type": int},
+            }
+
+            def defined_variables(self):
+                variables = super(TestBlueprint, self).defined_variables()
+                variables["Param2"] = {"default": self.name, "type": str}
+                return variables
+
+        blueprint = TestBlueprint(name="test", context=MagicMock())
+        definitions = blueprint.variable_definitions()
+        self.assertEqual(definitions["Param2"]["default"], "test")
+        blueprint.resolve_variables([])
+        self.assertEqual(blueprint.get_variables()["Param2"], "test")
+
+    def test_variable_definitions_instance_variables(self):
+        class TestBlueprint(Blueprint):
+            VARIABLES = {
+                "Param1": {"default": 0, "type": int},
+            }
+
+            def __init__(self, *args, **kwargs):
+                super(TestBlueprint, self).__init__(*args, **kwargs)
+                self.VARIABLES = {"Param2": {"default": 0, "type": int}}
+
+        blueprint = TestBlueprint(name="test", context=MagicMock())
+        self.assertEqual(list(blueprint.variable_definitions()), ["Param2"])
+
     def test_get_variables_unresolved_variables(self):
         class TestBlueprint(Blueprint):
             pass
@@ -746,8 +951,9 @@ class TestCFNParameter(unittest.TestCase):
         class TestBlueprint(Blueprint):
             VARIABLES = {}
 
-        blueprint = TestBlueprint(name="blueprint_name", context=MagicMock())
+        context = MagicMock()
+        blueprint = TestBlueprint(name="blueprint_name", context=context)
         blueprint.resolve_variables({})
         blueprint.read_user_data('file://test.txt')
-        file_mock.assert_called_with('file://test.txt')
+        file_mock.assert_called_with('file://test.txt', context=context)
         parse_mock.assert_called_with({}, 'contents', 'blueprint_name')
@@ -2,11 +2,13 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import hashlib
 import json
 import unittest
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
+from stacker.blueprints import raw
 from stacker.blueprints.raw import get_template_params, RawTemplateBlueprint
 from ..factories import mock_context
 
@@ -86,6 +88,38 @@ class TestBlueprintRendering(unittest.TestCase):
         )
 
 
+class TestTemplateLoading(unittest.TestCase):
+    """Test class for reading and parsing the raw template."""
+
+    def test_version(self):
+        """Verify the version is the hash of the template."""
+        blueprint = RawTemplateBlueprint(
+            name="test",
+            context=MagicMock(),
+            raw_template_path=RAW_YAML_TEMPLATE_PATH)
+        with patch.object(raw, "READ_CHUNK_SIZE", 16):
+            version = blueprint.version
+        with open(RAW_YAML_TEMPLATE_PATH) as template:
+            contents = template.read()
+        self.assertEqual(blueprint.rendered, contents)
+        self.assertEqual(
+            version, hashlib.md5(contents.encode()).hexdigest()[:8])
+
+    def test_parsed_once(self):
+        """Verify the template is only parsed once."""
+        blueprint = RawTemplateBlueprint(
+            name="test",
+            context=MagicMock(),
+            raw_template_path=RAW_YAML_TEMPLATE_PATH)
+        with patch("stacker.blueprints.raw.parse_cloudformation_template",
+                   wraps=raw.parse_cloudformation_template) as parse:
+            blueprint.to_json()
+            blueprint.get_parameter_definitions()
+            blueprint.get_required_parameter_definitions()
+            self.assertFalse(blueprint.requires_change_set)
+        parse.assert_called_once_with(blueprint.rendered)
+
+
 class TestVariables(unittest.TestCase):
     """Test class for blueprint variable methods."""
 
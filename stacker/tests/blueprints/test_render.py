@@ -0,0 +1,129 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+import unittest
+
+from mock import MagicMock, patch
+from troposphere import s3
+
+from stacker.blueprints import render
+from stacker.blueprints.base import Blueprint
+from stacker.blueprints.variables.types import CFNString
+from stacker.variables import Variable
+
+from ..factories import mock_context
+
+
+class RenderBlueprint(Blueprint):
+    VARIABLES = {
+        "BucketName": {"type": str},
+        "Param": {"type": CFNString},
+    }
+
+    def create_template(self):
+        variables = self.get_variables()
+        self.template.add_resource(s3.Bucket(
+            "Bucket",
+            BucketName=variables["BucketName"],
+            Tags=s3.Tags(
+                Namespace=self.context.namespace,
+                Pid=str(os.getpid()),
+            )))
+
+
+def resolved_blueprint(blueprint_class=RenderBlueprint, **variables):
+    blueprint = blueprint_class("test", mock_context(namespace="ns"))
+    variables.setdefault("BucketName", "bucket")
+    variables.setdefault("Param", "value")
+    blueprint.resolve_variables(
+        [Variable(k, v) for k, v in variables.items()])
+    return blueprint
+
+
+@patch("stacker.blueprints.render.RENDER_PROCESSES", 2)
+class TestRenderInProcessPool(unittest.TestCase):
+
+    def tearDown(self):
+        if render._executor is not None:
+            render._executor.shutdown()
+            render._executor = None
+
+    def test_render(self):
+        blueprint = resolved_blueprint()
+        version, rendered = render.render_in_process_pool(blueprint)
+        self.assertIn('"BucketName": "bucket"', rendered)
+        self.assertIn('"Value": "ns"', rendered)
+        self.assertNotIn('"Value": "%d"' % os.getpid(), rendered)
+        self.assertEqual(len(version), 8)
+
+    def test_blueprint_rendered(self):
+        blueprint = resolved_blueprint()
+        self.assertIn('"BucketName": "bucket"', blueprint.rendered)
+        self.assertEqual(blueprint.template.resources, {})
+        self.assertFalse(blueprint.requires_change_set)
+
+    def test_disabled(self):
+        with patch("stacker.blueprints.render.RENDER_PROCESSES", 0):
+            self.assertIsNone(
+                render.render_in_process_pool(resolved_blueprint()))
+
+    def test_unresolved_variables(self):
+        blueprint = RenderBlueprint("test", mock_context())
+        self.assertIsNone(render.render_in_process_pool(blueprint))
+
+    def test_local_class(self):
+        class LocalBlueprint(RenderBlueprint):
+            pass
+
+        self.assertIsNone(render.render_in_process_pool(
+            resolved_blueprint(LocalBlueprint)))
+
+    def test_unpicklable_variables(self):
+        blueprint = resolved_blueprint()
+        blueprint.resolved_variables["BucketName"] = threading.Lock()
+        self.assertIsNone(render.render_in_process_pool(blueprint))
+
+    def test_required_parameters(self):
+        blueprint = resolved_blueprint()
+        self.assertIn('"BucketName": "bucket"', blueprint.rendered)
+        self.assertEqual(blueprint.template.parameters, {})
+        self.assertEqual(list(blueprint.get_required_parameter_definitions()),
+                         ["Param"])
+
+    def test_worker_failure(self):
+        executor = MagicMock()
+        executor.submit.return_value.result.side_effect = ImportError
+        with patch("stacker.blueprints.render._get_executor",
+                   return_value=executor):
+            blueprint = resolved_blueprint()
+            self.assertIsNone(render.render_in_process_pool(blueprint))
+            self.assertIn('"Value": "%d"' % os.getpid(), blueprint.rendered)
+
+    def test_sys_path(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "path_blueprint.py"), "w") as f:
+            f.write(textwrap.dedent("""
+                from stacker.tests.blueprints.test_render import (
+                    RenderBlueprint)
+
+
+                class PathBlueprint(RenderBlueprint):
+                    pass
+            """))
+        sys.path.append(directory)
+        self.addCleanup(sys.path.remove, directory)
+        self.addCleanup(sys.modules.pop, "path_blueprint", None)
+        module = importlib.import_module("path_blueprint")
+
+        version, rendered = render.render_in_process_pool(
+            resolved_blueprint(module.PathBlueprint))
+        self.assertIn('"BucketName": "bucket"', rendered)
+        self.assertNotIn('"Value": "%d"' % os.getpid(), rendered)
@@ -9,6 +9,9 @@ import os
 import unittest
 import mock
 import random
+import threading
+import time
+from collections import OrderedDict
 from io import BytesIO as StringIO
 from zipfile import ZipFile
 
@@ -20,10 +23,12 @@ from testfixtures import TempDirectory, ShouldRaise, compare
 
 from stacker.context import Context
 from stacker.config import Config
+from stacker.hooks import aws_lambda
 from stacker.hooks.aws_lambda import (
     upload_lambda_functions,
     ZIP_PERMS_MASK,
     _calculate_hash,
+    _zip_files,
     select_bucket_region,
 )
 from ..factories import mock_provider
@@ -83,8 +88,11 @@ class TestLambdaHooks(unittest.TestCase):
                     self.fail('s3: bucket {} does not exist'.format(bucket))
 
     def setUp(self):
+        self.cache_dir = TempDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
         self.context = Context(
-            config=Config({'namespace': 'test', 'stacker_bucket': 'test'}))
+            config=Config({'namespace': 'test', 'stacker_bucket': 'test',
+                           'stacker_cache_dir': self.cache_dir.path}))
         self.provider = mock_provider(region="us-east-1")
 
     def run_hook(self, **kwargs):
@@ -156,10 +164,8 @@ class TestLambdaHooks(unittest.TestCase):
 
     @mock_s3
     def test_path_relative(self):
-        get_config_directory = 'stacker.hooks.aws_lambda.get_config_directory'
-        with self.temp_directory_with_files(['test/test.py']) as d, \
-                mock.patch(get_config_directory) as m1:
-            m1.return_value = d.path
+        with self.temp_directory_with_files(['test/test.py']) as d:
+            self.context.config_path = os.path.join(d.path, 'stacker.yaml')
 
             results = self.run_hook(functions={
                 'MyFunction': {
@@ -217,6 +223,129 @@ class TestLambdaHooks(unittest.TestCase):
         self.assertIsInstance(f2_code, Code)
         self.assert_s3_zip_file_list(f2_code.S3Bucket, f2_code.S3Key, F2_FILES)
 
+    @mock_s3
+    @mock.patch('stacker.hooks.aws_lambda.FUNCTION_CONCURRENCY', 4)
+    def test_functions_concurrently(self):
+        names = ['Function%d' % i for i in range(8)]
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def upload_function(context, targets, prefix, name, *args,
+                            **kwargs):
+            with lock:
+                running.append(name)
+                max_running.append(len(running))
+            # Finish the functions in the reverse order they're configured in
+            time.sleep(0.01 * (len(names) - names.index(name)))
+            with lock:
+                running.remove(name)
+            return [name]
+
+        functions = OrderedDict((name, {'path': '.'}) for name in names)
+        upload = 'stacker.hooks.aws_lambda._upload_function'
+        with mock.patch(upload, side_effect=upload_function):
+            results = self.run_hook(functions=functions)
+
+        self.assertEqual(list(results.items()), list(zip(names, names)))
+        self.assertEqual(max(max_running), 4)
+
+    @mock_s3
+    def test_functions_failure(self):
+        def upload_function(context, targets, prefix, name, *args,
+                            **kwargs):
+            if name == 'Broken':
+                raise ValueError(name)
+            return [name]
+
+        functions = OrderedDict([('MyFunction', {}), ('Broken', {})])
+        upload = 'stacker.hooks.aws_lambda._upload_function'
+        with mock.patch(upload, side_effect=upload_function), \
+                ShouldRaise(ValueError('Broken')):
+            self.run_hook(functions=functions)
+
+    def run_replication_hook(self, d):
+        return self.run_hook(targets=[
+            {'bucket': 'test-us-east-1', 'bucket_region': 'us-east-1'},
+            {'bucket': 'test-eu-west-1', 'bucket_region': 'eu-west-1'},
+            {'bucket': 'test-us-west-2', 'bucket_region': 'us-west-2'},
+        ], functions={
+            'MyFunction': {'path': d.path + '/f1'},
+            'OtherFunction': {'path': d.path + '/f2'},
+        })
+
+    @mock_s3
+    def test_targets(self):
+        zip_files = mock.Mock(wraps=aws_lambda._zip_files)
+        copy_payload = mock.Mock(wraps=aws_lambda._copy_payload)
+        with self.temp_directory_with_files() as d, \
+                mock.patch.object(aws_lambda, '_zip_files', zip_files), \
+                mock.patch.object(aws_lambda, '_copy_payload', copy_payload):
+            results = self.run_replication_hook(d)
+            self.assertEqual(zip_files.call_count, 2)
+            self.assertEqual(copy_payload.call_count, 4)
+
+            self.assertEqual(list(results), ['MyFunction', 'OtherFunction'])
+            for name, files in [('MyFunction', F1_FILES),
+                                ('OtherFunction', F2_FILES)]:
+                codes = results[name]
+                self.assertEqual(list(codes),
+                                 ['us-east-1', 'eu-west-1', 'us-west-2'])
+                for region, code in codes.items():
+                    self.assertEqual(code.S3Bucket, 'test-' + region)
+                    self.assertEqual(code.S3Key, codes['us-east-1'].S3Key)
+                    self.assert_s3_zip_file_list(code.S3Bucket, code.S3Key,
+                                                 files)
+
+            zip_files.reset_mock()
+            copy_payload.reset_mock()
+            self.run_replication_hook(d)
+            zip_files.assert_not_called()
+            copy_payload.assert_not_called()
+
+    @mock_s3
+    def test_targets_copy_from_existing(self):
+        with self.temp_directory_with_files() as d:
+            results = self.run_replication_hook(d)
+            code = results['MyFunction']['us-west-2']
+            self.s3.delete_object(Bucket='test-us-east-1', Key=code.S3Key)
+
+            with mock.patch.object(aws_lambda, '_zip_files') as zip_files:
+                self.run_replication_hook(d)
+            zip_files.assert_not_called()
+            self.assert_s3_zip_file_list('test-us-east-1', code.S3Key,
+                                         F1_FILES)
+
+    @mock_s3
+    def test_targets_copy_failure(self):
+        error = botocore.exceptions.ClientError(
+            {'Error': {'Code': 'AccessDenied'}}, 'CopyObject')
+        with self.temp_directory_with_files() as d, \
+                mock.patch.object(aws_lambda, '_copy_payload',
+                                  side_effect=error):
+            results = self.run_replication_hook(d)
+            for code in results['MyFunction'].values():
+                self.assert_s3_zip_file_list(code.S3Bucket, code.S3Key,
+                                             F1_FILES)
+
+    @mock_s3
+    def test_targets_invalid(self):
+        invalid = [
+            ({'bucket': 'test', 'targets': [{'bucket': 'a',
+                                             'bucket_region': 'us-east-1'}]},
+             "Cannot specify `bucket` or `bucket_region` with `targets`."),
+            ({'targets': {'bucket': 'a'}}, 'targets option must be a list'),
+            ({'targets': [{'bucket': 'a'}]},
+             "Each of the targets must have a `bucket` and a "
+             "`bucket_region`."),
+            ({'targets': [{'bucket': 'a', 'bucket_region': 'us-east-1'},
+                          {'bucket': 'b', 'bucket_region': 'us-east-1'}]},
+             "Each of the targets must be in a different region."),
+        ]
+        for kwargs, msg in invalid:
+            with ShouldRaise(ValueError(msg)):
+                self.run_hook(functions={}, **kwargs)
+
     @mock_s3
     def test_patterns_invalid(self):
         msg = ("Invalid file patterns in key 'include': must be a string or "
@@ -358,6 +487,123 @@ class TestLambdaHooks(unittest.TestCase):
         self.assertNotEqual(hash1, hash3)
         self.assertNotEqual(hash2, hash3)
 
+    @mock_s3
+    def test_existing_payload_not_zipped(self):
+        with self.temp_directory_with_files() as d:
+            functions = {'MyFunction': {'path': d.path + '/f1'}}
+            code = self.run_hook(functions=functions)['MyFunction']
+
+            zip_files = 'stacker.hooks.aws_lambda._zip_files'
+            with mock.patch(zip_files) as zip_files:
+                cached = self.run_hook(functions=functions)['MyFunction']
+
+        zip_files.assert_not_called()
+        self.assertEqual(cached.S3Key, code.S3Key)
+
+    def test_calculate_hash_file_mode(self):
+        with self.temp_directory_with_files() as d:
+            root = d.path
+            hash1 = _calculate_hash(ALL_FILES, root)
+            os.chmod(os.path.join(root, ALL_FILES[0]), 0o755)
+            hash2 = _calculate_hash(ALL_FILES, root)
+            os.chmod(os.path.join(root, ALL_FILES[0]), 0o744)
+            hash3 = _calculate_hash(ALL_FILES, root)
+
+        self.assertNotEqual(hash1, hash2)
+        self.assertEqual(hash2, hash3)
+
+    def test_calculate_hash_digests(self):
+        with self.temp_directory_with_files() as d:
+            root = d.path
+            digests = {}
+            hash1 = _calculate_hash(ALL_FILES, root, digests)
+            self.assertEqual(sorted(digests), sorted(ALL_FILES))
+
+            file_digest = 'stacker.hooks.aws_lambda._file_digest'
+            with mock.patch(file_digest) as file_digest:
+                hash2 = _calculate_hash(ALL_FILES, root, dict(digests))
+            file_digest.assert_not_called()
+            self.assertEqual(hash1, hash2)
+
+            previous = digests[ALL_FILES[0]]
+            d.write(ALL_FILES[0], b'modified file data')
+            hash3 = _calculate_hash(ALL_FILES[:2], root, digests)
+            self.assertEqual(sorted(digests), sorted(ALL_FILES[:2]))
+            self.assertNotEqual(digests[ALL_FILES[0]], previous)
+            self.assertEqual(hash3, _calculate_hash(ALL_FILES[:2], root))
+
+    @mock_s3
+    def test_hash_cache(self):
+        with self.temp_directory_with_files() as d:
+            functions = {'MyFunction': {'path': d.path + '/f1'}}
+            code = self.run_hook(functions=functions)['MyFunction']
+
+            file_digest = 'stacker.hooks.aws_lambda._file_digest'
+            with mock.patch(file_digest) as file_digest:
+                cached = self.run_hook(functions=functions)['MyFunction']
+            file_digest.assert_not_called()
+            self.assertEqual(cached.S3Key, code.S3Key)
+
+            d.write('f1/f1.py', b'print("hello")')
+            changed = self.run_hook(functions=functions)['MyFunction']
+            self.assertNotEqual(changed.S3Key, code.S3Key)
+
+    @mock.patch('stacker.hooks.aws_lambda.ZIP_CONCURRENCY', 2)
+    def test_zip_files(self):
+        files = ['b.txt', 'a/big.bin', 'a/run.sh', 'empty']
+        contents = {
+            'b.txt': b'b' * 100,
+            'a/big.bin': os.urandom(3 * 1024 * 1024),
+            'a/run.sh': b'#!/bin/sh\n',
+            'empty': b'',
+        }
+        with TempDirectory() as d:
+            for fname in files:
+                d.write(fname, contents[fname])
+            os.chmod(os.path.join(d.path, 'a/run.sh'), 0o700)
+
+            with _zip_files(files, d.path) as payload:
+                data = payload.read()
+            os.utime(os.path.join(d.path, 'b.txt'), (0, 0))
+            with _zip_files(files, d.path) as payload:
+                self.assertEqual(payload.read(), data,
+                                 'payloads should be reproducible')
+
+        with ZipFile(StringIO(data), 'r') as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.namelist(), sorted(files))
+            for zip_info in zip_file.infolist():
+                self.assertEqual(zip_file.read(zip_info),
+                                 contents[zip_info.filename])
+                perms = (zip_info.external_attr & ZIP_PERMS_MASK) >> 16
+                expected = 0o755 if zip_info.filename == 'a/run.sh' \
+                    else 0o644
+                self.assertEqual(perms, expected)
+
+    def test_zipfile_internals(self):
+        with ZipFile(StringIO(), 'w') as zip_file:
+            self.assertTrue(aws_lambda._can_write_compressed(zip_file))
+
+    @mock.patch('stacker.hooks.aws_lambda.ZIP_CONCURRENCY', 2)
+    def test_zip_files_public_api(self):
+        files = ['b.txt', 'a/big.bin', 'a/run.sh', 'empty']
+        with TempDirectory() as d:
+            d.write('b.txt', b'b' * 100)
+            d.write('a/big.bin', os.urandom(3 * 1024 * 1024))
+            d.write('a/run.sh', b'#!/bin/sh\n')
+            d.write('empty', b'')
+            os.chmod(os.path.join(d.path, 'a/run.sh'), 0o700)
+
+            with _zip_files(files, d.path) as payload:
+                data = payload.read()
+            with mock.patch.object(aws_lambda, '_can_write_compressed',
+                                   return_value=False), \
+                    mock.patch.object(aws_lambda,
+                                      '_write_compressed') as write:
+                with _zip_files(files, d.path) as payload:
+                    self.assertEqual(payload.read(), data)
+            write.assert_not_called()
+
     def test_calculate_hash_diff_filename_same_contents(self):
         files = ["file1.txt", "f2/file2.txt"]
         file1, file2 = files
@@ -0,0 +1,135 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import os
+import unittest
+
+import mock
+from testfixtures import TempDirectory
+
+from stacker.hooks import patterns
+from stacker.hooks.patterns import Pattern, find_files
+
+FILES = (
+    'f1.py',
+    'f1.pyc',
+    'test/__init__.py',
+    'test/f1.py',
+    'test2/test.txt',
+    'lib/test',
+    'src/a/b.py',
+    'src/c.py',
+    'node_modules/x/index.js',
+    'node_modules/.cache/y',
+    '.git/HEAD',
+    '__pycache__/f1.cpython-36.pyc',
+)
+
+
+class TestPattern(unittest.TestCase):
+
+    def assert_matches(self, glob, matched, unmatched):
+        compiled = Pattern.create(glob)
+        for path in matched:
+            self.assertTrue(any(p.match(path) for p in compiled),
+                            "%s should match %s" % (glob, path))
+        for path in unmatched:
+            self.assertFalse(any(p.match(path) for p in compiled),
+                             "%s should not match %s" % (glob, path))
+
+    def test_match(self):
+        self.assert_matches('*.py', ['a.py', 'a/b/c.py'], ['a.pyc', 'a/py'])
+        self.assert_matches('/*.py', ['a.py'], ['a/b.py'])
+        self.assert_matches('test/', ['test/a', 'x/test/a/b', 'x/test'],
+                            ['testing/a', 'x/test.py'])
+        self.assert_matches('/src/**/*.py', ['src/a.py', 'src/a/b/c.py'],
+                            ['x/src/a.py', 'src/a.txt'])
+        self.assert_matches('**/a/*/c', ['a/b/c', 'x/a/b/c'],
+                            ['a/c', 'a/b/b/c'])
+        self.assert_matches('?1.[!p]*', ['f1.txt', 'x/g1.c'],
+                            ['f1.py', 'ff1.txt'])
+        self.assert_matches('./a//b.py', ['a/b.py', 'x/a/b.py'], ['b.py'])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Pattern.create('../*.py')
+
+    def test_subtree(self):
+        pattern, _ = Pattern.create('node_modules/')
+        self.assertTrue(pattern.matches_subtree('node_modules/'))
+        self.assertTrue(pattern.matches_subtree('a/node_modules/'))
+        self.assertFalse(pattern.matches_subtree('node_modules_old/'))
+        self.assertFalse(Pattern.create('src/*')[0].matches_subtree('src/'))
+
+    def test_may_match_below(self):
+        pattern, = Pattern.create('/src/a/*.py')
+        self.assertTrue(pattern.may_match_below(['src']))
+        self.assertTrue(pattern.may_match_below(['src', 'a']))
+        self.assertFalse(pattern.may_match_below(['src', 'a', 'b']))
+        self.assertFalse(pattern.may_match_below(['lib']))
+        pattern, = Pattern.create('/src/**/*.py')
+        self.assertTrue(pattern.may_match_below(['src', 'a', 'b']))
+        self.assertFalse(pattern.may_match_below(['lib', 'src']))
+
+
+class TestFindFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = TempDirectory()
+        self.addCleanup(self.directory.cleanup)
+        for f in FILES:
+            self.directory.write(f, b'')
+
+    def find_files(self, includes, excludes=None, follow_symlinks=False):
+        return sorted(find_files(self.directory.path, includes, excludes,
+                                 follow_symlinks))
+
+    def test_find_files(self):
+        self.assertEqual(self.find_files(['**'], ['*.pyc', 'node_modules/']), [
+            os.path.join('.', 'f1.py'),
+            os.path.join('.', 'lib', 'test'),
+            os.path.join('.', 'src', 'a', 'b.py'),
+            os.path.join('.', 'src', 'c.py'),
+            os.path.join('.', 'test', '__init__.py'),
+            os.path.join('.', 'test', 'f1.py'),
+            os.path.join('.', 'test2', 'test.txt'),
+        ])
+        self.assertEqual(self.find_files(['test/']), [
+            os.path.join('.', 'lib', 'test'),
+            os.path.join('.', 'test', '__init__.py'),
+            os.path.join('.', 'test', 'f1.py'),
+        ])
+
+    def test_prunes_directories(self):
+        listed = []
+
+        def scandir(path):
+            listed.append(os.path.relpath(path, self.directory.path))
+            return os.scandir(path)
+
+        with mock.patch.object(patterns, 'scandir', side_effect=scandir):
+            self.assertEqual(self.find_files(['/src/*.py'], ['.cache/']),
+                             [os.path.join('.', 'src', 'c.py')])
+            self.assertEqual(sorted(listed), ['.', 'src'])
+
+            listed[:] = []
+            self.find_files(['**'], ['.cache/', 'test*/'])
+            self.assertEqual(sorted(listed), [
+                '.', 'lib', 'node_modules', os.path.join('node_modules', 'x'),
+                'src', os.path.join('src', 'a')])
+
+    def test_symlinks(self):
+        root = self.directory.path
+        os.symlink(os.path.join(root, 'src'), os.path.join(root, 'link'))
+        os.symlink(os.path.join(root, 'f1.py'), os.path.join(root, 'f2.py'))
+
+        self.assertEqual(self.find_files(['*.py'], ['src/', 'test/']),
+                         [os.path.join('.', 'f1.py')])
+        self.assertEqual(
+            self.find_files(['*.py'], ['src/', 'test/'], follow_symlinks=True),
+            [
+                os.path.join('.', 'f1.py'),
+                os.path.join('.', 'f2.py'),
+                os.path.join('.', 'link', 'a', 'b.py'),
+                os.path.join('.', 'link', 'c.py'),
+            ])
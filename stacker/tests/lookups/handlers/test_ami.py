@@ -1,12 +1,18 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import shutil
+import tempfile
 import unittest
 import mock
 from botocore.stub import Stubber
-from stacker.lookups.handlers.ami import handler, ImageNotFound
+from stacker.lookups.handlers.ami import handler, ImageNotFound, clear_cache
 import boto3
-from stacker.tests.factories import SessionStub, mock_provider
+from stacker.tests.factories import (
+    SessionStub,
+    mock_context,
+    mock_provider,
+)
 
 REGION = "us-east-1"
 
@@ -17,6 +23,8 @@ class TestAMILookup(unittest.TestCase):
     def setUp(self):
         self.stubber = Stubber(self.client)
         self.provider = mock_provider(region=REGION)
+        clear_cache()
+        self.addCleanup(clear_cache)
 
     @mock.patch("stacker.lookups.handlers.ami.get_session",
                 return_value=SessionStub(client))
@@ -192,3 +200,69 @@ class TestAMILookup(unittest.TestCase):
                     value="owners:self name_regex:MyImage\s\d",
                     provider=self.provider
                 )
+
+    @mock.patch("stacker.lookups.handlers.ami.get_session",
+                return_value=SessionStub(client))
+    def test_images_shared_within_run(self, mock_client):
+        self.stubber.add_response(
+            "describe_images",
+            {
+                "Images": [
+                    {
+                        "CreationDate": "2011-02-13T01:17:44.000Z",
+                        "ImageId": "ami-111",
+                        "Name": "Fake Image 1",
+                    },
+                    {
+                        "CreationDate": "2011-02-14T01:17:44.000Z",
+                        "ImageId": "ami-222",
+                        "Name": "Other Image 1",
+                    },
+                ]
+            }
+        )
+
+        with self.stubber:
+            self.assertEqual(
+                handler(value="owners:self name_regex:Fake\\sImage\\s\\d",
+                        provider=self.provider),
+                "ami-111")
+            # Served from the images fetched by the previous lookup.
+            self.assertEqual(
+                handler(value="owners:self name_regex:Other\\sImage\\s\\d",
+                        provider=self.provider),
+                "ami-222")
+        self.stubber.assert_no_pending_responses()
+
+    @mock.patch("stacker.lookups.handlers.ami.get_session",
+                return_value=SessionStub(client))
+    def test_image_id_cached_on_disk(self, mock_client):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        context = mock_context(
+            extra_config_args={"stacker_cache_dir": cache_dir})
+        self.stubber.add_response(
+            "describe_images",
+            {
+                "Images": [
+                    {
+                        "CreationDate": "2011-02-13T01:17:44.000Z",
+                        "ImageId": "ami-111",
+                        "Name": "Fake Image 1",
+                    },
+                ]
+            }
+        )
+
+        value = "owners:self name_regex:Fake\\sImage\\s\\d"
+        with self.stubber:
+            self.assertEqual(
+                handler(value=value, provider=self.provider, context=context),
+                "ami-111")
+
+        # A new run doesn't call DescribeImages again.
+        clear_cache()
+        with self.stubber:
+            self.assertEqual(
+                handler(value=value, provider=self.provider, context=context),
+                "ami-111")
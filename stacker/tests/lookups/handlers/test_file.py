@@ -104,7 +104,7 @@ class TestFileTranslator(unittest.TestCase):
                 return_value='')
     def test_file_loaded(self, content_mock):
         handler(u'plain:file://tmp/test')
-        content_mock.assert_called_with(u'file://tmp/test')
+        content_mock.assert_called_with(u'file://tmp/test', context=None)
 
     @mock.patch('stacker.lookups.handlers.file.read_value_from_path',
                 return_value=u'Hello, world')
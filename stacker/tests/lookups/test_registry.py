@@ -1,9 +1,24 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import os.path
+import threading
+import time
 import unittest
 
-from stacker.lookups.registry import LOOKUP_HANDLERS
+from mock import MagicMock, patch
+
+from stacker.exceptions import UnknownLookupType
+from stacker.lookups.registry import (
+    LOOKUP_HANDLERS,
+    LookupHandlers,
+    register_lookup_handler,
+    resolve_lookups,
+    submit_lookups,
+    unregister_lookup_handler,
+)
+
+from ..factories import mock_lookup
 
 
 class TestRegistry(unittest.TestCase):
@@ -18,3 +33,107 @@ class TestRegistry(unittest.TestCase):
                     False,
                     "Lookup handler: '{}' was not registered".format(handler),
                 )
+
+    def test_resolve_lookups_concurrently(self):
+        # Every lookup blocks until all of them are running, which only
+        # completes if they're resolved at the same time.
+        running = []
+        condition = threading.Condition()
+
+        def handler(value, **kwargs):
+            with condition:
+                running.append(value)
+                condition.notify_all()
+                while len(running) < 3:
+                    if not condition.wait(5):
+                        raise RuntimeError("lookups were not concurrent")
+            return value.upper()
+
+        register_lookup_handler("blocking", handler)
+        self.addCleanup(unregister_lookup_handler, "blocking")
+        lookups = [mock_lookup(v, "blocking") for v in ("a", "b", "c")]
+        resolved = resolve_lookups(lookups, MagicMock(), MagicMock())
+        self.assertEqual(
+            dict((lookup.input, value) for lookup, value in resolved.items()),
+            {"a": "A", "b": "B", "c": "C"},
+        )
+
+    def test_resolve_lookups_raises_error(self):
+        def handler(value, **kwargs):
+            raise ValueError(value)
+
+        register_lookup_handler("error", handler)
+        self.addCleanup(unregister_lookup_handler, "error")
+        lookups = [mock_lookup("a", "error"), mock_lookup("b", "unknown")]
+        with self.assertRaises((ValueError, UnknownLookupType)):
+            resolve_lookups(lookups, MagicMock(), MagicMock())
+
+
+class FakeEntryPoint(object):
+
+    def __init__(self, name, handler):
+        self.name = name
+        self.load = MagicMock(return_value=handler)
+
+
+class TestLookupHandlers(unittest.TestCase):
+
+    def test_handler_imported_on_first_use(self):
+        handlers = LookupHandlers({"basename": "os.path.basename"})
+        self.assertIn("basename", handlers)
+        with patch("stacker.lookups.registry.load_object_from_string",
+                   return_value=os.path.basename) as load:
+            self.assertIs(handlers["basename"], os.path.basename)
+            self.assertIs(handlers["basename"], os.path.basename)
+        load.assert_called_once_with("os.path.basename")
+
+    def test_entry_points(self):
+        def handler(value, **kwargs):
+            return value
+
+        entry_points = [
+            FakeEntryPoint("custom", handler),
+            FakeEntryPoint("builtin", MagicMock()),
+        ]
+        handlers = LookupHandlers({"builtin": "os.path.basename"})
+        with patch("stacker.lookups.registry._iter_entry_points",
+                   return_value=entry_points) as iter_entry_points:
+            self.assertIs(handlers["builtin"], os.path.basename)
+            iter_entry_points.assert_not_called()
+
+            self.assertIs(handlers["custom"], handler)
+            self.assertIs(handlers["custom"], handler)
+            with self.assertRaises(KeyError):
+                handlers["unknown"]
+        iter_entry_points.assert_called_once_with("stacker.lookups")
+        entry_points[0].load.assert_called_once_with()
+        entry_points[1].load.assert_not_called()
+
+    def test_entry_points_concurrently(self):
+        def handler(value, **kwargs):
+            return value.upper()
+
+        entry_point = FakeEntryPoint("mylookup", handler)
+
+        def iter_entry_points(group):
+            # Give the other lookups time to ask for the handler
+            time.sleep(0.1)
+            return [entry_point]
+
+        lookups = [mock_lookup(v, "mylookup") for v in "abcde"]
+        with patch("stacker.lookups.registry.LOOKUP_HANDLERS",
+                   LookupHandlers()), \
+                patch("stacker.lookups.registry._iter_entry_points",
+                      side_effect=iter_entry_points) as iter_mock:
+            futures = submit_lookups(lookups, MagicMock(), MagicMock())
+            results = [future.result() for future in futures.values()]
+        self.assertEqual(results, ["A", "B", "C", "D", "E"])
+        iter_mock.assert_called_once_with("stacker.lookups")
+        entry_point.load.assert_called_once_with()
+
+    def test_unknown_lookup_type(self):
+        with patch("stacker.lookups.registry._iter_entry_points",
+                   return_value=[]):
+            with self.assertRaises(UnknownLookupType):
+                resolve_lookups([mock_lookup("a", "not-registered")],
+                                MagicMock(), MagicMock())
@@ -2,9 +2,15 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 from builtins import next
+import datetime
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 
+from mock import patch
+
 from stacker.config import (
     render_parse_load,
     load,
@@ -17,6 +23,7 @@ from stacker.config import Config, ExternalStack, Stack
 from stacker.environment import parse_environment
 from stacker import exceptions
 from stacker.lookups.registry import LOOKUP_HANDLERS
+from stacker.util import yaml_to_ordered_dict
 
 from yaml.constructor import ConstructorError
 
@@ -513,6 +520,7 @@ stacks:
         load(config)
         self.assertTrue(callable(LOOKUP_HANDLERS["custom"]))
 
+    @patch("stacker.config.CONFIG_CACHE_TTL", 0)
     def test_render_parse_load_namespace_fallback(self):
         conf = """
         stacks:
@@ -524,6 +532,52 @@ stacks:
         config.validate()
         self.assertEquals(config.namespace, "prod")
 
+    @patch("stacker.config.CONFIG_CACHE_TTL", 0)
+    def test_render_parse_load_parses_once(self):
+        conf = """
+        namespace: prod
+        stacks:
+        - name: vpc
+          class_path: blueprints.VPC
+        """
+        with patch("stacker.config.yaml_to_ordered_dict",
+                   wraps=yaml_to_ordered_dict) as parse_yaml:
+            config = render_parse_load(conf)
+        parse_yaml.assert_called_once_with(conf)
+        self.assertEqual(config.stacks[0].name, "vpc")
+
+    @patch("stacker.config.CONFIG_CACHE_TTL", 0)
+    @patch("stacker.config.SourceProcessor")
+    def test_render_parse_load_merges_remote_configs(self, processor):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        remote_config = os.path.join(tmp_dir, "remote.yaml")
+        with open(remote_config, "w") as f:
+            f.write("""
+namespace: remote
+stacker_bucket: ${bucket}
+stacks:
+- name: bastion
+  class_path: blueprints.Bastion
+""")
+        processor.return_value.configs_to_merge = [remote_config]
+
+        conf = """
+        namespace: prod
+        package_sources:
+          git:
+            - uri: git@github.com:acmecorp/stacker_blueprints.git
+        stacks:
+        - name: vpc
+          class_path: blueprints.VPC
+        """
+        config = render_parse_load(conf, environment={"bucket": "mybucket"})
+        processor.return_value.get_package_sources.assert_called_once_with()
+        self.assertEqual(config.namespace, "prod")
+        self.assertEqual(config.stacker_bucket, "mybucket")
+        self.assertEqual(
+            [stack.name for stack in config.stacks], ["bastion", "vpc"])
+
     def test_allow_most_keys_to_be_duplicates_for_overrides(self):
         yaml_config = """
         namespace: prod
@@ -584,3 +638,89 @@ stacks:
 
 if __name__ == '__main__':
     unittest.main()
+
+
+@patch("stacker.config.CONFIG_CACHE_TTL", 3600)
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.raw_config = """
+namespace: ${namespace}
+stacker_cache_dir: %s
+stacks:
+- name: vpc
+  class_path: blueprints.VPC
+  variables:
+    Cidr: 10.0.0.0/16
+""" % (self.tmp_dir,)
+
+    def render_parse_load(self, environment):
+        with patch("stacker.config.yaml_to_ordered_dict",
+                   wraps=yaml_to_ordered_dict) as parse_yaml:
+            config = render_parse_load(self.raw_config, environment)
+        return config, parse_yaml.called
+
+    def test_cache(self):
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertTrue(parsed)
+        self.assertTrue(os.listdir(os.path.join(self.tmp_dir, "config")))
+
+        cached, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertFalse(parsed)
+        self.assertEqual(cached.to_primitive(), config.to_primitive())
+        self.assertEqual(cached.stacks[0].variables, {"Cidr": "10.0.0.0/16"})
+
+        config, parsed = self.render_parse_load({"namespace": "dev"})
+        self.assertTrue(parsed)
+        self.assertEqual(config.namespace, "dev")
+
+    def test_not_cached_with_dates(self):
+        self.raw_config += "    Version: 2010-09-09\n"
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertEqual(config.stacks[0].variables["Version"],
+                         datetime.date(2010, 9, 9))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "config")))
+
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertTrue(parsed)
+        self.assertEqual(config.stacks[0].variables["Version"],
+                         datetime.date(2010, 9, 9))
+
+    def test_disabled(self):
+        with patch("stacker.config.CONFIG_CACHE_TTL", 0):
+            self.render_parse_load({"namespace": "prod"})
+            config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertTrue(parsed)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "config")))
+
+    def test_not_cached_without_validation(self):
+        render_parse_load(self.raw_config, {"namespace": "prod"},
+                          validate=False)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "config")))
+
+    @patch("stacker.config.stage_package_sources")
+    def test_remote_config_changes(self, stage_package_sources):
+        remote_config = os.path.join(self.tmp_dir, "remote.yaml")
+        stage_package_sources.return_value = [remote_config]
+        self.raw_config += """
+package_sources:
+  git:
+  - uri: git@github.com:acmecorp/stacker_blueprints.git
+"""
+        with open(remote_config, "w") as f:
+            f.write("tags:\n  team: a\n")
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertEqual(config.tags, {"team": "a"})
+
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertFalse(parsed)
+        self.assertEqual(config.tags, {"team": "a"})
+
+        with open(remote_config, "w") as f:
+            f.write("tags:\n  team: b\n")
+        config, parsed = self.render_parse_load({"namespace": "prod"})
+        self.assertTrue(parsed)
+        self.assertEqual(config.tags, {"team": "b"})
+        self.assertEqual(stage_package_sources.call_count, 3)
@@ -1,6 +1,7 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import threading
 import unittest
 
 from stacker.context import Context, get_fqn
@@ -111,6 +112,11 @@ class TestContext(unittest.TestCase):
         context = Context(config=config)
         self.assertEqual(context.tags, {"stacker_namespace": "test"})
 
+    def test_context_config_directory(self):
+        context = Context(config=self.config,
+                          config_path="/path/to/stacker.yaml")
+        self.assertEqual(context.config_directory, "/path/to")
+
     def test_hook_with_sys_path(self):
         config = Config({
             "namespace": "test",
@@ -128,6 +134,26 @@ class TestContext(unittest.TestCase):
         handle_hooks(stage, context.config[stage], "mock-region-1", context)
         self.assertEqual("mockResult", context.hook_data["myHook"]["result"])
 
+    def test_set_hook_data_from_threads(self):
+        context = Context(config=self.config)
+        errors = []
+
+        def set_hook_data(key):
+            try:
+                context.set_hook_data(key, {"key": key})
+            except KeyError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=set_hook_data, args=(key,))
+                   for key in ["a", "b", "c"] * 10]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(context.hook_data), ["a", "b", "c"])
+        self.assertEqual(len(errors), 27)
+
 
 class TestFunctions(unittest.TestCase):
     """ Test the module level functions """
@@ -0,0 +1,86 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from stacker.disk_cache import DiskCache, FileLock, cache_key
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_cache_key(self):
+        self.assertEqual(cache_key("a", {"b": 1, "c": 2}),
+                         cache_key("a", {"c": 2, "b": 1}))
+        self.assertNotEqual(cache_key("a", 1), cache_key("a", 2))
+
+    def test_get_set(self):
+        cache = DiskCache(os.path.join(self.directory, "sub"))
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.get("missing", "default"), "default")
+        cache.set("key", {"value": [1, 2]})
+        self.assertEqual(cache.get("key"), {"value": [1, 2]})
+        self.assertEqual(os.listdir(cache.directory), ["key.json"])
+
+    def test_expired(self):
+        cache = DiskCache(self.directory, ttl=60)
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+        old = time.time() - 120
+        os.utime(os.path.join(self.directory, "key.json"), (old, old))
+        self.assertIsNone(cache.get("key"))
+
+    def test_corrupt_entry(self):
+        cache = DiskCache(self.directory)
+        with open(os.path.join(self.directory, "key.json"), "w") as f:
+            f.write("{not json")
+        self.assertIsNone(cache.get("key"))
+
+    def test_unserializable_value(self):
+        cache = DiskCache(self.directory)
+        cache.set("key", {"value": object()})
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestFileLock(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "locks", "package.lock")
+
+    def test_exclusive(self):
+        events = []
+
+        def hold(name):
+            with FileLock(self.path):
+                events.append((name, "acquired"))
+                time.sleep(0.05)
+                events.append((name, "released"))
+
+        threads = [threading.Thread(target=hold, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(events), 6)
+        for acquired, released in zip(events[::2], events[1::2]):
+            self.assertEqual(acquired[0], released[0])
+            self.assertEqual(acquired[1], "acquired")
+
+    def test_reacquire(self):
+        lock = FileLock(self.path)
+        with lock:
+            self.assertTrue(os.path.exists(self.path))
+        with lock:
+            pass
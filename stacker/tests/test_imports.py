@@ -0,0 +1,50 @@
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import stacker
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(
+    stacker.__file__)))
+
+# Modules that are only imported once a code path needs them
+LAZY_MODULES = [
+    "awacs",
+    "boto3",
+    "botocore.client",
+    "git",
+    "troposphere",
+]
+
+
+def imported_modules(statement, modules):
+    """Return which of the modules are imported after running the statement
+    in a new interpreter."""
+    code = "%s; import json, sys; print(json.dumps([m for m in %r " \
+        "if m in sys.modules]))" % (statement, modules)
+    output = subprocess.check_output([sys.executable, "-c", code],
+                                     cwd=PROJECT_ROOT,
+                                     universal_newlines=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_commands(self):
+        self.assertEqual(
+            imported_modules("import stacker.commands", LAZY_MODULES), [])
+
+    def test_lookups(self):
+        self.assertEqual(
+            imported_modules("import stacker.lookups.registry",
+                             LAZY_MODULES), [])
+
+    def test_aws_lambda_hook(self):
+        self.assertEqual(
+            imported_modules("import stacker.hooks.aws_lambda",
+                             ["troposphere"]), [])
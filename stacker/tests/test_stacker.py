@@ -3,10 +3,13 @@ from __future__ import division
 from __future__ import absolute_import
 import unittest
 
+from mock import patch
+
 from stacker.commands import Stacker
 from stacker.exceptions import InvalidConfig
 
 
+@patch("stacker.config.CONFIG_CACHE_TTL", 0)
 class TestStacker(unittest.TestCase):
 
     def test_stacker_build_parse_args(self):
@@ -6,13 +6,25 @@ standard_library.install_aliases()
 
 import unittest
 
+import shutil
+import datetime
+import io
 import string
 import os
+import subprocess
+import sys
+import threading
+import time
 import queue
+import tempfile
 
 import mock
 
 import boto3
+from botocore.exceptions import ClientError
+from dateutil.tz import tzutc
+import yaml
+from yaml.constructor import ConstructorError
 
 from stacker.config import Hook, GitPackageSource
 from stacker.util import (
@@ -26,10 +38,13 @@ from stacker.util import (
     get_s3_endpoint,
     s3_bucket_location_constraint,
     parse_cloudformation_template,
+    read_file,
+    read_value_from_path,
     Extractor,
     TarExtractor,
     TarGzipExtractor,
     ZipExtractor,
+    S3ObjectReader,
     SourceProcessor
 )
 
@@ -122,6 +137,27 @@ class TestUtil(unittest.TestCase):
         self.assertEqual(list(config['pre_build'].keys())[0], 'hook2')
         self.assertEqual(config['pre_build']['hook2']['path'], 'foo.bar')
 
+    def test_yaml_to_ordered_dict_loaders(self):
+        raw_config = """
+        stacks:
+          vpc:
+            class_path: blueprints.VPC
+          bastion:
+            class_path: blueprints.Bastion
+        """
+        duplicated = raw_config + """
+          vpc:
+            class_path: blueprints.VPC
+        """
+        loaders = [yaml.SafeLoader]
+        if hasattr(yaml, "CSafeLoader"):
+            loaders.append(yaml.CSafeLoader)
+        for loader in loaders:
+            config = yaml_to_ordered_dict(raw_config, loader=loader)
+            self.assertEqual(list(config["stacks"]), ["vpc", "bastion"])
+            with self.assertRaises(ConstructorError):
+                yaml_to_ordered_dict(duplicated, loader=loader)
+
     def test_get_client_region(self):
         regions = ["us-east-1", "us-west-1", "eu-west-1", "sa-east-1"]
         for region in regions:
@@ -298,6 +334,314 @@ def result_hook(*args, **kwargs):
     return {"foo": "bar"}
 
 
+def order_hook(name, value=None, **kwargs):
+    hook_queue.put(name)
+    return {"name": name, "value": value}
+
+
+hook_event = threading.Event()
+
+
+def wait_hook(*args, **kwargs):
+    return hook_event.wait(5)
+
+
+def set_hook(*args, **kwargs):
+    hook_event.set()
+    return True
+
+
+class TestSourceProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.repo_dir = os.path.join(self.tmp_dir, "repo")
+        self.uri = "file://" + self.repo_dir
+        self.git("init", "-q", self.repo_dir)
+        self.commits = []
+        for version in ["1", "2"]:
+            with open(os.path.join(self.repo_dir, "version"), "w") as f:
+                f.write(version)
+            self.git("add", "version")
+            self.git("commit", "-q", "-m", version)
+            self.git("tag", "v" + version)
+            self.commits.append(self.git("rev-parse", "HEAD").strip())
+
+        self.addCleanup(setattr, sys, "path", list(sys.path))
+        self.sp = SourceProcessor(
+            sources={},
+            stacker_cache_dir=os.path.join(self.tmp_dir, "cache"))
+
+    def git(self, *args):
+        cmd = ["git", "-c", "user.name=stacker", "-c", "user.email=s@t.com"]
+        if args[0] != "init":
+            cmd += ["-C", self.repo_dir]
+        return subprocess.check_output(cmd + list(args)).decode("utf-8")
+
+    def checked_out_version(self, dir_name):
+        path = os.path.join(self.sp.package_cache_dir, dir_name)
+        with open(os.path.join(path, "version")) as f:
+            version = f.read()
+        shallow = os.path.exists(os.path.join(path, ".git", "shallow"))
+        return version, shallow
+
+    def test_shallow_clone_commit(self):
+        dir_name = self.sp.download_git_package(
+            {"uri": self.uri, "commit": self.commits[0]})
+        self.assertEqual(self.checked_out_version(dir_name), ("1", True))
+
+    def test_shallow_clone_tag(self):
+        dir_name = self.sp.download_git_package(
+            {"uri": self.uri, "tag": "v1"})
+        self.assertEqual(self.checked_out_version(dir_name), ("1", True))
+
+    def test_full_clone_fallback(self):
+        from git import GitCommandError, Repo
+        with mock.patch.object(Repo, "init",
+                               side_effect=GitCommandError("fetch", 1)):
+            dir_name = self.sp.download_git_package(
+                {"uri": self.uri, "commit": self.commits[0]})
+        self.assertEqual(self.checked_out_version(dir_name), ("1", False))
+
+    def test_install_package_once(self):
+        downloads = []
+
+        def download(path):
+            downloads.append(path)
+            os.mkdir(path)
+            time.sleep(0.05)
+            with open(os.path.join(path, "version"), "w") as f:
+                f.write("1")
+
+        threads = [
+            threading.Thread(target=self.sp.install_package,
+                             args=("package", download, "test"))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(downloads), 1)
+        self.assertEqual(self.checked_out_version("package"), ("1", False))
+        self.assertEqual(
+            sorted(os.listdir(self.sp.package_cache_dir)),
+            [".locks", "package"])
+
+    def test_install_package_failure(self):
+        def download(path):
+            os.mkdir(path)
+            raise ValueError("download failed")
+
+        with self.assertRaises(ValueError):
+            self.sp.install_package("package", download, "test")
+        self.assertEqual(os.listdir(self.sp.package_cache_dir), [".locks"])
+
+    @mock.patch("stacker.util.GIT_LS_REMOTE_CACHE_TTL", 300)
+    def test_ls_remote_cache(self):
+        ls_remote = mock.Mock(wraps=self.sp._git_ls_remote)
+        self.sp._git_ls_remote = ls_remote
+        for _ in range(2):
+            self.assertEqual(self.sp.git_ls_remote(self.uri, "HEAD"),
+                             self.commits[1].encode("utf-8"))
+        self.assertEqual(ls_remote.call_count, 1)
+
+        with mock.patch("stacker.util.GIT_LS_REMOTE_CACHE_TTL", 0):
+            self.sp.git_ls_remote(self.uri, "HEAD")
+        self.assertEqual(ls_remote.call_count, 2)
+
+    @mock.patch("stacker.util.PACKAGE_SOURCE_CONCURRENCY", 4)
+    def test_get_package_sources_order(self):
+        self.sp.sources = {"git": [
+            {"uri": self.uri, "tag": "v2", "configs": ["version"]},
+            {"uri": self.uri, "commit": self.commits[0],
+             "configs": ["version"]},
+            {"uri": self.uri, "tag": "v2"},
+        ]}
+        self.sp.get_package_sources()
+        versions = []
+        for path in self.sp.configs_to_merge:
+            with open(path) as f:
+                versions.append(f.read())
+        self.assertEqual(versions, ["2", "1"])
+        expected = [os.path.dirname(path)
+                    for path in self.sp.configs_to_merge]
+        expected.append(os.path.dirname(self.sp.configs_to_merge[0]))
+        self.assertEqual(sys.path[-3:], expected)
+
+
+class FakeS3Client(object):
+    """Serves GetObject requests for a single object."""
+
+    def __init__(self, data, etag='"1"', day=1):
+        self.calls = []
+        self.update(data, etag, day)
+
+    def update(self, data, etag, day):
+        self.data = data
+        self.etag = etag
+        self.last_modified = datetime.datetime(2018, 1, day, tzinfo=tzutc())
+
+    def get_object(self, Bucket, Key, Range=None, IfNoneMatch=None,
+                   IfMatch=None, **kwargs):
+        self.calls.append({"Range": Range, "IfNoneMatch": IfNoneMatch,
+                           "IfMatch": IfMatch})
+        if IfNoneMatch == self.etag:
+            raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+        if IfMatch is not None and IfMatch != self.etag:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}},
+                              "GetObject")
+        response = {"ETag": self.etag, "LastModified": self.last_modified}
+        body = self.data
+        if Range is not None:
+            start, end = [int(i) for i in Range[6:].split("-")]
+            body = self.data[start:end + 1]
+            response["ContentRange"] = "bytes %d-%d/%d" % (
+                start, start + len(body) - 1, len(self.data))
+        response["ContentLength"] = len(body)
+        response["Body"] = io.BytesIO(body)
+        return response
+
+
+class TestS3ObjectReader(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(100)
+        self.client = FakeS3Client(self.data)
+
+    def reader(self, part_size=7):
+        response = self.client.get_object(Bucket="b", Key="k",
+                                          Range="bytes=0-%d" % (part_size - 1))
+        return S3ObjectReader(self.client, response, "b", "k",
+                              part_size=part_size)
+
+    def test_read(self):
+        reader = self.reader()
+        self.assertEqual(reader.read(3), self.data[:3])
+        self.assertEqual(reader.read(10), self.data[3:13])
+        self.assertEqual(reader.read(), self.data[13:])
+        self.assertEqual(reader.read(), b"")
+        reader.close()
+        ranges = [call["Range"] for call in self.client.calls]
+        self.assertEqual(len(ranges), 15)
+        self.assertEqual(ranges[-1], "bytes=98-99")
+        for call in self.client.calls[1:]:
+            self.assertEqual(call["IfMatch"], '"1"')
+
+    def test_single_part(self):
+        reader = self.reader(part_size=1024)
+        self.assertEqual(reader.read(), self.data)
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_object_changed(self):
+        reader = self.reader()
+        self.client.update(self.data, '"2"', 2)
+        with self.assertRaises(ClientError):
+            reader.read()
+        reader.close()
+
+
+@mock.patch("stacker.util.S3_PART_SIZE", 64)
+class TestS3PackageSources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.sp = SourceProcessor(
+            sources={},
+            stacker_cache_dir=os.path.join(self.tmp_dir, "cache"))
+        self.client = FakeS3Client(self.archive("tar.gz", "1"))
+        patcher = mock.patch("stacker.util.get_session")
+        get_session = patcher.start()
+        self.addCleanup(patcher.stop)
+        get_session.return_value.client.return_value = self.client
+
+    def archive(self, extension, version):
+        source = os.path.join(self.tmp_dir, "source")
+        if not os.path.isdir(source):
+            os.mkdir(source)
+        with open(os.path.join(source, "version"), "w") as f:
+            f.write(version)
+        base_name = os.path.join(self.tmp_dir, "archive")
+        formats = {"tar.gz": "gztar", "tar": "tar", "zip": "zip"}
+        path = shutil.make_archive(base_name, formats[extension], source)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def version(self, dir_name):
+        path = os.path.join(self.sp.package_cache_dir, dir_name, "version")
+        with open(path) as f:
+            return f.read()
+
+    def test_conditional_download(self):
+        config = {"bucket": "b", "key": "blueprints.tar.gz"}
+        dir_name = self.sp.download_s3_package(config)
+        self.assertEqual(dir_name, "s3-b-blueprints-20180101T000000Z")
+        self.assertEqual(self.version(dir_name), "1")
+        self.assertGreater(len(self.client.calls), 1)
+
+        self.client.calls = []
+        self.assertEqual(self.sp.download_s3_package(config), dir_name)
+        self.assertEqual(self.client.calls, [
+            {"Range": "bytes=0-63", "IfNoneMatch": '"1"', "IfMatch": None}])
+
+        self.client.update(self.archive("tar.gz", "2"), '"2"', 2)
+        dir_name = self.sp.download_s3_package(config)
+        self.assertEqual(dir_name, "s3-b-blueprints-20180102T000000Z")
+        self.assertEqual(self.version(dir_name), "2")
+
+    def test_archive_types(self):
+        for day, extension in enumerate(["tar", "zip"], 2):
+            self.client.update(self.archive(extension, extension),
+                               '"%s"' % extension, day)
+            dir_name = self.sp.download_s3_package(
+                {"bucket": "b", "key": "blueprints." + extension})
+            self.assertEqual(self.version(dir_name), extension)
+
+    def test_not_use_latest(self):
+        config = {"bucket": "b", "key": "blueprints.tar.gz",
+                  "use_latest": False}
+        dir_name = self.sp.download_s3_package(config)
+        self.assertEqual(dir_name, "s3-b-blueprints")
+        self.client.calls = []
+        self.assertEqual(self.sp.download_s3_package(config), dir_name)
+        self.assertEqual(self.client.calls, [])
+
+
+class TestReadValueFromPath(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "value.txt")
+        with open(self.path, "w") as f:
+            f.write("first")
+
+    def test_read_value_from_path_plain(self):
+        self.assertEqual(read_value_from_path("plain"), "plain")
+
+    def test_read_value_from_path_context(self):
+        context = mock_context(
+            config_path=os.path.join(self.directory, "stacker.yaml"))
+        with mock.patch("stacker.context.get_config_directory") as m:
+            self.assertEqual(
+                read_value_from_path("file://value.txt", context=context),
+                "first")
+        m.assert_not_called()
+
+    def test_read_file_cached_until_modified(self):
+        self.assertEqual(read_file(self.path), "first")
+        with mock.patch("stacker.util.open", create=True) as m:
+            self.assertEqual(read_file(self.path), "first")
+        m.assert_not_called()
+
+        with open(self.path, "w") as f:
+            f.write("second!")
+        self.assertEqual(read_file(self.path), "second!")
+
+
 class TestHooks(unittest.TestCase):
 
     def setUp(self):
@@ -415,6 +759,132 @@ class TestHooks(unittest.TestCase):
         with self.assertRaises(KeyError):
             handle_hooks("result", hooks, "us-east-1", self.context)
 
+    def hook_order(self):
+        order = []
+        while not hook_queue.empty():
+            order.append(hook_queue.get_nowait())
+        return order
+
+    def test_hook_data_dependency(self):
+        hooks = [
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "data_key": "second",
+                "args": {"name": "second",
+                         "value": "${hook_data first::value}"},
+            }),
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "data_key": "first",
+                "args": {"name": "first", "value": "1"},
+            }),
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "args": {"name": "third"},
+            }),
+        ]
+        handle_hooks("order", hooks, self.provider, self.context)
+        self.assertEqual(self.hook_order(), ["first", "second", "third"])
+        self.assertEqual(self.context.hook_data["second"]["value"], "1")
+
+    def test_requires(self):
+        hooks = [
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "args": {"name": "second"},
+                "requires": ["first"],
+            }),
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "data_key": "first",
+                "args": {"name": "first"},
+                "requires": ["stacker.tests.test_util.context_hook"],
+            }),
+            Hook({"path": "stacker.tests.test_util.context_hook"}),
+        ]
+        handle_hooks("order", hooks, self.provider, self.context)
+        self.assertEqual(self.hook_order(), ["first", "second"])
+
+    def test_requires_unknown_hook(self):
+        hooks = [
+            Hook({
+                "path": "stacker.tests.test_util.mock_hook",
+                "requires": ["missing"],
+            }),
+        ]
+        with self.assertRaises(ValueError):
+            handle_hooks("missing", hooks, self.provider, self.context)
+        self.assertTrue(hook_queue.empty())
+
+    def test_circular_requires(self):
+        hooks = [
+            Hook({
+                "path": "stacker.tests.test_util.mock_hook",
+                "requires": ["stacker.tests.test_util.context_hook"],
+            }),
+            Hook({
+                "path": "stacker.tests.test_util.context_hook",
+                "requires": ["stacker.tests.test_util.mock_hook"],
+            }),
+        ]
+        for concurrency in [1, 0]:
+            with self.assertRaises(ValueError):
+                handle_hooks("circular", hooks, self.provider, self.context,
+                             concurrency=concurrency)
+        self.assertTrue(hook_queue.empty())
+
+    def test_concurrent_hooks(self):
+        hooks = [
+            Hook({"path": "stacker.tests.test_util.wait_hook"}),
+            Hook({"path": "stacker.tests.test_util.set_hook"}),
+        ]
+        for concurrency in [0, 2]:
+            hook_event.clear()
+            handle_hooks("concurrent", hooks, self.provider, self.context,
+                         concurrency=concurrency)
+
+    def test_concurrent_hook_dependency(self):
+        hooks = [
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "args": {"name": "second",
+                         "value": "${hook_data first::value}"},
+            }),
+            Hook({
+                "path": "stacker.tests.test_util.order_hook",
+                "data_key": "first",
+                "args": {"name": "first", "value": "1"},
+            }),
+        ]
+        handle_hooks("order", hooks, self.provider, self.context,
+                     concurrency=0)
+        self.assertEqual(self.hook_order(), ["first", "second"])
+
+    def test_concurrent_hook_failure(self):
+        hooks = [
+            Hook({"path": "stacker.tests.test_util.exception_hook"}),
+            Hook({
+                "path": "stacker.tests.test_util.mock_hook",
+                "requires": ["stacker.tests.test_util.exception_hook"],
+            }),
+        ]
+        with self.assertRaises(Exception):
+            handle_hooks("fail", hooks, self.provider, self.context,
+                         concurrency=0)
+        self.assertTrue(hook_queue.empty())
+
+        hooks = [
+            Hook({"path": "stacker.tests.test_util.fail_hook"}),
+            Hook({"path": "stacker.tests.test_util.context_hook"}),
+        ]
+        with self.assertRaises(SystemExit):
+            handle_hooks("fail", hooks, self.provider, self.context,
+                         concurrency=0)
+
+        hooks[0].required = False
+        handle_hooks("ignore_failure", hooks, self.provider, self.context,
+                     concurrency=0)
+
 
 class TestException1(Exception):
     pass
@@ -6,7 +6,12 @@ import unittest
 
 from troposphere import s3
 from stacker.blueprints.variables.types import TroposphereType
-from stacker.variables import Variable
+from stacker.variables import (
+    Variable,
+    compile_value,
+    resolve,
+    resolve_variables,
+)
 from stacker.lookups import register_lookup_handler
 from stacker.stack import Stack
 from stacker.exceptions import FailedVariableLookup
@@ -209,6 +214,128 @@ class TestVariables(unittest.TestCase):
         self.assertTrue(var.resolved)
         self.assertEqual(var.value, "looked up: looked up: resolved")
 
+    def test_resolve_variables_shared_lookups(self):
+        calls = []
+
+        def mock_handler(value, context, provider, **kwargs):
+            calls.append(value)
+            return "looked up: {}".format(value)
+
+        register_lookup_handler("lookup", mock_handler)
+        variables = [
+            Variable("Param1", "${lookup a}"),
+            Variable("Param2", ["${lookup a}", "${lookup b}"]),
+            Variable("Param3", "${lookup ${lookup c}}"),
+            Variable("Param4", "no lookups"),
+        ]
+        resolve_variables(variables, self.context, self.provider)
+        self.assertEqual(
+            [v.value for v in variables],
+            ["looked up: a", ["looked up: a", "looked up: b"],
+             "looked up: looked up: c", "no lookups"],
+        )
+        self.assertEqual(sorted(calls), ["a", "b", "c", "looked up: c"])
+
+    def test_resolve_variables_values_not_shared(self):
+        def mock_handler(value, context, provider, **kwargs):
+            return {"key": value}
+
+        register_lookup_handler("lookup", mock_handler)
+        preresolved = {mock_lookup("pre", "lookup"): {"key": "pre"}}
+        variables = [
+            Variable("Param1", "${lookup a}"),
+            Variable("Param2", "${lookup a}"),
+            Variable("Param3", "${lookup pre}"),
+        ]
+        resolve_variables(variables, self.context, self.provider,
+                          preresolved=preresolved)
+        variables[0].value["key"] = "changed"
+        variables[2].value["key"] = "changed"
+        self.assertEqual(variables[1].value, {"key": "a"})
+        self.assertEqual(list(preresolved.values()), [{"key": "pre"}])
+
+    def test_resolve_variables_failed_lookup(self):
+        def mock_handler(value, context, provider, **kwargs):
+            if value == "bad":
+                raise ValueError("bad lookup")
+            return value
+
+        register_lookup_handler("lookup", mock_handler)
+        variables = [
+            Variable("Param1", "${lookup good}"),
+            Variable("Param2", "${lookup bad}"),
+        ]
+        with self.assertRaises(FailedVariableLookup) as cm:
+            resolve_variables(variables, self.context, self.provider)
+        self.assertIn("`Param2`", str(cm.exception))
+
+    def test_compile_value(self):
+        value = {
+            "literal": "no lookups here",
+            "items": ["a", "${output stack::One}", 3],
+            "mixed": "x-${output stack::One}-${output stack::Two}",
+        }
+        expression = compile_value(value)
+        self.assertEqual(
+            sorted(lookup.raw for lookup in expression.lookups),
+            ["output stack::One", "output stack::Two"],
+        )
+        self.assertEqual(
+            sorted(key for key, _ in expression.children),
+            ["items", "mixed"],
+        )
+        self.assertIsNone(compile_value({"a": ["b", 1, None]}))
+        self.assertIsNone(compile_value("${not a lookup"))
+
+    def test_variable_lookups_cached(self):
+        var = Variable("Param1", ["${output stack::One}", "other"])
+        self.assertIs(var.lookups, var.lookups)
+
+    def test_resolve_unescapes_dollars(self):
+        value = "echo $$ ${output stack::One} $HOME"
+        self.assertEqual(
+            resolve(value, {"output stack::One": "resolved"}),
+            "echo $ resolved $HOME",
+        )
+        self.assertEqual(
+            resolve({"a": "$$x", "b": ["${output stack::One}"]},
+                    {"output stack::One": "resolved"}),
+            {"a": "$x", "b": ["resolved"]},
+        )
+
+    def test_compile_unescapes_dollars(self):
+        expression = compile_value("$$$$ ${output stack::One} $${x::y}")
+        self.assertEqual(
+            [getattr(segment, "raw", segment)
+             for segment in expression.segments],
+            ["$$ ", "output stack::One", " ${x::y}"],
+        )
+
+    def test_resolve_escaped_lookup(self):
+        var = Variable("Param1", "$${output stack::One}")
+        var.replace({mock_lookup("stack::One", "output"): "resolved"})
+        self.assertEqual(var.value, "${output stack::One}")
+        var.replace({mock_lookup("stack::One", "output"): "resolved"})
+        self.assertEqual(var.value, "resolved")
+
+    def test_variable_dollars_without_lookups(self):
+        var = Variable("Param1", "echo $$HOME")
+        self.assertEqual(var.lookups, frozenset())
+        self.assertEqual(var.value, "echo $$HOME")
+
+        var = Variable("Param1", ["$$a", "${output stack::One}"])
+        var.replace({mock_lookup("stack::One", "output"): "b"})
+        self.assertEqual(var.value, ["$a", "b"])
+
+    def test_variable_replace_nested_lookup(self):
+        var = Variable("Param1", "${lookup ${output stack::One}}")
+        self.assertEqual(
+            [lookup.raw for lookup in var.lookups], ["output stack::One"])
+        var.replace({mock_lookup("stack::One", "output"): "inner"})
+        self.assertEqual(var.value, "${lookup inner}")
+        self.assertEqual(
+            [lookup.raw for lookup in var.lookups], ["lookup inner"])
+
     def test_troposphere_type_no_from_dict(self):
         with self.assertRaises(ValueError):
             TroposphereType(object)
@@ -3,9 +3,11 @@ from __future__ import division
 from __future__ import absolute_import
 from builtins import str
 from builtins import object
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import uuid
 import importlib
+import io
 import logging
 import os
 import re
@@ -14,24 +16,61 @@ import subprocess
 import sys
 import tarfile
 import tempfile
+import threading
 import zipfile
 
 import collections
 from collections import OrderedDict
 
-import botocore.client
-import botocore.exceptions
-import dateutil
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 import yaml
 from yaml.constructor import ConstructorError
 from yaml.nodes import MappingNode
 
-from .awscli_yamlhelper import yaml_parse
+from .awscli_yamlhelper import SafeLoader, yaml_parse
+from stacker.disk_cache import (
+    DiskCache,
+    FileLock,
+    cache_key,
+    ensure_directory,
+    get_cache_dir,
+)
 from stacker.exceptions import FailedVariableLookup
 from stacker.session_cache import get_session
 
 logger = logging.getLogger(__name__)
 
+# The number of package sources that are downloaded at the same time
+PACKAGE_SOURCE_CONCURRENCY = int(
+    os.environ.get("STACKER_PACKAGE_SOURCE_CONCURRENCY", 8))
+
+# The number of seconds the commit ids `git ls-remote` resolves branches to
+# are cached for. 0 disables the cache.
+GIT_LS_REMOTE_CACHE_TTL = int(
+    os.environ.get("STACKER_GIT_LS_REMOTE_CACHE_TTL", 300))
+
+# The size of the parts S3 package sources are downloaded in, and the number
+# of parts downloaded at the same time
+S3_PART_SIZE = int(os.environ.get("STACKER_S3_PART_SIZE", 8 * 1024 * 1024))
+S3_DOWNLOAD_CONCURRENCY = int(
+    os.environ.get("STACKER_S3_DOWNLOAD_CONCURRENCY", 8))
+
+# The size of the chunks archives are copied in
+READ_CHUNK_SIZE = 64 * 1024
+
+# The number of hooks of a stage that run at the same time. When this is 1,
+# the default, hooks run one after another in the order they are defined in.
+# Otherwise each hook starts once the hooks it depends on are done, and 0
+# runs as many of them at a time as their dependencies allow.
+HOOK_CONCURRENCY = int(os.environ.get("STACKER_HOOK_CONCURRENCY", 1))
+
+# Loader classes created by yaml_to_ordered_dict, by base loader
+_ordered_unique_loaders = {}
+
 
 def camel_to_snake(name):
     """Converts CamelCase to snake_case.
@@ -236,17 +275,13 @@ def merge_map(a, b):
     return a
 
 
-def yaml_to_ordered_dict(stream, loader=yaml.SafeLoader):
-    """Provides yaml.load alternative with preserved dictionary order.
-
-    Args:
-        stream (string): YAML string to load.
-        loader (:class:`yaml.loader`): PyYAML loader class. Defaults to safe
-            load.
+def _ordered_unique_loader(loader):
+    """Return a subclass of the given pyYAML `loader` class which validates
+    that sibling keys aren't duplicated and returns OrderedDicts instead of
+    dicts. Subclasses are only created once per loader."""
+    if loader in _ordered_unique_loaders:
+        return _ordered_unique_loaders[loader]
 
-    Returns:
-        OrderedDict: Parsed YAML.
-    """
     class OrderedUniqueLoader(loader):
         """
         Subclasses the given pyYAML `loader` class.
@@ -319,7 +354,22 @@ def yaml_to_ordered_dict(stream, loader=yaml.SafeLoader):
     OrderedUniqueLoader.add_constructor(
         u'tag:yaml.org,2002:map', OrderedUniqueLoader.construct_yaml_map,
     )
-    return yaml.load(stream, OrderedUniqueLoader)
+    _ordered_unique_loaders[loader] = OrderedUniqueLoader
+    return OrderedUniqueLoader
+
+
+def yaml_to_ordered_dict(stream, loader=SafeLoader):
+    """Provides yaml.load alternative with preserved dictionary order.
+
+    Args:
+        stream (string): YAML string to load.
+        loader (:class:`yaml.loader`): PyYAML loader class. Defaults to safe
+            load, using libyaml when it is available.
+
+    Returns:
+        OrderedDict: Parsed YAML.
+    """
+    return yaml.load(stream, _ordered_unique_loader(loader))
 
 
 def uppercase_first_letter(s):
@@ -338,12 +388,202 @@ def cf_safe_name(name):
     return "".join([uppercase_first_letter(part) for part in parts])
 
 
-def handle_hooks(stage, hooks, provider, context):
+def _hook_dependencies(stage, hooks):
+    """Determine the hooks each hook of a stage depends on.
+
+    A hook depends on the hooks of its stage whose data it looks up with the
+    ``hook_data`` lookup in its args, and on the hooks listed in its
+    ``requires``, which are matched against the ``data_key`` of the hooks
+    first, and their ``path`` otherwise.
+
+    Args:
+        stage (str): The stage the hooks belong to.
+        hooks (list): The :class:`stacker.config.Hook` of the stage.
+
+    Returns:
+        list: The set of the indexes of the hooks each hook depends on.
+
+    Raises:
+        ValueError: If a hook requires a hook that isn't part of the stage.
+    """
+    from stacker.variables import Variable
+
+    by_data_key = {}
+    by_path = {}
+    for i, hook in enumerate(hooks):
+        if hook.data_key:
+            by_data_key.setdefault(hook.data_key, []).append(i)
+        by_path.setdefault(hook.path, []).append(i)
+
+    dependencies = []
+    for i, hook in enumerate(hooks):
+        required = set()
+        for key, value in (hook.args or {}).items():
+            var = Variable('{}.args.{}'.format(hook.path, key), value)
+            for lookup in var.lookups:
+                if lookup.type != "hook_data":
+                    continue
+                # The data of hooks from previous stages is already set
+                data_key = lookup.input.split("::")[0]
+                required.update(by_data_key.get(data_key, []))
+
+        for name in hook.requires or []:
+            matches = by_data_key.get(name) or by_path.get(name)
+            if not matches:
+                raise ValueError("%s hook %s requires %s, which isn't a "
+                                 "%s hook." % (stage, hook.path, name, stage))
+            required.update(matches)
+
+        required.discard(i)
+        dependencies.append(required)
+    return dependencies
+
+
+def _hook_order(stage, dependencies):
+    """Order hooks so that they come after the hooks they depend on, and in
+    the order they are defined in otherwise.
+
+    Args:
+        stage (str): The stage the hooks belong to.
+        dependencies (list): The set of the indexes of the hooks each hook
+            depends on, as returned by :func:`_hook_dependencies`.
+
+    Returns:
+        list: The indexes of the hooks, in the order they should run in.
+
+    Raises:
+        ValueError: If the hooks depend on each other in a cycle.
+    """
+    order = []
+    done = set()
+    while len(order) < len(dependencies):
+        for i, required in enumerate(dependencies):
+            if i not in done and required <= done:
+                break
+        else:
+            raise ValueError("%s hooks have circular dependencies." % stage)
+        order.append(i)
+        done.add(i)
+    return order
+
+
+def _run_hook(hook, provider, context):
+    """Run a single hook, storing the data it returns in the context.
+
+    Failures of hooks that aren't required are logged and ignored.
+
+    Args:
+        hook (:class:`stacker.config.Hook`): The hook to run.
+        provider (:class:`stacker.provider.base.BaseProvider`): The provider
+            the current stack is using.
+        context (:class:`stacker.context.Context`): The current stacker
+            context.
+    """
+    from stacker.variables import Variable
+
+    data_key = hook.data_key
+    required = hook.required
+    enabled = hook.enabled
+    if not enabled:
+        logger.debug("hook with method %s is disabled, skipping",
+                     hook.path)
+        return
+
+    # Resolve variables
+    kwargs = hook.args.copy() if hook.args else {}
+    try:
+        for key, value in kwargs.items():
+            var = Variable('{}.args.{}'.format(hook.path, key), value)
+            var.resolve(context, provider)
+            kwargs[key] = var.value
+    except FailedVariableLookup as e:
+        if required:
+            raise
+
+        logger.warning("Failed to resolve variable in non-required hook "
+                       " %s: %s", hook.path, e)
+        return
+
+    try:
+        method = load_object_from_string(hook.path)
+    except (AttributeError, ImportError):
+        logger.exception("Unable to load method at %s:", hook.path)
+        if required:
+            raise
+        return
+    try:
+        result = method(context=context, provider=provider, **kwargs)
+    except Exception:
+        logger.exception("Method %s threw an exception:", hook.path)
+        if required:
+            raise
+        return
+    if not result:
+        if required:
+            logger.error("Required hook %s failed. Return value: %s",
+                         hook.path, result)
+            sys.exit(1)
+        logger.warning("Non-required hook %s failed. Return value: %s",
+                       hook.path, result)
+    else:
+        if isinstance(result, Mapping):
+            if data_key:
+                logger.debug("Adding result for hook %s to context in "
+                             "data_key %s.", hook.path, data_key)
+                context.set_hook_data(data_key, result)
+            else:
+                logger.debug("Hook %s returned result data, but no data "
+                             "key set, so ignoring.", hook.path)
+
+
+def _walk_hooks(hooks, dependencies, provider, context, concurrency):
+    """Run hooks in threads, each one once the hooks it depends on are done.
+
+    Once a required hook fails, the hooks that haven't started yet are
+    skipped, and the error of the first failed hook is raised when the
+    running ones are done.
+    """
+    from stacker.dag import DAG, ThreadedWalker
+
+    names = ["%s (#%d)" % (hook.path, i) for i, hook in enumerate(hooks)]
+    indexes = dict((name, i) for i, name in enumerate(names))
+    dag = DAG()
+    for name in names:
+        dag.add_node(name)
+    for i, required in enumerate(dependencies):
+        for j in required:
+            dag.add_edge(names[i], names[j])
+
+    errors = {}
+
+    def walk_func(name):
+        if errors:
+            logger.debug("Skipping hook %s, a previous hook failed.", name)
+            return
+        try:
+            _run_hook(hooks[indexes[name]], provider, context)
+        except BaseException as e:
+            errors[indexes[name]] = e
+
+    if concurrency > 1:
+        semaphore = threading.Semaphore(concurrency)
+    else:
+        semaphore = None
+    ThreadedWalker(semaphore).walk(dag, walk_func)
+
+    if errors:
+        raise errors[min(errors)]
+
+
+def handle_hooks(stage, hooks, provider, context, concurrency=None):
     """ Used to handle pre/post_build hooks.
 
     These are pieces of code that we want to run before/after the builder
     builds the stacks.
 
+    Hooks run after the hooks they depend on (see :func:`_hook_dependencies`)
+    and, up to `concurrency` at a time, in parallel with the others.
+
     Args:
         stage (string): The current stage (pre_run, post_run, etc).
         hooks (list): A list of :class:`stacker.config.Hook` containing the
@@ -352,10 +592,9 @@ def handle_hooks(stage, hooks, provider, context):
             the current stack is using.
         context (:class:`stacker.context.Context`): The current stacker
             context.
+        concurrency (int, optional): The number of hooks to run at the same
+            time, 0 for no limit. Defaults to `HOOK_CONCURRENCY`.
     """
-
-    from stacker.variables import Variable
-
     if not hooks:
         logger.debug("No %s hooks defined.", stage)
         return
@@ -367,61 +606,18 @@ def handle_hooks(stage, hooks, provider, context):
         except KeyError:
             raise ValueError("%s hook #%d missing path." % (stage, i))
 
-    logger.info("Executing %s hooks: %s", stage, ", ".join(hook_paths))
-    for hook in hooks:
-        data_key = hook.data_key
-        required = hook.required
-        enabled = hook.enabled
-        if not enabled:
-            logger.debug("hook with method %s is disabled, skipping",
-                         hook.path)
-            continue
-
-        # Resolve variables
-        kwargs = hook.args.copy() if hook.args else {}
-        try:
-            for key, value in kwargs.items():
-                var = Variable('{}.args.{}'.format(hook.path, key), value)
-                var.resolve(context, provider)
-                kwargs[key] = var.value
-        except FailedVariableLookup as e:
-            if required:
-                raise
-
-            logger.warning("Failed to resolve variable in non-required hook "
-                           " %s: %s", hook.path, e)
-            continue
+    if concurrency is None:
+        concurrency = HOOK_CONCURRENCY
 
-        try:
-            method = load_object_from_string(hook.path)
-        except (AttributeError, ImportError):
-            logger.exception("Unable to load method at %s:", hook.path)
-            if required:
-                raise
-            continue
-        try:
-            result = method(context=context, provider=provider, **kwargs)
-        except Exception:
-            logger.exception("Method %s threw an exception:", hook.path)
-            if required:
-                raise
-            continue
-        if not result:
-            if required:
-                logger.error("Required hook %s failed. Return value: %s",
-                             hook.path, result)
-                sys.exit(1)
-            logger.warning("Non-required hook %s failed. Return value: %s",
-                           hook.path, result)
-        else:
-            if isinstance(result, collections.Mapping):
-                if data_key:
-                    logger.debug("Adding result for hook %s to context in "
-                                 "data_key %s.", hook.path, data_key)
-                    context.set_hook_data(data_key, result)
-                else:
-                    logger.debug("Hook %s returned result data, but no data "
-                                 "key set, so ignoring.", hook.path)
+    dependencies = _hook_dependencies(stage, hooks)
+    order = _hook_order(stage, dependencies)
+
+    logger.info("Executing %s hooks: %s", stage, ", ".join(hook_paths))
+    if concurrency == 1 or len(hooks) == 1:
+        for i in order:
+            _run_hook(hooks[i], provider, context)
+    else:
+        _walk_hooks(hooks, dependencies, provider, context, concurrency)
 
 
 def get_config_directory():
@@ -437,20 +633,57 @@ def get_config_directory():
     return os.path.dirname(namespace.config.name)
 
 
-def read_value_from_path(value):
+# Contents of files read with read_file, keyed by absolute path. Each entry is
+# a tuple of ((mtime, size), contents). Safe to share between threads thanks to
+# the GIL.
+_file_cache = {}
+
+
+def read_file(path):
+    """Read a text file, reusing its contents until the file is modified.
+
+    Args:
+        path (str): path of the file to read.
+
+    Returns:
+        str: the contents of the file.
+
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime, stat.st_size)
+    cached = _file_cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with open(path) as f:
+        contents = f.read()
+    _file_cache[path] = (version, contents)
+    return contents
+
+
+def read_value_from_path(value, context=None):
     """Enables translators to read values from files.
 
     The value can be referred to with the `file://` prefix. ie:
 
         conf_key: ${kms file://kms_value.txt}
 
+    Args:
+        value (str): the value, or a `file://` path relative to the config
+            file directory.
+        context (:class:`stacker.context.Context`, optional): the context
+            the config file directory is taken from. If not provided, it is
+            determined from the command line arguments.
+
     """
     if value.startswith('file://'):
         path = value.split('file://', 1)[1]
-        config_directory = get_config_directory()
-        relative_path = os.path.join(config_directory, path)
-        with open(relative_path) as read_file:
-            value = read_file.read()
+        if context is not None:
+            config_directory = context.config_directory
+        else:
+            config_directory = get_config_directory()
+        value = read_file(os.path.join(config_directory, path))
     return value
 
 
@@ -510,6 +743,8 @@ def ensure_s3_bucket(s3_client, bucket_name, bucket_region):
         bucket_region (str, optional): The region to create the bucket in. If
             not provided, will be determined by s3_client's region.
     """
+    import botocore.exceptions
+
     try:
         s3_client.head_bucket(Bucket=bucket_name)
     except botocore.exceptions.ClientError as e:
@@ -572,6 +807,21 @@ class Extractor(object):
         """Serve as placeholder; override this in subclasses."""
         return ''
 
+    def extract_stream(self, fileobj, destination):
+        """Extract an archive read from a file like object.
+
+        Archives that can't be read sequentially are first written to the
+        archive path next to destination.
+
+        Args:
+            fileobj (file): the archive to extract
+            destination (string): the directory to extract the archive to
+        """
+        self.set_archive(destination)
+        with open(self.archive, 'wb') as f:
+            shutil.copyfileobj(fileobj, f, READ_CHUNK_SIZE)
+        self.extract(destination)
+
 
 class TarExtractor(Extractor):
     """Extracts tar archives."""
@@ -581,6 +831,11 @@ class TarExtractor(Extractor):
         with tarfile.open(self.archive, 'r:') as tar:
             tar.extractall(path=destination)
 
+    def extract_stream(self, fileobj, destination):
+        """Extract the archive as it is read from fileobj."""
+        with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+            tar.extractall(path=destination)
+
     @staticmethod
     def extension():
         """Return archive extension."""
@@ -595,6 +850,11 @@ class TarGzipExtractor(Extractor):
         with tarfile.open(self.archive, 'r:gz') as tar:
             tar.extractall(path=destination)
 
+    def extract_stream(self, fileobj, destination):
+        """Extract the archive as it is read from fileobj."""
+        with tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+            tar.extractall(path=destination)
+
     @staticmethod
     def extension():
         """Return archive extension."""
@@ -615,6 +875,96 @@ class ZipExtractor(Extractor):
         return '.zip'
 
 
+class S3ObjectReader(object):
+    """A file like object reading an S3 object sequentially.
+
+    The object is read from the body of a GetObject response for its first
+    part. The following parts are requested with ranged GetObject calls, up
+    to `S3_DOWNLOAD_CONCURRENCY` of them ahead of the one being read, so
+    large objects are downloaded concurrently while they are consumed. The
+    parts are requested with the ETag of the first response, so a change to
+    the object while it's being read fails the download.
+
+    Args:
+        client (:class:`botocore.client.S3`): the S3 client to use
+        response (dict): the GetObject response for the first part
+        bucket (str): the bucket of the object
+        key (str): the key of the object
+        extra_args (dict, optional): extra arguments for GetObject
+        part_size (int, optional): the size of the parts, defaults to
+            `S3_PART_SIZE`
+
+    """
+
+    def __init__(self, client, response, bucket, key, extra_args=None,
+                 part_size=None):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = extra_args or {}
+        self.etag = response.get('ETag')
+        self.part_size = part_size or S3_PART_SIZE
+        if 'ContentRange' in response:
+            self.size = int(response['ContentRange'].rsplit('/', 1)[1])
+        else:
+            self.size = response['ContentLength']
+        self._current = response['Body']
+        self._next_offset = response['ContentLength']
+        self._parts = collections.deque()
+        self._executor = None
+
+    def _get_part(self, start, end):
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, IfMatch=self.etag,
+            Range="bytes=%d-%d" % (start, end), **self.extra_args)
+        return response['Body'].read()
+
+    def _next_part(self):
+        if self._executor is None and self._next_offset < self.size:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, S3_DOWNLOAD_CONCURRENCY))
+        while self._next_offset < self.size and \
+                len(self._parts) < max(1, S3_DOWNLOAD_CONCURRENCY):
+            end = min(self._next_offset + self.part_size, self.size) - 1
+            self._parts.append(
+                self._executor.submit(self._get_part, self._next_offset, end))
+            self._next_offset = end + 1
+        if not self._parts:
+            return None
+        return io.BytesIO(self._parts.popleft().result())
+
+    def read(self, size=-1):
+        """Read up to size bytes, or until the end of the object."""
+        chunks = []
+        remaining = size if size is not None and size >= 0 else None
+        while remaining is None or remaining > 0:
+            if self._current is None:
+                self._current = self._next_part()
+                if self._current is None:
+                    break
+            data = self._current.read(remaining)
+            if not data:
+                self._current.close()
+                self._current = None
+                continue
+            chunks.append(data)
+            if remaining is not None:
+                remaining -= len(data)
+        return b"".join(chunks)
+
+    def close(self):
+        """Stop downloading the object."""
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        for future in self._parts:
+            future.cancel()
+        self._parts.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
 class SourceProcessor(object):
     """Makes remote python package sources available in current environment."""
 
@@ -629,8 +979,7 @@ class SourceProcessor(object):
             stacker_cache_dir (string): Path where remote sources will be
                 cached.
         """
-        if not stacker_cache_dir:
-            stacker_cache_dir = os.path.expanduser("~/.stacker")
+        stacker_cache_dir = get_cache_dir(stacker_cache_dir)
         package_cache_dir = os.path.join(stacker_cache_dir, 'packages')
         self.stacker_cache_dir = stacker_cache_dir
         self.package_cache_dir = package_cache_dir
@@ -640,25 +989,93 @@ class SourceProcessor(object):
 
     def create_cache_directories(self):
         """Ensure that SourceProcessor cache directories exist."""
-        if not os.path.isdir(self.package_cache_dir):
-            if not os.path.isdir(self.stacker_cache_dir):
-                os.mkdir(self.stacker_cache_dir)
-            os.mkdir(self.package_cache_dir)
+        ensure_directory(self.package_cache_dir)
+
+    def install_package(self, dir_name, download, source):
+        """Download a package to the package cache, unless it's already there.
+
+        The package is downloaded to a temporary directory next to the cache
+        and renamed into place once complete, so the cache never contains
+        partial packages. A lock file per package makes concurrent stacker
+        processes wait for the one downloading a package, rather than
+        downloading it again.
+
+        Args:
+            dir_name (string): the name of the package directory in the cache
+            download (func): downloads the package to the path it's given
+            source (string): where the package comes from, for logging
+
+        """
+        cached_dir_path = os.path.join(self.package_cache_dir, dir_name)
+        # We can skip downloading the package if it's already been cached
+        if os.path.isdir(cached_dir_path):
+            logger.debug("Remote package %s appears to have been previously "
+                         "downloaded to %s -- bypassing download",
+                         source, cached_dir_path)
+            return
+
+        lock_path = os.path.join(self.package_cache_dir, '.locks',
+                                 dir_name + '.lock')
+        with FileLock(lock_path):
+            if os.path.isdir(cached_dir_path):
+                logger.debug("Remote package %s was downloaded to %s while "
+                             "waiting for the lock -- bypassing download",
+                             source, cached_dir_path)
+                return
+
+            logger.debug("Remote package %s does not appear to have been "
+                         "previously downloaded - starting download to %s",
+                         source, cached_dir_path)
+            tmp_dir = tempfile.mkdtemp(prefix='.tmp-',
+                                       dir=self.package_cache_dir)
+            try:
+                tmp_package_path = os.path.join(tmp_dir, dir_name)
+                download(tmp_package_path)
+                os.rename(tmp_package_path, cached_dir_path)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
 
     def get_package_sources(self):
-        """Make remote python packages available for local use."""
-        # Checkout S3 repositories specified in config
-        for config in self.sources.get('s3', []):
-            self.fetch_s3_package(config=config)
-        # Checkout git repositories specified in config
-        for config in self.sources.get('git', []):
-            self.fetch_git_package(config=config)
+        """Make remote python packages available for local use.
+
+        Sources are downloaded concurrently, then added to sys.path (and
+        their configs queued for merging) in the order they are defined.
+        """
+        downloads = [(config, self.download_s3_package)
+                     for config in self.sources.get('s3', [])]
+        downloads += [(config, self.download_git_package)
+                      for config in self.sources.get('git', [])]
+        if not downloads:
+            return
+
+        workers = max(1, min(PACKAGE_SOURCE_CONCURRENCY, len(downloads)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(config, executor.submit(download, config))
+                       for config, download in downloads]
+            for config, future in futures:
+                self.update_paths_and_config(config=config,
+                                             pkg_dir_name=future.result())
 
     def fetch_s3_package(self, config):
         """Make a remote S3 archive available for local use.
 
         Args:
-            config (dict): git config dictionary
+            config (dict): s3 config dictionary
+
+        """
+        dir_name = self.download_s3_package(config)
+        # Update sys.path & merge in remote configs (if necessary)
+        self.update_paths_and_config(config=config,
+                                     pkg_dir_name=dir_name)
+
+    def download_s3_package(self, config):
+        """Download and extract a remote S3 archive to the package cache.
+
+        Args:
+            config (dict): s3 config dictionary
+
+        Returns:
+            str: the name of the package directory in the cache.
 
         """
         extractor_map = {'.tar.gz': TarGzipExtractor,
@@ -685,112 +1102,176 @@ class SourceProcessor(object):
                 "in bucket %s." % (config['key'], config['bucket'])
             )
 
-        session = get_session(region=None)
+        from dateutil.tz import tzutc
+
+        source = "s3://%s/%s" % (config['bucket'], config['key'])
+        use_latest = config.get('use_latest', True)
         extra_s3_args = {}
         if config.get('requester_pays', False):
             extra_s3_args['RequestPayer'] = 'requester'
 
         # We can skip downloading the archive if it's already been cached
-        if config.get('use_latest', True):
-            try:
-                # LastModified should always be returned in UTC, but it doesn't
-                # hurt to explicitly convert it to UTC again just in case
-                modified_date = session.client('s3').head_object(
-                    Bucket=config['bucket'],
-                    Key=config['key'],
-                    **extra_s3_args
-                )['LastModified'].astimezone(dateutil.tz.tzutc())
-            except botocore.exceptions.ClientError as client_error:
-                logger.error("Error checking modified date of "
-                             "s3://%s/%s : %s",
-                             config['bucket'],
-                             config['key'],
-                             client_error)
-                sys.exit(1)
+        if not use_latest and os.path.isdir(
+                os.path.join(self.package_cache_dir, dir_name)):
+            logger.debug("Remote package %s appears to have been previously "
+                         "downloaded -- bypassing download", source)
+            return dir_name
+
+        # The ETag and cache directory of the version of the archive that
+        # was last downloaded, to only download it again when it changes
+        manifest = DiskCache(os.path.join(self.stacker_cache_dir,
+                                          's3-manifest'))
+        manifest_key = cache_key(config['bucket'], config['key'])
+        etag = None
+        if use_latest:
+            entry = manifest.get(manifest_key)
+            if entry and os.path.isdir(os.path.join(self.package_cache_dir,
+                                                    entry['dir_name'])):
+                etag = entry['etag']
+
+        client = get_session(region=None).client('s3')
+        response = self.get_s3_object(client, config, extra_s3_args, etag)
+        if response is None:
+            logger.debug("Remote package %s is unchanged since it was "
+                         "downloaded to %s -- bypassing download", source,
+                         entry['dir_name'])
+            return entry['dir_name']
+
+        if use_latest:
+            # LastModified should always be returned in UTC, but it doesn't
+            # hurt to explicitly convert it to UTC again just in case
+            modified_date = response['LastModified'].astimezone(tzutc())
             dir_name += "-%s" % modified_date.strftime(self.ISO8601_FORMAT)
-        cached_dir_path = os.path.join(self.package_cache_dir, dir_name)
-        if not os.path.isdir(cached_dir_path):
-            logger.debug("Remote package s3://%s/%s does not appear to have "
-                         "been previously downloaded - starting download and "
-                         "extraction to %s",
-                         config['bucket'],
-                         config['key'],
-                         cached_dir_path)
-            tmp_dir = tempfile.mkdtemp(prefix='stacker')
-            tmp_package_path = os.path.join(tmp_dir, dir_name)
+
+        reader = S3ObjectReader(client, response, config['bucket'],
+                                config['key'], extra_s3_args)
+
+        def download(path):
+            logger.debug("Starting remote package download from %s to %s "
+                         "with extra S3 options \"%s\"", source, path,
+                         str(extra_s3_args))
+            extractor.extract_stream(reader, path)
+
+        try:
+            self.install_package(dir_name, download, source)
+        finally:
+            reader.close()
+
+        if use_latest:
+            manifest.set(manifest_key, {'etag': response['ETag'],
+                                        'dir_name': dir_name})
+        return dir_name
+
+    def get_s3_object(self, client, config, extra_s3_args, etag=None):
+        """Request the first part of an S3 archive.
+
+        Args:
+            client (:class:`botocore.client.S3`): the S3 client to use
+            config (dict): s3 config dictionary
+            extra_s3_args (dict): extra arguments for GetObject
+            etag (str, optional): the ETag of the copy of the archive in the
+                cache, if any
+
+        Returns:
+            dict: the GetObject response, for the first `S3_PART_SIZE` bytes
+                of the archive, or None if it still matches etag.
+
+        """
+        import botocore.exceptions
+
+        args = dict(Bucket=config['bucket'], Key=config['key'],
+                    **extra_s3_args)
+        if etag:
+            args['IfNoneMatch'] = etag
+        try:
             try:
-                extractor.set_archive(os.path.join(tmp_dir, dir_name))
-                logger.debug("Starting remote package download from S3 to %s "
-                             "with extra S3 options \"%s\"",
-                             extractor.archive,
-                             str(extra_s3_args))
-                session.resource('s3').Bucket(config['bucket']).download_file(
-                    config['key'],
-                    extractor.archive,
-                    ExtraArgs=extra_s3_args
-                )
-                logger.debug("Download complete; extracting downloaded "
-                             "package to %s",
-                             tmp_package_path)
-                extractor.extract(tmp_package_path)
-                logger.debug("Moving extracted package directory %s to the "
-                             "Stacker cache at %s",
-                             dir_name,
-                             self.package_cache_dir)
-                shutil.move(tmp_package_path, self.package_cache_dir)
-            finally:
-                shutil.rmtree(tmp_dir)
-        else:
-            logger.debug("Remote package s3://%s/%s appears to have "
-                         "been previously downloaded to %s -- bypassing "
-                         "download",
+                return client.get_object(
+                    Range="bytes=0-%d" % (S3_PART_SIZE - 1), **args)
+            except botocore.exceptions.ClientError as e:
+                # Empty objects can't be requested by range
+                if e.response['Error']['Code'] != 'InvalidRange':
+                    raise
+                return client.get_object(**args)
+        except botocore.exceptions.ClientError as client_error:
+            if client_error.response['Error']['Code'] in ('304',
+                                                          'NotModified'):
+                return None
+            logger.error("Error downloading s3://%s/%s : %s",
                          config['bucket'],
                          config['key'],
-                         cached_dir_path)
+                         client_error)
+            sys.exit(1)
+
+    def fetch_git_package(self, config):
+        """Make a remote git repository available for local use.
+
+        Args:
+            config (dict): git config dictionary
 
+        """
+        dir_name = self.download_git_package(config)
         # Update sys.path & merge in remote configs (if necessary)
         self.update_paths_and_config(config=config,
                                      pkg_dir_name=dir_name)
 
-    def fetch_git_package(self, config):
-        """Make a remote git repository available for local use.
+    def download_git_package(self, config):
+        """Clone a remote git repository to the package cache.
 
         Args:
             config (dict): git config dictionary
 
-        """
-        # only loading git here when needed to avoid load errors on systems
-        # without git installed
-        from git import Repo
+        Returns:
+            str: the name of the package directory in the cache.
 
+        """
         ref = self.determine_git_ref(config)
         dir_name = self.sanitize_git_path(uri=config['uri'], ref=ref)
-        cached_dir_path = os.path.join(self.package_cache_dir, dir_name)
 
-        # We can skip cloning the repo if it's already been cached
-        if not os.path.isdir(cached_dir_path):
-            logger.debug("Remote repo %s does not appear to have been "
-                         "previously downloaded - starting clone to %s",
-                         config['uri'],
-                         cached_dir_path)
-            tmp_dir = tempfile.mkdtemp(prefix='stacker')
-            try:
-                tmp_repo_path = os.path.join(tmp_dir, dir_name)
-                with Repo.clone_from(config['uri'], tmp_repo_path) as repo:
-                    repo.head.reference = ref
-                    repo.head.reset(index=True, working_tree=True)
-                shutil.move(tmp_repo_path, self.package_cache_dir)
-            finally:
-                shutil.rmtree(tmp_dir)
-        else:
-            logger.debug("Remote repo %s appears to have been previously "
-                         "cloned to %s -- bypassing download",
-                         config['uri'],
-                         cached_dir_path)
+        def download(path):
+            self.git_clone(config['uri'], ref, path,
+                           tag=bool(config.get('tag')))
 
-        # Update sys.path & merge in remote configs (if necessary)
-        self.update_paths_and_config(config=config,
-                                     pkg_dir_name=dir_name)
+        self.install_package(dir_name, download, config['uri'])
+        return dir_name
+
+    def git_clone(self, uri, ref, path, tag=False):
+        """Clone a single ref of a repository, without its history.
+
+        Tags are cloned with `git clone --depth 1 --branch`, commits are
+        fetched on their own with `git fetch --depth 1`. Servers that don't
+        allow fetching commits by id get a full clone instead.
+
+        Args:
+            uri (string): git URI
+            ref (string): the commit id or tag to check out
+            path (string): the directory to clone the repository to
+            tag (bool): whether ref is a tag
+
+        """
+        # only loading git here when needed to avoid load errors on systems
+        # without git installed
+        from git import GitCommandError, Repo
+
+        if isinstance(ref, bytes):
+            ref = ref.decode('utf-8')
+
+        try:
+            if tag:
+                Repo.clone_from(uri, path, depth=1, branch=ref).close()
+            else:
+                with Repo.init(path) as repo:
+                    repo.create_remote('origin', uri)
+                    repo.git.fetch('origin', ref, depth=1)
+                    repo.git.checkout('FETCH_HEAD')
+            return
+        except GitCommandError as e:
+            logger.debug("Shallow clone of %s at %s failed, falling back to a "
+                         "full clone: %s", uri, ref, e)
+            shutil.rmtree(path, ignore_errors=True)
+
+        with Repo.clone_from(uri, path) as repo:
+            repo.head.reference = ref
+            repo.head.reset(index=True, working_tree=True)
 
     def update_paths_and_config(self, config, pkg_dir_name):
         """Handle remote source defined sys.paths & configs.
@@ -824,6 +1305,9 @@ class SourceProcessor(object):
     def git_ls_remote(self, uri, ref):
         """Determine the latest commit id for a given ref.
 
+        Commit ids are cached in `stacker_cache_dir` for
+        `GIT_LS_REMOTE_CACHE_TTL` seconds.
+
         Args:
             uri (string): git URI
             ref (string): git ref
@@ -832,6 +1316,24 @@ class SourceProcessor(object):
             str: A commit id
 
         """
+        cache = None
+        if GIT_LS_REMOTE_CACHE_TTL > 0:
+            cache = DiskCache(os.path.join(self.stacker_cache_dir,
+                                           'git-ls-remote'),
+                              ttl=GIT_LS_REMOTE_CACHE_TTL)
+            key = cache_key(uri, ref)
+            commit_id = cache.get(key)
+            if commit_id:
+                logger.debug("Using cached commit id %s for %s of repo %s",
+                             commit_id, ref, uri)
+                return commit_id.encode('utf-8')
+
+        commit_id = self._git_ls_remote(uri, ref)
+        if cache is not None:
+            cache.set(key, commit_id.decode('utf-8'))
+        return commit_id
+
+    def _git_ls_remote(self, uri, ref):
         logger.debug("Invoking git to retrieve commit id for repo %s...", uri)
         lsremote_output = subprocess.check_output(['git',
                                                    'ls-remote',
@@ -842,7 +1344,7 @@ class SourceProcessor(object):
             logger.debug("Matching commit id found: %s", commit_id)
             return commit_id
         else:
-            raise ValueError("Ref \"%s\" not found for repo %d." % (ref, uri))
+            raise ValueError("Ref \"%s\" not found for repo %s." % (ref, uri))
 
     def determine_git_ls_remote_ref(self, config):
         """Determine the ref to be used with the "git ls-remote" command.
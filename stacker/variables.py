@@ -3,21 +3,185 @@ from __future__ import print_function
 from __future__ import division
 from past.builtins import basestring
 from builtins import object
-from string import Template
+import copy
 
 from .exceptions import InvalidLookupCombination
 from .lookups import (
-    extract_lookups,
+    Lookup,
+    iter_lookups_from_string,
     resolve_lookups,
+    submit_lookups,
 )
 
 from .exceptions import FailedVariableLookup
 
 
-class LookupTemplate(Template):
+class StringExpression(object):
 
-    """A custom string template we use to replace lookup values"""
-    idpattern = r'[_a-z][^\$\{\}]*'
+    """A string compiled into literal segments and the lookups between them.
+
+    As with the `string.Template` substitution stacker used to do, `$$` is
+    unescaped to `$` in the literal segments, and a lookup preceded by an
+    escaped `$` is kept as literal text.
+
+    Args:
+        value (str): the string being compiled
+
+    """
+
+    __slots__ = ("value", "segments", "lookups")
+
+    def __init__(self, value):
+        self.value = value
+        self.segments = []
+        lookups = set()
+        literal = ""
+        position = 0
+        for start, end, lookup in iter_lookups_from_string(value):
+            lookups.add(lookup)
+            literal += value[position:start]
+            position = end
+            if (len(literal) - len(literal.rstrip("$"))) % 2:
+                # `$${...}` is an escaped `$` followed by literal text
+                literal += value[start:end]
+                continue
+            if literal:
+                self.segments.append(literal.replace("$$", "$"))
+                literal = ""
+            self.segments.append(lookup)
+        literal += value[position:]
+        if literal:
+            self.segments.append(literal.replace("$$", "$"))
+        self.lookups = frozenset(lookups)
+
+    def substitute(self, replacements):
+        """Replace the lookups within the string.
+
+        Args:
+            replacements (dict): resolved lookup values, keyed by the raw
+                lookup.
+
+        Returns:
+            tuple: the resolved value, and its expression (None if the
+                resolved value has no lookups left, ie. nested lookups).
+
+        """
+        for lookup in self.lookups:
+            lookup_value = replacements.get(lookup.raw)
+            if not isinstance(lookup_value, basestring):
+                if len(self.lookups) > 1:
+                    raise InvalidLookupCombination(lookup, self.lookups,
+                                                   self.value)
+                return lookup_value, compile_value(lookup_value)
+
+        resolved = "".join(
+            replacements[segment.raw] if isinstance(segment, Lookup)
+            else segment
+            for segment in self.segments
+        )
+        return resolved, compile_value(resolved)
+
+
+class ListExpression(object):
+
+    """A list with lookups in some of its items.
+
+    Args:
+        value (list): the list being compiled
+        children (list): (index, expression) for each item with lookups
+
+    """
+
+    __slots__ = ("value", "children", "lookups")
+
+    def __init__(self, value, children):
+        self.value = value
+        self.children = children
+        self.lookups = _collect_lookups(children)
+
+    def substitute(self, replacements):
+        resolved = list(self.value)
+        children = []
+        for index, expression in self.children:
+            resolved[index], child = expression.substitute(replacements)
+            if child is not None:
+                children.append((index, child))
+        return resolved, ListExpression(resolved, children) if children \
+            else None
+
+
+class DictExpression(object):
+
+    """A dict with lookups in some of its values.
+
+    Substitution updates the dict in place.
+
+    Args:
+        value (dict): the dict being compiled
+        children (list): (key, expression) for each value with lookups
+
+    """
+
+    __slots__ = ("value", "children", "lookups")
+
+    def __init__(self, value, children):
+        self.value = value
+        self.children = children
+        self.lookups = _collect_lookups(children)
+
+    def substitute(self, replacements):
+        children = []
+        for key, expression in self.children:
+            self.value[key], child = expression.substitute(replacements)
+            if child is not None:
+                children.append((key, child))
+        return self.value, DictExpression(self.value, children) if children \
+            else None
+
+
+def _collect_lookups(children):
+    lookups = set()
+    for _, expression in children:
+        lookups.update(expression.lookups)
+    return frozenset(lookups)
+
+
+def compile_value(value):
+    """Compile a value into an expression tree of its lookups.
+
+    The tree only holds the parts of the value that contain lookups, so it
+    can be used to list the lookups, and to substitute their resolved values,
+    without walking the whole value again.
+
+    Args:
+        value (Union[str, list, dict]): a structure that contains lookups
+
+    Returns:
+        The expression for the value, or None if it has no lookups.
+
+    """
+    if isinstance(value, basestring):
+        if "${" not in value and "$$" not in value:
+            return None
+        # Strings with `$$` are kept even without lookups, as substituting
+        # the lookups of the value they're part of unescapes them
+        expression = StringExpression(value)
+        return expression if expression.lookups or "$$" in value else None
+    elif isinstance(value, list):
+        children = []
+        for index, v in enumerate(value):
+            expression = compile_value(v)
+            if expression is not None:
+                children.append((index, expression))
+        return ListExpression(value, children) if children else None
+    elif isinstance(value, dict):
+        children = []
+        for key, v in value.items():
+            expression = compile_value(v)
+            if expression is not None:
+                children.append((key, expression))
+        return DictExpression(value, children) if children else None
+    return None
 
 
 def resolve_string(value, replacements):
@@ -31,15 +195,7 @@ def resolve_string(value, replacements):
         str: value with any lookups resolved
 
     """
-    lookups = extract_lookups(value)
-    for lookup in lookups:
-        lookup_value = replacements.get(lookup.raw)
-        if not isinstance(lookup_value, basestring):
-            if len(lookups) > 1:
-                raise InvalidLookupCombination(lookup, lookups, value)
-            return lookup_value
-    # we use safe_substitute to support resolving nested lookups
-    return LookupTemplate(value).safe_substitute(replacements)
+    return resolve(value, replacements)
 
 
 def resolve(value, replacements):
@@ -53,33 +209,69 @@ def resolve(value, replacements):
         Union[str, list, dict]: value passed in with lookup values resolved
 
     """
+    expression = compile_value(value)
+    if expression is None:
+        return value
+    return expression.substitute(replacements)[0]
+
+
+def _copy_value(value):
     if isinstance(value, basestring):
-        return resolve_string(value, replacements)
-    elif isinstance(value, list):
-        resolved = []
-        for v in value:
-            resolved.append(resolve(v, replacements))
-        return resolved
-    elif isinstance(value, dict):
-        for key, v in value.items():
-            value[key] = resolve(v, replacements)
         return value
-    return value
+    return copy.deepcopy(value)
 
 
-def resolve_variables(variables, context, provider):
+def resolve_variables(variables, context, provider, preresolved=None):
     """Given a list of variables, resolve all of them.
 
+    The lookups of all the variables are resolved together, so independent
+    lookups are resolved concurrently. Nested lookups are resolved in
+    successive rounds, innermost first.
+
     Args:
         variables (list of :class:`stacker.variables.Variable`): list of
             variables
         context (:class:`stacker.context.Context`): stacker context
         provider (:class:`stacker.provider.base.BaseProvider`): subclass of the
             base provider
+        preresolved (dict, optional): dict of :class:`stacker.lookups.Lookup`
+            -> value, for lookups that have already been resolved and don't
+            need to be resolved again.
+
+    Raises:
+        FailedVariableLookup: Raised for the first variable (in the given
+            order) that has a lookup which failed to resolve.
 
     """
-    for variable in variables:
-        variable.resolve(context, provider)
+    preresolved = preresolved or {}
+    pending = [variable for variable in variables if variable.lookups]
+    while pending:
+        lookups = set()
+        for variable in pending:
+            lookups.update(variable.lookups)
+        futures = submit_lookups(
+            lookups.difference(preresolved), context, provider)
+
+        # Values shared with other variables or stacks are copied, so that
+        # modifying them in one place doesn't change them in the others
+        handed_out = set()
+        for variable in pending:
+            resolved_lookups = {}
+            try:
+                for lookup in variable.lookups:
+                    if lookup in preresolved:
+                        value = _copy_value(preresolved[lookup])
+                    else:
+                        value = futures[lookup].result()
+                        if lookup in handed_out:
+                            value = _copy_value(value)
+                        handed_out.add(lookup)
+                    resolved_lookups[lookup] = value
+            except Exception as e:
+                raise FailedVariableLookup(variable.name, e)
+            variable.replace(resolved_lookups)
+
+        pending = [variable for variable in pending if variable.lookups]
 
 
 class Variable(object):
@@ -96,11 +288,14 @@ class Variable(object):
         self.name = name
         self._value = value
         self._resolved_value = None
+        self._expression = compile_value(value)
 
     @property
     def lookups(self):
         """Return any lookups within the value"""
-        return extract_lookups(self.value)
+        if self._expression is None:
+            return frozenset()
+        return self._expression.lookups
 
     @property
     def needs_resolution(self):
@@ -164,4 +359,8 @@ class Variable(object):
         for lookup, value in resolved_lookups.items():
             replacements[lookup.raw] = value
 
-        self._resolved_value = resolve(self.value, replacements)
+        if self._expression is None:
+            self._resolved_value = self.value
+            return
+        self._resolved_value, self._expression = \
+            self._expression.substitute(replacements)